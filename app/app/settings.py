@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/3.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -53,6 +55,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.HealthCheckMiddleware',
+    'core.middleware.CompressionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -139,6 +143,43 @@ MEDIA_URL = '/static/media/'
 MEDIA_ROOT = '/vol/web/media'
 STATIC_ROOT = '/vol/web/static'
 
+STATICFILES_STORAGE = 'core.storage.CompressedManifestStaticFilesStorage'
+# Internal proxy location of the collected static files, see api_schema.
+STATIC_ACCEL_REDIRECT_PREFIX = '/protected/static/'
+
+# Uploads stream to a temporary file on the media volume, so saving one
+# renames it into MEDIA_ROOT instead of copying it.
+FILE_UPLOAD_HANDLERS = [
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]
+FILE_UPLOAD_TEMP_DIR = os.environ.get('FILE_UPLOAD_TEMP_DIR')
+
+# Media is kept on the local volume unless MEDIA_STORAGE=s3, which keeps
+# it in an S3 compatible bucket that clients upload to directly.
+if os.environ.get('MEDIA_STORAGE') == 's3':
+    DEFAULT_FILE_STORAGE = 'core.storage.MediaStorage'
+else:
+    DEFAULT_FILE_STORAGE = 'core.storage.SignedFileSystemStorage'
+
+# Shared with the proxy, which validates signed media URLs on its own.
+MEDIA_URL_SECRET = os.environ.get('MEDIA_URL_SECRET')
+if not MEDIA_URL_SECRET:
+    if not DEBUG:
+        raise ImproperlyConfigured(
+            'MEDIA_URL_SECRET must be set unless DEBUG is on.'
+        )
+    MEDIA_URL_SECRET = 'changeme'
+MEDIA_URL_EXPIRE = int(os.environ.get('MEDIA_URL_EXPIRE', 60 * 60))
+# Internal proxy location media is served from after the app allowed it.
+MEDIA_ACCEL_REDIRECT_PREFIX = '/protected/media/'
+AWS_STORAGE_BUCKET_NAME = os.environ.get('AWS_STORAGE_BUCKET_NAME')
+AWS_S3_ENDPOINT_URL = os.environ.get('AWS_S3_ENDPOINT_URL')
+AWS_S3_REGION_NAME = os.environ.get('AWS_S3_REGION_NAME')
+AWS_LOCATION = 'media'
+AWS_DEFAULT_ACL = None
+AWS_S3_SIGNATURE_VERSION = 's3v4'
+AWS_QUERYSTRING_EXPIRE = int(os.environ.get('AWS_QUERYSTRING_EXPIRE', 3600))
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/3.2/ref/settings/#default-auto-field
 
@@ -147,9 +188,71 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
-    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema'
+    'DEFAULT_SCHEMA_CLASS': 'drf_spectacular.openapi.AutoSchema',
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.ORJSONRenderer',
+        'core.renderers.MessagePackRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'core.parsers.ORJSONParser',
+        'core.parsers.MessagePackParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ],
 }
 
+RECIPE_BATCH_MAX_IDS = 100
+RECIPE_BULK_MAX_ITEMS = 1000
+
+RECIPE_IMAGE_MAX_BYTES = int(
+    os.environ.get('RECIPE_IMAGE_MAX_BYTES', 10 * 1024 * 1024)
+)
+RECIPE_IMAGE_MAX_PIXELS = int(
+    os.environ.get('RECIPE_IMAGE_MAX_PIXELS', 24_000_000)
+)
+
+RECIPE_IMAGE_UPLOAD_EXPIRE = int(
+    os.environ.get('RECIPE_IMAGE_UPLOAD_EXPIRE', 15 * 60)
+)
+
+IDEMPOTENCY_KEY_TTL = int(os.environ.get('IDEMPOTENCY_KEY_TTL', 24 * 60 * 60))
+
+# Latency budgets of the test suite are flaky on shared CI runners, so
+# only query budgets are enforced unless this is set.
+ENFORCE_LATENCY_BUDGETS = bool(
+    int(os.environ.get('ENFORCE_LATENCY_BUDGETS', 0))
+)
+
+SYNC_CURSOR_LAG = int(os.environ.get('SYNC_CURSOR_LAG', 5))
+SYNC_PAGE_SIZE = int(os.environ.get('SYNC_PAGE_SIZE', 500))
+SYNC_TOMBSTONE_RETENTION = int(
+    os.environ.get('SYNC_TOMBSTONE_RETENTION', 30 * 24 * 60 * 60)
+)
+
+EVENTS_HEARTBEAT_SECONDS = int(
+    os.environ.get('EVENTS_HEARTBEAT_SECONDS', 15)
+)
+EVENTS_QUEUE_SIZE = int(os.environ.get('EVENTS_QUEUE_SIZE', 100))
+EVENTS_TOKEN_MAX_AGE = int(os.environ.get('EVENTS_TOKEN_MAX_AGE', 60))
+
+JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 5))
+JOB_RETRY_BASE_SECONDS = int(os.environ.get('JOB_RETRY_BASE_SECONDS', 10))
+JOB_RETRY_MAX_SECONDS = int(os.environ.get('JOB_RETRY_MAX_SECONDS', 3600))
+
+ACCOUNT_DELETION_BATCH_SIZE = int(
+    os.environ.get('ACCOUNT_DELETION_BATCH_SIZE', 1000)
+)
+
+COMPRESSION_MIN_SIZE = int(os.environ.get('COMPRESSION_MIN_SIZE', 1024))
+COMPRESSION_ENCODINGS = ['zstd', 'br', 'gzip']
+
+READINESS_CACHE_SECONDS = int(os.environ.get('READINESS_CACHE_SECONDS', 5))
+
+ADMIN_COUNT_ESTIMATE_THRESHOLD = int(
+    os.environ.get('ADMIN_COUNT_ESTIMATE_THRESHOLD', 100_000)
+)
+
 SPECTACULAR_SETTINGS = {
     'COMPONENT_SPLIT_REQUEST': True,
 }
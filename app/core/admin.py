@@ -1,11 +1,22 @@
 """
 Django admin customization.
 """
-from django.contrib import admin
+from urllib.parse import urlencode
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.contrib.admin.widgets import AutocompleteSelectMultiple
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.paginator import Paginator
+from django.db import connection, transaction
+from django.urls import reverse
+from django.utils.functional import cached_property
 from django.utils.translation import gettext_lazy as _
 
 from core import models
+from recipe.merge import merge
+from user.jobs import request_account_deletion
 
 class UserAdmin(BaseUserAdmin):
     """Define the admin pages for users."""
@@ -41,7 +52,157 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    def get_deleted_objects(self, objs, request):
+        """List only the users, their data is purged in the background."""
+        objs = list(objs)
+        return [str(obj) for obj in objs], {'users': len(objs)}, set(), []
+
+    def delete_model(self, request, obj):
+        request_account_deletion(obj)
+
+    def delete_queryset(self, request, queryset):
+        for user in queryset:
+            request_account_deletion(user)
+
+
 admin.site.register(models.User, UserAdmin)
-admin.site.register(models.Recipe)
-admin.site.register(models.Tag)
-admin.site.register(models.Ingredients)
\ No newline at end of file
+
+
+def estimated_count(model):
+    """Return the planner's estimate of the rows in ``model``'s table."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+            [model._meta.db_table],
+        )
+        return int(cursor.fetchone()[0])
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator estimating the count of large, unfiltered tables.
+
+    Counting the rows of a whole table reads all of it, so above
+    ``ADMIN_COUNT_ESTIMATE_THRESHOLD`` rows the table statistics kept up
+    to date by autovacuum are used instead. Filtered lists are counted.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimate = estimated_count(queryset.model)
+            if estimate >= settings.ADMIN_COUNT_ESTIMATE_THRESHOLD:
+                return estimate
+        return super().count
+
+
+class UserAutocompleteSelectMultiple(AutocompleteSelectMultiple):
+    """Autocomplete restricted to the objects of ``user_id``."""
+    user_id = None
+
+    def get_url(self):
+        url = super().get_url()
+        if self.user_id is None:
+            return url
+        return f'{url}?{urlencode({"user_id": self.user_id})}'
+
+
+class RecipeAdminForm(forms.ModelForm):
+    """Recipe form checking tags and ingredients belong to its user."""
+
+    def clean(self):
+        cleaned_data = super().clean()
+        user = cleaned_data.get('user')
+        for name in ('tags', 'ingredient'):
+            if user and any(
+                obj.user_id != user.id for obj in cleaned_data.get(name, ())
+            ):
+                self.add_error(name, _("Select items of the recipe's user."))
+        return cleaned_data
+
+
+class RecipeAdmin(admin.ModelAdmin):
+    """Define the admin pages for recipes."""
+    form = RecipeAdminForm
+    list_display = ['title', 'user', 'time_minutes', 'price', 'updated_at']
+    list_select_related = ['user']
+    search_fields = ['^title']
+    ordering = ['-id']
+    raw_id_fields = ['user']
+    autocomplete_fields = ['tags', 'ingredient']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        if db_field.name in self.autocomplete_fields:
+            kwargs['widget'] = UserAutocompleteSelectMultiple(
+                db_field, self.admin_site, using=kwargs.get('using')
+            )
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
+
+    def get_form(self, request, obj=None, **kwargs):
+        """Offer only the tags and ingredients of the recipe's user."""
+        form = super().get_form(request, obj, **kwargs)
+        if obj is not None:
+            for name in self.autocomplete_fields:
+                field = form.base_fields[name]
+                field.queryset = field.queryset.filter(user_id=obj.user_id)
+                field.widget.widget.user_id = obj.user_id
+        return form
+
+
+class RecipeAttrAdmin(admin.ModelAdmin):
+    """Base admin pages for tags and ingredients."""
+    list_display = ['name', 'user', 'updated_at']
+    list_select_related = ['user']
+    search_fields = ['^name']
+    ordering = ['-id']
+    raw_id_fields = ['user']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    actions = ['merge_selected']
+
+    @admin.action(description=_('Merge selected into the oldest one'))
+    def merge_selected(self, request, queryset):
+        target, *sources = queryset.order_by('id')
+        if any(obj.user_id != target.user_id for obj in sources):
+            self.message_user(
+                request,
+                _('Only items of the same user can be merged.'),
+                messages.ERROR,
+            )
+            return
+        with transaction.atomic():
+            merge(target, [obj.id for obj in sources])
+        self.message_user(
+            request,
+            _('Merged %(count)d items into "%(name)s".') % {
+                'count': len(sources), 'name': target,
+            },
+            messages.SUCCESS,
+        )
+
+    def get_search_results(self, request, queryset, search_term):
+        """Limit recipe autocompletes to the recipe's user."""
+        user_id = request.GET.get('user_id')
+        autocomplete = reverse(f'{self.admin_site.name}:autocomplete')
+        if request.path == autocomplete and user_id and user_id.isdigit():
+            queryset = queryset.filter(user_id=user_id)
+        return super().get_search_results(request, queryset, search_term)
+
+
+admin.site.register(models.Recipe, RecipeAdmin)
+admin.site.register(models.Tag, RecipeAttrAdmin)
+admin.site.register(models.Ingredients, RecipeAttrAdmin)
+admin.site.register(models.Job)
+
+
+class AccountDeletionAdmin(admin.ModelAdmin):
+    """Show the progress of background account deletions."""
+    list_display = ['email', 'requested_at', 'finished_at', 'deleted']
+    readonly_fields = [
+        'user_id', 'email', 'requested_at', 'finished_at', 'deleted',
+    ]
+
+
+admin.site.register(models.AccountDeletion, AccountDeletionAdmin)
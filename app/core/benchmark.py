@@ -0,0 +1,370 @@
+"""
+HTTP load testing for the API.
+
+Drives every public route against a running server with a pool of
+worker threads and summarises latency percentiles and throughput.
+"""
+import http.client
+import io
+import json
+import math
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from decimal import Decimal
+from urllib.parse import urlencode, urlsplit
+
+from PIL import Image
+
+
+class Client:
+    """Minimal JSON client keeping one connection per thread."""
+
+    def __init__(self, base_url, token=None):
+        parts = urlsplit(base_url)
+        self.host = parts.hostname
+        self.port = parts.port or (443 if parts.scheme == 'https' else 80)
+        self.secure = parts.scheme == 'https'
+        self.token = token
+        self.local = threading.local()
+
+    def _connection(self):
+        conn = getattr(self.local, 'conn', None)
+        if conn is None:
+            cls = (http.client.HTTPSConnection if self.secure
+                   else http.client.HTTPConnection)
+            conn = cls(self.host, self.port, timeout=30)
+            self.local.conn = conn
+        return conn
+
+    def request(self, method, path, data=None, files=None, params=None):
+        """Send a request and return ``(status, body)``."""
+        headers = {}
+        body = None
+        if self.token:
+            headers['Authorization'] = f'Token {self.token}'
+        if files:
+            body, content_type = encode_multipart(files)
+            headers['Content-Type'] = content_type
+        elif data is not None:
+            body = json.dumps(data)
+            headers['Content-Type'] = 'application/json'
+        if params:
+            path = f'{path}?{urlencode(params)}'
+
+        for attempt in range(2):
+            conn = self._connection()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                res = conn.getresponse()
+                return res.status, res.read()
+            except (http.client.HTTPException, OSError):
+                conn.close()
+                self.local.conn = None
+                if attempt:
+                    raise
+
+    def json(self, method, path, data=None, **kwargs):
+        """Send a request and decode the JSON response."""
+        status, body = self.request(method, path, data=data, **kwargs)
+        return status, json.loads(body) if body else None
+
+
+def encode_multipart(files):
+    """Encode ``{field: (filename, bytes, content_type)}`` as multipart."""
+    boundary = uuid.uuid4().hex
+    buffer = io.BytesIO()
+    for field, (filename, content, content_type) in files.items():
+        buffer.write(f'--{boundary}\r\n'.encode())
+        buffer.write(
+            f'Content-Disposition: form-data; name="{field}"; '
+            f'filename="{filename}"\r\n'
+            f'Content-Type: {content_type}\r\n\r\n'.encode()
+        )
+        buffer.write(content)
+        buffer.write(b'\r\n')
+    buffer.write(f'--{boundary}--\r\n'.encode())
+    return buffer.getvalue(), f'multipart/form-data; boundary={boundary}'
+
+
+def sample_image():
+    """Return the bytes of a small JPEG image."""
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 64), color=(200, 120, 40)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def percentile(values, pct):
+    """Return the nearest-rank percentile of sorted ``values``."""
+    if not values:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(values)) - 1, 0)
+    return values[rank]
+
+
+def summarize(latencies, errors, elapsed):
+    """Summarise latencies in seconds measured over ``elapsed`` seconds."""
+    values = sorted(latency * 1000 for latency in latencies)
+    count = len(values)
+    return {
+        'requests': count,
+        'errors': errors,
+        'rps': round(count / elapsed, 2) if elapsed else 0.0,
+        'mean_ms': round(sum(values) / count, 3) if count else 0.0,
+        'p50_ms': round(percentile(values, 50), 3),
+        'p95_ms': round(percentile(values, 95), 3),
+        'p99_ms': round(percentile(values, 99), 3),
+        'max_ms': round(values[-1], 3) if values else 0.0,
+    }
+
+
+class Scenario:
+    """A request issued repeatedly by the load generator.
+
+    ``build`` receives the request index and the prepared argument and
+    returns ``(method, path, kwargs)``; ``prepare`` optionally creates
+    one argument per request before timing starts.
+    """
+
+    def __init__(self, name, build, expected=200, prepare=None, auth=True):
+        self.name = name
+        self.build = build
+        self.expected = expected
+        self.prepare = prepare
+        self.auth = auth
+
+
+def run_scenario(scenario, client, requests, concurrency):
+    """Run ``requests`` calls of ``scenario`` and return a summary."""
+    args = (scenario.prepare(requests) if scenario.prepare
+            else [None] * requests)
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+
+    def call(index):
+        nonlocal errors
+        method, path, kwargs = scenario.build(index, args[index])
+        start = time.perf_counter()
+        try:
+            status, _ = client.request(method, path, **kwargs)
+        except (http.client.HTTPException, OSError):
+            status = None
+        latency = time.perf_counter() - start
+        with lock:
+            latencies.append(latency)
+            if status != scenario.expected:
+                errors += 1
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(call, range(requests)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+class Fixture:
+    """Objects owned by the benchmark user, created through the API."""
+
+    def __init__(self, client, recipes=20):
+        self.client = client
+        self.tags = []
+        self.ingredients = []
+        self.recipes = []
+        for i in range(recipes):
+            _, recipe = client.json('POST', '/api/recipe/recipes/', {
+                'title': f'Benchmark recipe {i}',
+                'time_minutes': 10 + i,
+                'price': '5.50',
+                'link': 'https://example.com/recipe',
+                'tags': [{'name': f'Tag {i % 5}'}],
+                'ingredients': [{'name': f'Ingredient {i % 7}'}],
+            })
+            self.recipes.append(recipe['id'])
+        _, tags = client.json('GET', '/api/recipe/tags/')
+        _, ingredients = client.json('GET', '/api/recipe/ingredients/')
+        self.tags = [tag['id'] for tag in tags]
+        self.ingredients = [ingr['id'] for ingr in ingredients]
+
+    def pick(self, items, index):
+        return items[index % len(items)]
+
+    def new_recipes(self, count):
+        """Create throwaway recipes for destructive scenarios."""
+        return [
+            self.client.json('POST', '/api/recipe/recipes/', {
+                'title': f'Disposable {i}',
+                'time_minutes': 5,
+                'price': '1.00',
+            })[1]['id']
+            for i in range(count)
+        ]
+
+    def new_attrs(self, kind, count):
+        """Create throwaway tags or ingredients for destructive scenarios."""
+        recipe = self.client.json('POST', '/api/recipe/recipes/', {
+            'title': 'Disposable attrs',
+            'time_minutes': 5,
+            'price': '1.00',
+            kind: [{'name': f'Disposable {uuid.uuid4().hex}'}
+                   for _ in range(count)],
+        })[1]
+        self.client.request('DELETE', f'/api/recipe/recipes/{recipe["id"]}/')
+        _, items = self.client.json('GET', f'/api/recipe/{kind}/')
+        return [item['id'] for item in items
+                if item['name'].startswith('Disposable')][:count]
+
+
+def build_scenarios(fixture, email, password):
+    """Return a scenario for every route in the API."""
+    image = sample_image()
+    recipes = '/api/recipe/recipes/'
+    pick = fixture.pick
+
+    def recipe_url(pk):
+        return f'{recipes}{pk}/'
+
+    return [
+        Scenario('health-check', lambda i, a: (
+            'GET', '/api/health-check/', {}), auth=False),
+        Scenario('readiness-check', lambda i, a: (
+            'GET', '/api/ready/', {}), auth=False),
+        Scenario('api-schema', lambda i, a: (
+            'GET', '/api/schema/', {}), auth=False),
+        Scenario('api-schema-json', lambda i, a: (
+            'GET', '/api/schema/', {'params': {'format': 'json'}}),
+            auth=False),
+        Scenario('api-docs', lambda i, a: (
+            'GET', '/api/docs/', {}), auth=False),
+        Scenario('user-create', lambda i, a: (
+            'POST', '/api/user/create/', {'data': {
+                'email': f'bench-{uuid.uuid4().hex}@example.com',
+                'password': password,
+                'name': 'Benchmark',
+            }}), expected=201, auth=False),
+        Scenario('user-token', lambda i, a: (
+            'POST', '/api/user/token/', {'data': {
+                'email': email, 'password': password,
+            }}), auth=False),
+        Scenario('user-me', lambda i, a: ('GET', '/api/user/me/', {})),
+        Scenario('user-me-update', lambda i, a: (
+            'PATCH', '/api/user/me/', {'data': {'name': f'Bench {i}'}})),
+        Scenario('recipe-list', lambda i, a: ('GET', recipes, {})),
+        Scenario('recipe-list-filter-tags', lambda i, a: (
+            'GET', recipes, {'params': {
+                'tags': ','.join(map(str, fixture.tags[:3])),
+            }})),
+        Scenario('recipe-list-filter-ingredients', lambda i, a: (
+            'GET', recipes, {'params': {
+                'ingredients': ','.join(map(str, fixture.ingredients[:3])),
+            }})),
+        Scenario('recipe-create', lambda i, a: (
+            'POST', recipes, {'data': {
+                'title': f'Created {i}',
+                'time_minutes': 15,
+                'price': '3.20',
+                'tags': [{'name': f'Created {i}'}],
+                'ingredients': [{'name': f'Salt {i}'}],
+            }}), expected=201),
+        Scenario('recipe-retrieve', lambda i, a: (
+            'GET', recipe_url(pick(fixture.recipes, i)), {})),
+        Scenario('recipe-partial-update', lambda i, a: (
+            'PATCH', recipe_url(pick(fixture.recipes, i)), {'data': {
+                'title': f'Patched {i}',
+            }})),
+        Scenario('recipe-update', lambda i, a: (
+            'PUT', recipe_url(pick(fixture.recipes, i)), {'data': {
+                'title': f'Replaced {i}',
+                'time_minutes': 20,
+                'price': '4.40',
+                'tags': [{'name': f'Tag {i % 5}'}],
+            }})),
+        Scenario('recipe-upload-image', lambda i, a: (
+            'POST', f'{recipe_url(pick(fixture.recipes, i))}upload-image/',
+            {'files': {'image': ('bench.jpg', image, 'image/jpeg')}})),
+        Scenario('recipe-delete', lambda i, a: (
+            'DELETE', recipe_url(a), {}),
+            expected=204, prepare=fixture.new_recipes),
+        Scenario('tag-list', lambda i, a: ('GET', '/api/recipe/tags/', {})),
+        Scenario('tag-list-assigned', lambda i, a: (
+            'GET', '/api/recipe/tags/', {'params': {'assigned_only': 1}})),
+        Scenario('tag-update', lambda i, a: (
+            'PATCH', f'/api/recipe/tags/{pick(fixture.tags, i)}/',
+            {'data': {'name': f'Tag {i % 5}'}})),
+        Scenario('tag-delete', lambda i, a: (
+            'DELETE', f'/api/recipe/tags/{a}/', {}), expected=204,
+            prepare=lambda n: fixture.new_attrs('tags', n)),
+        Scenario('ingredient-list', lambda i, a: (
+            'GET', '/api/recipe/ingredients/', {})),
+        Scenario('ingredient-list-assigned', lambda i, a: (
+            'GET', '/api/recipe/ingredients/',
+            {'params': {'assigned_only': 1}})),
+        Scenario('ingredient-update', lambda i, a: (
+            'PATCH',
+            f'/api/recipe/ingredients/{pick(fixture.ingredients, i)}/',
+            {'data': {'name': f'Ingredient {i % 7}'}})),
+        Scenario('ingredient-delete', lambda i, a: (
+            'DELETE', f'/api/recipe/ingredients/{a}/', {}), expected=204,
+            prepare=lambda n: fixture.new_attrs('ingredients', n)),
+    ]
+
+
+def compare(previous, current):
+    """Return rows of relative p95 and throughput changes per scenario."""
+    rows = []
+    for name, result in current['results'].items():
+        before = previous.get('results', {}).get(name)
+        if not before:
+            continue
+        rows.append({
+            'scenario': name,
+            'p95_change': _change(before['p95_ms'], result['p95_ms']),
+            'rps_change': _change(before['rps'], result['rps']),
+        })
+    return rows
+
+
+def _change(before, after):
+    if not before:
+        return 0.0
+    return round((after - before) / before * 100, 1)
+
+
+def recipe_payload(count):
+    """Build a recipe list shaped like ``RecipeSerializer`` output."""
+    return [
+        {
+            'id': i,
+            'title': f'Recipe {i}',
+            'time_minutes': 10 + i % 50,
+            'price': str(Decimal(f'{i % 100}.50')),
+            'link': f'https://example.com/recipes/{i}',
+            'tags': [
+                {'id': i % 20 + t, 'name': f'Tag {i % 20 + t}'}
+                for t in range(3)
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def render_benchmark(renderers, sizes, repeat=5):
+    """Time each renderer on recipe lists of every size.
+
+    Returns ``{size: {renderer: {'ms': best time, 'bytes': size}}}``.
+    """
+    results = {}
+    for size in sizes:
+        payload = recipe_payload(size)
+        results[size] = {}
+        for name, renderer in renderers.items():
+            timings = []
+            for _ in range(repeat):
+                start = time.perf_counter()
+                body = renderer.render(payload, renderer.media_type, {})
+                timings.append(time.perf_counter() - start)
+            results[size][name] = {
+                'ms': round(min(timings) * 1000, 3),
+                'bytes': len(body),
+            }
+    return results
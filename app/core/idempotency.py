@@ -0,0 +1,111 @@
+"""
+Idempotency-Key support for API views.
+
+The first response to a request carrying an ``Idempotency-Key`` header
+is stored and replayed for retries with the same key. The key row is
+inserted before the view runs, in the same transaction as the view's
+work, so a concurrent duplicate blocks on the unique index until the
+first request commits and then replays its response.
+"""
+import functools
+import hashlib
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.uploadedfile import UploadedFile
+from django.db import transaction
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.response import Response
+from rest_framework.utils.encoders import JSONEncoder
+
+from core.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+REPLAYED_HEADER = 'Idempotent-Replayed'
+
+
+def _fingerprint(request):
+    """Hash the method, path and parsed payload of ``request``."""
+    digest = hashlib.sha256()
+    digest.update(f'{request.method} {request.path}\n'.encode())
+    data = request.data
+    items = data.lists() if hasattr(data, 'lists') else [('', [data])]
+    for name, values in sorted(items, key=lambda item: item[0]):
+        digest.update(f'{name}\n'.encode())
+        for value in values:
+            if isinstance(value, UploadedFile):
+                for chunk in value.chunks():
+                    digest.update(chunk)
+                value.seek(0)
+            else:
+                digest.update(
+                    json.dumps(value, cls=JSONEncoder, sort_keys=True).encode()
+                )
+    return digest.hexdigest()
+
+
+def _scope(request):
+    if request.user and request.user.is_authenticated:
+        return f'user:{request.user.pk}'
+    return 'anonymous'
+
+
+def _replay(record):
+    response = Response(record.response_data, status=record.status_code)
+    response[REPLAYED_HEADER] = 'true'
+    return response
+
+
+def idempotent(view_method):
+    """Make a view handler safe to retry with an Idempotency-Key."""
+
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response(
+                {'detail': f'{HEADER} must be at most 255 characters.'},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        fingerprint = _fingerprint(request)
+        ttl = timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL)
+        with transaction.atomic():
+            record, created = IdempotencyKey.objects.get_or_create(
+                scope=_scope(request),
+                key=key,
+                defaults={'fingerprint': fingerprint},
+            )
+            if not created:
+                record = IdempotencyKey.objects.select_for_update().get(
+                    pk=record.pk
+                )
+                if record.created_at > timezone.now() - ttl:
+                    if record.fingerprint != fingerprint:
+                        return Response(
+                            {'detail': f'{HEADER} was already used for a '
+                                       'different request.'},
+                            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                        )
+                    return _replay(record)
+                record.fingerprint = fingerprint
+                record.created_at = timezone.now()
+
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code >= 500:
+                transaction.set_rollback(True)
+                return response
+
+            record.status_code = response.status_code
+            record.response_data = json.loads(
+                json.dumps(response.data, cls=JSONEncoder)
+            )
+            record.save()
+        return response
+
+    return wrapper
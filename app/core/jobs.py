@@ -0,0 +1,90 @@
+"""
+Background jobs stored in Postgres.
+
+Jobs are enqueued in the caller's transaction, so they only become
+visible to workers once it commits. Workers claim due jobs with
+``SELECT ... FOR UPDATE SKIP LOCKED`` and keep the row locked while the
+job runs: concurrent workers never run the same job and a crashed
+worker's job is released with its connection.
+"""
+import functools
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from core.models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def job_name(func):
+    return f'{func.__module__}.{func.__qualname__}'
+
+
+def job(func=None, *, max_attempts=None):
+    """Register ``func`` as a job, optionally overriding its attempts."""
+    if func is None:
+        return functools.partial(job, max_attempts=max_attempts)
+    func.max_attempts = max_attempts or settings.JOB_MAX_ATTEMPTS
+    registry[job_name(func)] = func
+    return func
+
+
+def enqueue(func, *, priority=0, delay=0, **kwargs):
+    """Queue a run of job ``func`` with JSON serializable ``kwargs``.
+
+    Jobs with a higher ``priority`` run first; ``delay`` postpones the
+    run by that many seconds.
+    """
+    name = job_name(func)
+    if name not in registry:
+        raise ValueError(f'{name} is not registered as a job.')
+    return Job.objects.create(
+        name=name,
+        kwargs=kwargs,
+        priority=priority,
+        max_attempts=func.max_attempts,
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+
+
+def retry_delay(attempts):
+    """Return the backoff before retrying a job failed ``attempts`` times."""
+    return timedelta(seconds=min(
+        settings.JOB_RETRY_BASE_SECONDS * 2 ** (attempts - 1),
+        settings.JOB_RETRY_MAX_SECONDS,
+    ))
+
+
+def run_next():
+    """Run the next due job, returning whether there was one."""
+    with transaction.atomic():
+        job = Job.objects.select_for_update(skip_locked=True).filter(
+            status=Job.QUEUED, run_at__lte=timezone.now(),
+        ).order_by('-priority', 'run_at', 'id').first()
+        if job is None:
+            return False
+
+        try:
+            with transaction.atomic():
+                registry[job.name](**job.kwargs)
+                # Surface deferred constraint errors as this job's failure.
+                connection.check_constraints()
+        except Exception:
+            logger.exception('Job %s failed', job.name)
+            job.attempts += 1
+            job.last_error = traceback.format_exc()
+            if job.attempts >= job.max_attempts:
+                job.status = Job.FAILED
+            else:
+                job.run_at = timezone.now() + retry_delay(job.attempts)
+            job.save()
+        else:
+            job.delete()
+    return True
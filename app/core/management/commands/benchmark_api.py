@@ -0,0 +1,124 @@
+"""
+Load test every API route against a running server.
+"""
+import json
+import subprocess
+import uuid
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmark
+
+BENCHMARK_PASSWORD = 'benchpass123'
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+class Command(BaseCommand):
+    help = 'Benchmark latency and throughput of the API endpoints.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://localhost:8000')
+        parser.add_argument('--concurrency', type=int, default=4)
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=200,
+            help='Requests issued per scenario.',
+        )
+        parser.add_argument(
+            '--recipes',
+            type=int,
+            default=20,
+            help='Recipes created for the benchmark user.',
+        )
+        parser.add_argument(
+            '--scenario',
+            action='append',
+            dest='scenarios',
+            help='Only run scenarios starting with this name.',
+        )
+        parser.add_argument('--output', help='Write results as JSON here.')
+        parser.add_argument(
+            '--compare',
+            help='Previous JSON results to compare against.',
+        )
+
+    def handle(self, *args, **options):
+        base_url = options['base_url']
+        anonymous = benchmark.Client(base_url)
+        email = f'bench-{uuid.uuid4().hex}@example.com'
+        status, _ = anonymous.json('POST', '/api/user/create/', {
+            'email': email,
+            'password': BENCHMARK_PASSWORD,
+            'name': 'Benchmark',
+        })
+        if status != 201:
+            raise CommandError(f'Could not create benchmark user ({status}).')
+        _, token = anonymous.json('POST', '/api/user/token/', {
+            'email': email,
+            'password': BENCHMARK_PASSWORD,
+        })
+        client = benchmark.Client(base_url, token=token['token'])
+        fixture = benchmark.Fixture(client, recipes=options['recipes'])
+
+        scenarios = benchmark.build_scenarios(
+            fixture, email, BENCHMARK_PASSWORD
+        )
+        if options['scenarios']:
+            scenarios = [
+                s for s in scenarios
+                if s.name.startswith(tuple(options['scenarios']))
+            ]
+
+        results = {}
+        for scenario in scenarios:
+            summary = benchmark.run_scenario(
+                scenario,
+                client if scenario.auth else anonymous,
+                options['requests'],
+                options['concurrency'],
+            )
+            results[scenario.name] = summary
+            self.stdout.write(
+                f'{scenario.name:32} {summary["rps"]:>9.1f} req/s  '
+                f'p50 {summary["p50_ms"]:>8.2f}ms  '
+                f'p95 {summary["p95_ms"]:>8.2f}ms  '
+                f'p99 {summary["p99_ms"]:>8.2f}ms  '
+                f'errors {summary["errors"]}'
+            )
+
+        report = {
+            'commit': _git_commit(),
+            'timestamp': datetime.now(timezone.utc).isoformat(),
+            'base_url': base_url,
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'results': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(report, output, indent=2)
+
+        if options['compare']:
+            with open(options['compare']) as previous:
+                rows = benchmark.compare(json.load(previous), report)
+            for row in rows:
+                self.stdout.write(
+                    f'{row["scenario"]:32} p95 {row["p95_change"]:+}%  '
+                    f'rps {row["rps_change"]:+}%'
+                )
+
+        if any(r['errors'] for r in results.values()):
+            self.stdout.write(self.style.WARNING('Some requests failed.'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Benchmark complete.'))
@@ -0,0 +1,48 @@
+"""
+Compare response renderers on large recipe lists.
+"""
+import json
+
+from django.core.management.base import BaseCommand
+
+from rest_framework.renderers import JSONRenderer
+
+from core import benchmark
+from core.renderers import ORJSONRenderer, MessagePackRenderer
+
+
+class Command(BaseCommand):
+    help = 'Benchmark JSON and MessagePack rendering of recipe lists.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes',
+            default='1000,5000,10000',
+            help='Comma separated list of recipe counts.',
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--output', help='Write results as JSON here.')
+
+    def handle(self, *args, **options):
+        sizes = [int(size) for size in options['sizes'].split(',')]
+        renderers = {
+            'drf-json': JSONRenderer(),
+            'orjson': ORJSONRenderer(),
+            'msgpack': MessagePackRenderer(),
+        }
+        results = benchmark.render_benchmark(
+            renderers, sizes, options['repeat']
+        )
+
+        for size, timings in results.items():
+            baseline = timings['drf-json']['ms']
+            for name, result in timings.items():
+                speedup = baseline / result['ms'] if result['ms'] else 0
+                self.stdout.write(
+                    f'{size:>6} recipes  {name:10} {result["ms"]:>9.2f}ms  '
+                    f'{result["bytes"]:>10} bytes  {speedup:>5.1f}x'
+                )
+
+        if options['output']:
+            with open(options['output'], 'w') as output:
+                json.dump(results, output, indent=2)
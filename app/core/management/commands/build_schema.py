@@ -0,0 +1,39 @@
+"""
+Build the static OpenAPI schema served at /api/schema/.
+"""
+from django.core.management.base import BaseCommand, CommandError
+
+from core import schema
+
+
+class Command(BaseCommand):
+    help = 'Write the OpenAPI schema to static files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Exit with an error if the written schema is out of date.',
+        )
+
+    def handle(self, *args, **options):
+        stale = []
+        for name, content in schema.render().items():
+            path = schema.STATIC_DIR / name
+            if path.exists() and path.read_bytes() == content:
+                continue
+            stale.append(name)
+            if not options['check']:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(content)
+
+        if options['check']:
+            if stale:
+                raise CommandError(
+                    f'{", ".join(stale)} out of date, run build_schema.'
+                )
+            self.stdout.write(self.style.SUCCESS('Schema is up to date.'))
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f'Updated {len(stale)} schema files.'
+        ))
@@ -0,0 +1,25 @@
+"""
+Delete sync tombstones older than their retention.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import Tombstone
+
+
+class Command(BaseCommand):
+    help = 'Delete sync tombstones past SYNC_TOMBSTONE_RETENTION.'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(
+            seconds=settings.SYNC_TOMBSTONE_RETENTION
+        )
+        deleted, _ = Tombstone.objects.filter(
+            deleted_at__lt=cutoff
+        ).delete()
+        self.stdout.write(
+            self.style.SUCCESS(f'Deleted {deleted} expired tombstones.')
+        )
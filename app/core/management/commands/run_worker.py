@@ -0,0 +1,72 @@
+"""
+Run background jobs queued in the database.
+"""
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.utils.module_loading import autodiscover_modules
+
+from core import jobs
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--concurrency', type=int, default=1,
+            help='Number of jobs run at the same time.',
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=1.0,
+            help='Seconds to wait when no job is due.',
+        )
+        parser.add_argument(
+            '--burst', action='store_true',
+            help='Exit once no job is due instead of waiting for more.',
+        )
+
+    def handle(self, *args, **options):
+        autodiscover_modules('jobs')
+        self.stop = threading.Event()
+        self.processed = 0
+        self.lock = threading.Lock()
+
+        handlers = {}
+        if threading.current_thread() is threading.main_thread():
+            for signum in (signal.SIGINT, signal.SIGTERM):
+                handlers[signum] = signal.signal(
+                    signum, lambda *args: self.stop.set()
+                )
+
+        workers = [
+            threading.Thread(target=self._work, args=[options])
+            for _ in range(options['concurrency'])
+        ]
+        try:
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+        self.stdout.write(
+            self.style.SUCCESS(f'Processed {self.processed} jobs.')
+        )
+
+    def _work(self, options):
+        try:
+            while not self.stop.is_set():
+                if jobs.run_next():
+                    with self.lock:
+                        self.processed += 1
+                elif options['burst']:
+                    break
+                else:
+                    self.stop.wait(options['poll_interval'])
+        finally:
+            connection.close()
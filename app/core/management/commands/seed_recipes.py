@@ -0,0 +1,307 @@
+"""
+Generate a synthetic, reproducible dataset of users and recipes.
+
+Rows are written in chunks of users with ``COPY`` on PostgreSQL and
+``bulk_create`` elsewhere, so millions of rows can be created quickly.
+The same ``--seed`` always produces the same content.
+"""
+import io
+import random
+import re
+import time
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import IntegerField, Max, Value
+from django.db.models.functions import Cast, StrIndex, Substr
+from django.utils import timezone
+
+from core.models import User, Recipe, Tag, Ingredients
+
+SEED_EMAIL_DOMAIN = 'seed.example.com'
+SEED_PASSWORD = 'seedpass123'
+
+ADJECTIVES = [
+    'Spicy', 'Creamy', 'Crispy', 'Smoky', 'Roasted', 'Grilled', 'Fresh',
+    'Sweet', 'Tangy', 'Hearty', 'Zesty', 'Golden', 'Rustic', 'Quick',
+]
+DISHES = [
+    'Curry', 'Soup', 'Salad', 'Stew', 'Pasta', 'Tacos', 'Risotto', 'Pie',
+    'Burger', 'Noodles', 'Omelette', 'Paella', 'Chili', 'Casserole',
+]
+TAG_WORDS = [
+    'Vegan', 'Vegetarian', 'Dinner', 'Lunch', 'Breakfast', 'Dessert',
+    'Healthy', 'Comfort', 'Spanish', 'Thai', 'Indian', 'Mexican', 'Italian',
+    'Gluten free', 'Low carb', 'Budget', 'Party', 'Summer', 'Winter',
+]
+INGREDIENT_WORDS = [
+    'Tomato', 'Onion', 'Garlic', 'Rice', 'Chicken', 'Beef', 'Tofu', 'Prawns',
+    'Kurkuma', 'Cumin', 'Basil', 'Lemon', 'Potato', 'Carrot', 'Pepper',
+    'Olive oil', 'Butter', 'Flour', 'Egg', 'Milk', 'Cheese', 'Vanilla',
+]
+
+DISTRIBUTIONS = ['fixed', 'uniform', 'skewed']
+
+
+def _copy_value(value):
+    """Format a value for the PostgreSQL COPY text format."""
+    if value is None:
+        return '\\N'
+    if value is True:
+        return 't'
+    if value is False:
+        return 'f'
+    return (
+        str(value)
+        .replace('\\', '\\\\')
+        .replace('\t', '\\t')
+        .replace('\n', '\\n')
+    )
+
+
+def _names(words, count, rng):
+    """Return ``count`` distinct names built from ``words``."""
+    shuffled = rng.sample(words, len(words))
+    names = []
+    for i in range(count):
+        word = shuffled[i % len(shuffled)]
+        round_ = i // len(shuffled)
+        names.append(f'{word} {round_ + 1}' if round_ else word)
+    return names
+
+
+class Command(BaseCommand):
+    help = 'Seed the database with synthetic recipe data.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10)
+        parser.add_argument('--recipes-per-user', type=int, default=20)
+        parser.add_argument('--tags-per-user', type=int, default=10)
+        parser.add_argument('--ingredients-per-user', type=int, default=15)
+        parser.add_argument('--tags-per-recipe', type=int, default=3)
+        parser.add_argument('--ingredients-per-recipe', type=int, default=5)
+        parser.add_argument(
+            '--distribution',
+            choices=DISTRIBUTIONS,
+            default='uniform',
+            help='How per-user and per-recipe counts vary around their mean.',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=500,
+            help='Number of users written per transaction.',
+        )
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='Delete previously seeded users before seeding.',
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        self.rng = random.Random(options['seed'])
+        self.distribution = options['distribution']
+        self.use_copy = connection.vendor == 'postgresql'
+        self.password = make_password(SEED_PASSWORD)
+        self.now = timezone.now()
+        self.counts = dict.fromkeys(
+            ['users', 'recipes', 'tags', 'ingredients', 'links'], 0
+        )
+
+        if options['clear']:
+            User.objects.filter(
+                email__endswith=f'@{SEED_EMAIL_DOMAIN}'
+            ).delete()
+
+        first = self._next_number()
+        total = options['users']
+        for offset in range(0, total, options['chunk_size']):
+            size = min(options['chunk_size'], total - offset)
+            with transaction.atomic():
+                self._seed_chunk(first + offset, size, options)
+
+        elapsed = time.perf_counter() - start
+        summary = ', '.join(f'{v} {k}' for k, v in self.counts.items())
+        self.stdout.write(
+            self.style.SUCCESS(f'Seeded {summary} in {elapsed:.1f}s')
+        )
+
+    def _next_number(self):
+        """Return the number of the next seed user.
+
+        Seeding again without ``--clear`` then adds users rather than
+        failing on their emails.
+        """
+        pattern = rf'^user[0-9]+@{re.escape(SEED_EMAIL_DOMAIN)}$'
+        last = User.objects.filter(email__regex=pattern).aggregate(
+            number=Max(Cast(
+                Substr('email', 5, StrIndex('email', Value('@')) - 5),
+                IntegerField(),
+            ))
+        )['number']
+        return 0 if last is None else last + 1
+
+    def _sample(self, mean):
+        """Draw a count with the configured distribution."""
+        if self.distribution == 'fixed' or mean <= 0:
+            return max(mean, 0)
+        if self.distribution == 'uniform':
+            return self.rng.randint(0, 2 * mean)
+        return int(self.rng.expovariate(1 / mean))
+
+    def _reserve_ids(self, model, count):
+        """Reserve ``count`` consecutive primary keys for ``model``."""
+        if count == 0:
+            return range(0)
+        table = model._meta.db_table
+        with connection.cursor() as cursor:
+            if self.use_copy:
+                cursor.execute(
+                    'SELECT setval(pg_get_serial_sequence(%s, %s), '
+                    'nextval(pg_get_serial_sequence(%s, %s)) + %s - 1)',
+                    [table, 'id', table, 'id', count],
+                )
+                last = cursor.fetchone()[0]
+                return range(last - count + 1, last + 1)
+            cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}')
+            first = cursor.fetchone()[0] + 1
+        return range(first, first + count)
+
+    def _write(self, model, columns, rows):
+        """Insert ``rows`` of ``columns`` into the table of ``model``."""
+        if not rows:
+            return
+        if self.use_copy:
+            buffer = io.StringIO()
+            for row in rows:
+                buffer.write('\t'.join(_copy_value(v) for v in row))
+                buffer.write('\n')
+            buffer.seek(0)
+            table = connection.ops.quote_name(model._meta.db_table)
+            column_list = ', '.join(
+                connection.ops.quote_name(c) for c in columns
+            )
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f'COPY {table} ({column_list}) FROM STDIN', buffer
+                )
+            return
+        model.objects.bulk_create(
+            [model(**dict(zip(columns, row))) for row in rows],
+            batch_size=1000,
+        )
+
+    def _seed_chunk(self, offset, size, options):
+        """Generate and write the rows belonging to ``size`` users."""
+        rng = self.rng
+        user_ids = self._reserve_ids(User, size)
+        users = []
+        tags = []
+        ingredients = []
+        recipes = []
+        for i, user_id in enumerate(user_ids):
+            number = offset + i
+            users.append((
+                user_id, self.password, None, False,
+                f'user{number}@{SEED_EMAIL_DOMAIN}', f'Seed User {number}',
+                True, False,
+            ))
+            tags.append(
+                (user_id, _names(
+                    TAG_WORDS, self._sample(options['tags_per_user']), rng
+                ))
+            )
+            ingredients.append(
+                (user_id, _names(
+                    INGREDIENT_WORDS,
+                    self._sample(options['ingredients_per_user']),
+                    rng,
+                ))
+            )
+            recipes.append(
+                (user_id, self._sample(options['recipes_per_user']))
+            )
+
+        self._write(
+            User,
+            ['id', 'password', 'last_login', 'is_superuser', 'email', 'name',
+             'is_active', 'is_staff'],
+            users,
+        )
+        tag_ids = self._write_attrs(Tag, tags)
+        ingredient_ids = self._write_attrs(Ingredients, ingredients)
+
+        recipe_rows = []
+        tag_links = []
+        ingredient_links = []
+        recipe_ids = iter(
+            self._reserve_ids(Recipe, sum(count for _, count in recipes))
+        )
+        for user_id, count in recipes:
+            for _ in range(count):
+                recipe_id = next(recipe_ids)
+                recipe_rows.append((
+                    recipe_id,
+                    user_id,
+                    f'{rng.choice(ADJECTIVES)} {rng.choice(DISHES)}',
+                    'Synthetic recipe generated by seed_recipes.',
+                    rng.randint(5, 180),
+                    Decimal(rng.randint(100, 9999)) / 100,
+                    f'https://example.com/recipes/{recipe_id}',
+                    None,
+                    1,
+                    self.now,
+                ))
+                tag_links.extend(self._links(
+                    recipe_id, tag_ids[user_id], options['tags_per_recipe']
+                ))
+                ingredient_links.extend(self._links(
+                    recipe_id,
+                    ingredient_ids[user_id],
+                    options['ingredients_per_recipe'],
+                ))
+
+        self._write(
+            Recipe,
+            ['id', 'user_id', 'title', 'description', 'time_minutes', 'price',
+             'link', 'image', 'version', 'updated_at'],
+            recipe_rows,
+        )
+        self._write(Recipe.tags.through, ['recipe_id', 'tag_id'], tag_links)
+        self._write(
+            Recipe.ingredient.through,
+            ['recipe_id', 'ingredients_id'],
+            ingredient_links,
+        )
+
+        self.counts['users'] += len(users)
+        self.counts['recipes'] += len(recipe_rows)
+        self.counts['links'] += len(tag_links) + len(ingredient_links)
+
+    def _write_attrs(self, model, per_user):
+        """Write tags or ingredients, returning their ids keyed by user."""
+        ids = iter(
+            self._reserve_ids(model, sum(len(names) for _, names in per_user))
+        )
+        rows = []
+        by_user = {}
+        for user_id, names in per_user:
+            by_user[user_id] = []
+            for name in names:
+                attr_id = next(ids)
+                rows.append((attr_id, name, user_id, self.now))
+                by_user[user_id].append(attr_id)
+
+        self._write(model, ['id', 'name', 'user_id', 'updated_at'], rows)
+        key = 'tags' if model is Tag else 'ingredients'
+        self.counts[key] += len(rows)
+        return by_user
+
+    def _links(self, recipe_id, choices, mean):
+        """Pick distinct related ids for one recipe."""
+        count = min(self._sample(mean), len(choices))
+        return [(recipe_id, pk) for pk in self.rng.sample(choices, count)]
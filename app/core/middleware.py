@@ -0,0 +1,147 @@
+"""
+Middleware for the app.
+"""
+import zlib
+
+import brotli
+import zstandard
+
+from django.conf import settings
+from django.http import JsonResponse
+from django.urls import reverse
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+COMPRESSIBLE_TYPES = (
+    'application/json',
+    'application/msgpack',
+    'application/javascript',
+    'application/vnd.oai.openapi',
+    'image/svg+xml',
+    'text/',
+)
+
+
+def _gzip_stream(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _brotli_stream(chunks):
+    compressor = brotli.Compressor(quality=5)
+    for chunk in chunks:
+        yield compressor.process(chunk) + compressor.flush()
+    yield compressor.finish()
+
+
+def _zstd_stream(chunks):
+    compressor = zstandard.ZstdCompressor(level=3).compressobj()
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(
+            zstandard.COMPRESSOBJ_FLUSH_BLOCK
+        )
+    yield compressor.flush()
+
+
+# Content-Encoding -> (compress whole body, compress a stream of chunks).
+ENCODERS = {
+    'zstd': (
+        lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+        _zstd_stream,
+    ),
+    'br': (lambda data: brotli.compress(data, quality=5), _brotli_stream),
+    'gzip': (compress_string, _gzip_stream),
+}
+
+
+def accepted_encodings(header):
+    """Parse an Accept-Encoding header into ``{coding: quality}``."""
+    accepted = {}
+    for item in header.split(','):
+        coding, _, params = item.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def choose_encoding(header):
+    """Pick the best supported encoding the client accepts, if any."""
+    accepted = accepted_encodings(header)
+    best = None
+    best_quality = 0.0
+    for coding in settings.COMPRESSION_ENCODINGS:
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_quality:
+            best, best_quality = coding, quality
+    return best
+
+
+class HealthCheckMiddleware:
+    """Answer liveness probes before the rest of the middleware runs."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.path = reverse('health-check')
+
+    def __call__(self, request):
+        if request.path_info == self.path and request.method == 'GET':
+            return JsonResponse({'healthy': True})
+
+        return self.get_response(request)
+
+
+class CompressionMiddleware:
+    """Compress responses with zstd, brotli or gzip as negotiated.
+
+    Only compressible content types are touched, regular responses must
+    reach ``COMPRESSION_MIN_SIZE`` bytes and streaming responses are
+    compressed chunk by chunk. Strong ETags become weak, as the
+    compressed body is no longer byte-identical to the original.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        content_type = response.get('Content-Type', '')
+        if (response.has_header('Content-Encoding')
+                or not content_type.startswith(COMPRESSIBLE_TYPES)):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', '')
+        )
+        if encoding is None:
+            return response
+
+        compress, compress_stream = ENCODERS[encoding]
+        if response.streaming:
+            response.streaming_content = compress_stream(
+                response.streaming_content
+            )
+            if response.has_header('Content-Length'):
+                del response['Content-Length']
+        else:
+            if len(response.content) < settings.COMPRESSION_MIN_SIZE:
+                return response
+            response.content = compress(response.content)
+            response['Content-Length'] = str(len(response.content))
+
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = 'W/' + etag
+        response['Content-Encoding'] = encoding
+        return response
@@ -0,0 +1,29 @@
+from django.db import migrations
+
+# Admin searches on ^field filter on UPPER(field::text) LIKE UPPER('term%'),
+# which a pattern_ops index on that same expression serves regardless of
+# the database collation. Index can't describe it in Django 3.2. The
+# tables are large, so the indexes are built without blocking writes,
+# which can't happen inside a transaction.
+INDEXES = {
+    'recipe_title_search_idx': ('core_recipe', 'title'),
+    'tag_name_search_idx': ('core_tag', 'name'),
+    'ingredient_name_search_idx': ('core_ingredients', 'name'),
+}
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('core', '0011_accountdeletion'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            f'CREATE INDEX CONCURRENTLY {name} ON {table} '
+            f'((UPPER({column}::text)) text_pattern_ops);',
+            f'DROP INDEX CONCURRENTLY {name};',
+        )
+        for name, (table, column) in INDEXES.items()
+    ]
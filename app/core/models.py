@@ -5,6 +5,7 @@ import uuid
 import os
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 from django.contrib.auth.models import (
     AbstractBaseUser,
     BaseUserManager,
@@ -64,6 +65,16 @@ class Recipe(models.Model):
     tags = models.ManyToManyField('Tag')
     ingredient =  models.ManyToManyField('Ingredients')
     image = models.ImageField(null = True, upload_to=recipe_image_file_path)
+    version = models.PositiveIntegerField(default=1, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='recipe_user_updated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.title
@@ -75,6 +86,15 @@ class Tag(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='tag_user_updated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -86,6 +106,113 @@ class Ingredients(models.Model):
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
     )
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'updated_at'],
+                name='ingredient_user_updated_idx',
+            ),
+        ]
 
     def __str__(self):
         return self.name
+
+
+class IdempotencyKey(models.Model):
+    """Response stored for a request sent with an Idempotency-Key."""
+    scope = models.CharField(max_length=255)
+    key = models.CharField(max_length=255)
+    fingerprint = models.CharField(max_length=64)
+    status_code = models.PositiveSmallIntegerField(null=True)
+    response_data = models.JSONField(null=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['scope', 'key'],
+                name='unique_idempotency_key',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.scope} {self.key}'
+
+
+class Tombstone(models.Model):
+    """Record of a deleted recipe, tag or ingredient for delta sync."""
+    RECIPES = 'recipes'
+    TAGS = 'tags'
+    INGREDIENTS = 'ingredients'
+    KIND_CHOICES = [
+        (RECIPES, 'Recipe'),
+        (TAGS, 'Tag'),
+        (INGREDIENTS, 'Ingredient'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+    )
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    object_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['user', 'deleted_at'],
+                name='tombstone_user_deleted_idx',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} {self.object_id}'
+
+
+class Job(models.Model):
+    """Background job waiting to run or failed for good."""
+    QUEUED = 'queued'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (FAILED, 'Failed'),
+    ]
+
+    name = models.CharField(max_length=255)
+    kwargs = models.JSONField(default=dict)
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(
+        max_length=20, choices=STATUS_CHOICES, default=QUEUED
+    )
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField()
+    run_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['-priority', 'run_at'],
+                name='job_queue_idx',
+                condition=models.Q(status='queued'),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.name} ({self.status})'
+
+
+class AccountDeletion(models.Model):
+    """Progress of purging a deleted account's data in the background."""
+    user_id = models.BigIntegerField(unique=True)
+    email = models.EmailField(max_length=255)
+    requested_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True)
+    deleted = models.JSONField(default=dict)
+
+    def __str__(self):
+        return self.email
@@ -0,0 +1,52 @@
+"""
+Fast renderers for API responses.
+"""
+import msgpack
+import orjson
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Render JSON with orjson, falling back to DRF's encoder for
+    types orjson does not know (Decimal, lazy strings, querysets).
+
+    Payloads orjson can't encode at all, such as integers wider than
+    64 bits, are rendered by DRF's ``JSONRenderer`` instead.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        option = orjson.OPT_NON_STR_KEYS
+        if accepted_media_type and 'indent=' in accepted_media_type:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(
+                data, default=_encoder.default, option=option
+            )
+        except TypeError:
+            return JSONRenderer().render(
+                data, accepted_media_type, renderer_context
+            )
+
+
+class MessagePackRenderer(BaseRenderer):
+    """Render MessagePack for clients that accept it."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+    render_style = 'binary'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        return msgpack.packb(data, default=_encoder.default, use_bin_type=True)
@@ -0,0 +1,32 @@
+"""
+The OpenAPI schema, prebuilt as static files.
+
+Generating the schema introspects every view and serializer, so rather
+than on each request it's built by ``build_schema`` and committed with
+the code. The tests fail when the committed schema is out of date.
+"""
+from pathlib import Path
+
+from drf_spectacular.renderers import (
+    OpenApiJsonRenderer,
+    OpenApiYamlRenderer,
+)
+from drf_spectacular.settings import spectacular_settings
+
+STATIC_DIR = Path(__file__).resolve().parent / 'static'
+
+# Static name and renderer of the schema by its ``?format=``.
+FORMATS = {
+    'openapi': ('schema/openapi.yaml', OpenApiYamlRenderer),
+    'json': ('schema/openapi.json', OpenApiJsonRenderer),
+}
+
+
+def render():
+    """Return the schema rendered in every format, by static name."""
+    generator = spectacular_settings.DEFAULT_GENERATOR_CLASS()
+    schema = generator.get_schema(request=None, public=True)
+    return {
+        name: renderer().render(schema, renderer_context={})
+        for name, renderer in FORMATS.values()
+    }
@@ -0,0 +1,114 @@
+"""
+Storage backends for the app.
+"""
+import base64
+import gzip
+import hashlib
+import time
+from urllib.parse import unquote, urlencode, urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from storages.backends.s3boto3 import S3Boto3Storage
+from storages.utils import clean_name
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.map', '.json', '.yaml', '.svg', '.txt', '.html', '.xml',
+    '.ico',
+)
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """Hash static file names and write ``.gz`` siblings.
+
+    The precompressed copies let nginx serve static files with
+    ``gzip_static`` without compressing them on every request; the stock
+    nginx image has no brotli module to serve ``.br`` copies with. Until
+    ``collectstatic`` has written a manifest, unhashed names are used so
+    development and tests work without collecting.
+    """
+    min_compress_size = 256
+
+    def stored_name(self, name):
+        if not self.hashed_files:
+            return name
+        return super().stored_name(name)
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+
+        if dry_run:
+            return
+        for hashed_name in sorted(set(self.hashed_files.values())):
+            if hashed_name.endswith(COMPRESSIBLE_EXTENSIONS):
+                self._compress(hashed_name)
+
+    def _compress(self, name):
+        """Write a gzipped sibling of ``name`` when it is smaller."""
+        with self.open(name) as original:
+            content = original.read()
+        if len(content) < self.min_compress_size:
+            return
+
+        compressed_name = f'{name}.gz'
+        compressed = gzip.compress(content, compresslevel=9, mtime=0)
+        if self.exists(compressed_name):
+            self.delete(compressed_name)
+        if len(compressed) < len(content):
+            self._save(compressed_name, ContentFile(compressed))
+
+
+def media_signature(path, expires):
+    """Return the signature nginx's ``secure_link`` expects for a URL.
+
+    It's the base64url encoded MD5 of the expiry, path and
+    ``MEDIA_URL_SECRET``, as in ``proxy/default.conf.tpl``.
+    """
+    value = f'{expires}{path} {settings.MEDIA_URL_SECRET}'
+    digest = hashlib.md5(value.encode()).digest()
+    return base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+
+
+class SignedFileSystemStorage(FileSystemStorage):
+    """Media files on the local volume behind time-limited URLs.
+
+    The proxy checks the signature and expiry of media URLs itself, so
+    serving them never reaches the app. Expiries are rounded up to whole
+    ``MEDIA_URL_EXPIRE`` periods, keeping URLs the same, and cacheable by
+    clients, for at least a period.
+    """
+
+    def url(self, name):
+        url = super().url(name)
+        period = settings.MEDIA_URL_EXPIRE
+        expires = (int(time.time()) // period + 2) * period
+        signature = media_signature(unquote(urlsplit(url).path), expires)
+        return f'{url}?{urlencode({"expires": expires, "md5": signature})}'
+
+
+class MediaStorage(S3Boto3Storage):
+    """Media files in an S3 compatible bucket.
+
+    ``url`` returns presigned URLs, and ``presigned_post`` lets clients
+    upload straight to the bucket so file bodies never pass through the
+    app.
+    """
+    file_overwrite = False
+
+    def presigned_post(self, name, content_type, max_bytes, expires):
+        """Return the URL and form fields for uploading ``name``.
+
+        The upload must have ``content_type`` and at most ``max_bytes``.
+        """
+        return self.bucket.meta.client.generate_presigned_post(
+            self.bucket_name,
+            self._normalize_name(clean_name(name)),
+            Fields={'Content-Type': content_type},
+            Conditions=[
+                {'Content-Type': content_type},
+                ['content-length-range', 1, max_bytes],
+            ],
+            ExpiresIn=expires,
+        )
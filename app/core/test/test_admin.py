@@ -1,11 +1,19 @@
 """
 Test dfor the Django admin modifications.
 """
+from decimal import Decimal
+from unittest.mock import patch
+
 from django.test import TestCase
 from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.test import Client
 
+from core.admin import estimated_count
+from core.models import AccountDeletion, Ingredients, Job, Recipe, Tag
+
 class AdminSiteTests(TestCase):
     """Test for Django ."""
     def setUp(self):
@@ -40,4 +48,161 @@ class AdminSiteTests(TestCase):
         url = reverse('admin:core_user_add')
         res = self.client.get(url)
 
-        self.assertEqual(res.status_code, 200)
\ No newline at end of file
+        self.assertEqual(res.status_code, 200)
+
+    def test_delete_user_in_background(self):
+        """Test deleting a user defers purging their data."""
+        url = reverse('admin:core_user_delete', args=[self.user.id])
+
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        res = self.client.post(url, {'post': 'yes'})
+
+        self.assertEqual(res.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(AccountDeletion.objects.get().user_id, self.user.id)
+        self.assertEqual(Job.objects.count(), 1)
+
+
+class RecipeAdminTests(TestCase):
+    """Test the admin pages of recipes, tags and ingredients."""
+
+    def setUp(self):
+        self.client = Client()
+        self.admin_user = get_user_model().objects.create_superuser(
+            email='admin@example.com',
+            password='testpass123',
+        )
+        self.client.force_login(self.admin_user)
+        self.user = get_user_model().objects.create_user(
+            email='user@example.com',
+            password='testpass123',
+        )
+        self.other = get_user_model().objects.create_user(
+            email='other@example.com',
+            password='testpass123',
+        )
+
+    def _create_recipe(self, user, title='Pie'):
+        return Recipe.objects.create(
+            user=user, title=title, time_minutes=5, price=Decimal('1.00'),
+        )
+
+    def _changelist_queries(self):
+        url = reverse('admin:core_recipe_changelist')
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(url)
+        return len(queries)
+
+    def test_recipe_changelist_queries_constant(self):
+        """Test listing more recipes doesn't query their users."""
+        self._create_recipe(self.user)
+        expected = self._changelist_queries()
+        for i in range(5):
+            self._create_recipe(self.other, title=f'Recipe {i}')
+
+        self.assertEqual(self._changelist_queries(), expected)
+
+    def test_changelist_estimated_count(self):
+        """Test unfiltered changelists of large tables aren't counted."""
+        self._create_recipe(self.user)
+        url = reverse('admin:core_recipe_changelist')
+
+        with patch('core.admin.estimated_count', return_value=250000), \
+                CaptureQueriesContext(connection) as queries:
+            res = self.client.get(url)
+
+        self.assertContains(res, '250000 recipes')
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+
+    def test_estimated_count(self):
+        self._create_recipe(self.user)
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE core_recipe')
+
+        self.assertEqual(estimated_count(Recipe), 1)
+
+    def test_search_uses_index(self):
+        """Test admin searches can use the search index."""
+        queryset = Recipe.objects.filter(title__istartswith='pie')
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('SET LOCAL enable_seqscan = off')
+            cursor.execute(f'EXPLAIN {sql}', params)
+            plan = '\n'.join(row[0] for row in cursor.fetchall())
+
+        self.assertIn('recipe_title_search_idx', plan)
+
+    def test_autocomplete_limited_to_user(self):
+        """Test tag autocompletes of a recipe offer its user's tags."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        Tag.objects.create(user=self.other, name='Vegetarian')
+        url = reverse('admin:autocomplete')
+
+        res = self.client.get(url, {
+            'app_label': 'core',
+            'model_name': 'recipe',
+            'field_name': 'tags',
+            'term': 'veg',
+            'user_id': self.user.id,
+        })
+
+        self.assertEqual(
+            [result['id'] for result in res.json()['results']],
+            [str(tag.id)],
+        )
+
+    def test_change_recipe_limited_to_user(self):
+        """Test recipes only accept their user's ingredients."""
+        recipe = self._create_recipe(self.user)
+        ingredient = Ingredients.objects.create(user=self.other, name='Salt')
+        url = reverse('admin:core_recipe_change', args=[recipe.id])
+
+        res = self.client.get(url)
+        self.assertContains(res, f'autocomplete/?user_id={self.user.id}')
+        res = self.client.post(url, {
+            'user': self.user.id,
+            'title': 'Pie',
+            'time_minutes': 5,
+            'price': '1.00',
+            'ingredient': [ingredient.id],
+        })
+
+        self.assertEqual(res.status_code, 200)
+        self.assertFalse(recipe.ingredient.exists())
+
+    def test_merge_tags_action(self):
+        """Test the admin action merging tags into the oldest."""
+        recipe = self._create_recipe(self.user)
+        tags = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('Vegan', 'vegan')
+        ]
+        recipe.tags.add(tags[1])
+        url = reverse('admin:core_tag_changelist')
+
+        res = self.client.post(url, {
+            'action': 'merge_selected',
+            '_selected_action': [tag.id for tag in tags],
+        })
+
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(list(Tag.objects.all()), [tags[0]])
+        self.assertEqual(list(recipe.tags.all()), [tags[0]])
+
+    def test_merge_tags_of_different_users(self):
+        tags = [
+            Tag.objects.create(user=user, name='Vegan')
+            for user in (self.user, self.other)
+        ]
+        url = reverse('admin:core_tag_changelist')
+
+        self.client.post(url, {
+            'action': 'merge_selected',
+            '_selected_action': [tag.id for tag in tags],
+        })
+
+        self.assertEqual(Tag.objects.count(), 2)
@@ -0,0 +1,74 @@
+"""
+Tests for the API benchmark suite.
+"""
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import LiveServerTestCase, SimpleTestCase, override_settings
+
+from core import benchmark
+
+
+class BenchmarkStatsTests(SimpleTestCase):
+    """Test latency statistics."""
+
+    def test_percentile(self):
+        """Test nearest-rank percentiles."""
+        values = list(range(1, 101))
+
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 95), 95)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([], 50), 0.0)
+
+    def test_summarize(self):
+        """Test summary of latencies and throughput."""
+        summary = benchmark.summarize([0.01, 0.02, 0.03, 0.04], 1, 2.0)
+
+        self.assertEqual(summary['requests'], 4)
+        self.assertEqual(summary['errors'], 1)
+        self.assertEqual(summary['rps'], 2.0)
+        self.assertEqual(summary['p50_ms'], 20.0)
+        self.assertEqual(summary['max_ms'], 40.0)
+
+
+class BenchmarkCommandTests(LiveServerTestCase):
+    """Test running the benchmark against a live server."""
+
+    def setUp(self):
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media_dir.name)
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        self.media_dir.cleanup()
+
+    def test_benchmark_all_routes(self):
+        """Test every scenario runs without errors and is recorded."""
+        with tempfile.TemporaryDirectory() as out_dir:
+            output = os.path.join(out_dir, 'results.json')
+            call_command(
+                'benchmark_api',
+                base_url=self.live_server_url,
+                requests=3,
+                concurrency=2,
+                recipes=3,
+                output=output,
+                stdout=StringIO(),
+            )
+            with open(output) as f:
+                report = json.load(f)
+
+        results = report['results']
+        for name in ['api-schema', 'api-docs',
+                     'user-create', 'user-token', 'user-me', 'recipe-list',
+                     'recipe-upload-image', 'recipe-delete', 'tag-delete',
+                     'ingredient-update']:
+            self.assertIn(name, results)
+        for name, result in results.items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertEqual(result['requests'], 3)
@@ -1,13 +1,18 @@
 """"
 Test custom Django Management commands.
 """
+from io import StringIO
 from unittest.mock import patch
 
 from psycopg2 import OperationalError as Psycopg2Error
 
+from django.contrib.auth import get_user_model
 from django.core.management import call_command
 from django.db.utils import OperationalError
-from django.test import SimpleTestCase
+from django.test import SimpleTestCase, TestCase
+
+from core.models import Recipe, Tag, Ingredients
+
 
 @patch('core.management.commands.wait_for_db.Command.check')
 class CommandTests(SimpleTestCase):
@@ -19,6 +24,7 @@ class CommandTests(SimpleTestCase):
         call_command('wait_for_db')
 
         patched_check.assert_called_once_with(databases=['default'])
+
     @patch('time.sleep')
     def test_wait_for_db_delay(self, patched_sleep, patched_check):
         patched_check.side_effect = [Psycopg2Error] * 2 + \
@@ -27,4 +33,61 @@ class CommandTests(SimpleTestCase):
         call_command('wait_for_db')
 
         self.assertEqual(patched_check.call_count, 6)
-        patched_check.assert_called_with(databases=['default'])
\ No newline at end of file
+        patched_check.assert_called_with(databases=['default'])
+
+
+class SeedRecipesTests(TestCase):
+    """Test the seed_recipes command."""
+
+    def _seed(self, **options):
+        call_command('seed_recipes', stdout=StringIO(), **options)
+
+    def test_seed_fixed_counts(self):
+        """Test seeding creates the requested number of rows."""
+        self._seed(
+            users=3,
+            recipes_per_user=4,
+            tags_per_user=5,
+            ingredients_per_user=6,
+            tags_per_recipe=2,
+            ingredients_per_recipe=3,
+            distribution='fixed',
+            chunk_size=2,
+        )
+
+        self.assertEqual(get_user_model().objects.count(), 3)
+        self.assertEqual(Recipe.objects.count(), 12)
+        self.assertEqual(Tag.objects.count(), 15)
+        self.assertEqual(Ingredients.objects.count(), 18)
+        self.assertEqual(Recipe.tags.through.objects.count(), 24)
+        self.assertEqual(Recipe.ingredient.through.objects.count(), 36)
+        for recipe in Recipe.objects.prefetch_related('tags'):
+            for tag in recipe.tags.all():
+                self.assertEqual(tag.user_id, recipe.user_id)
+
+    def test_seed_is_deterministic(self):
+        """Test the same seed produces the same data."""
+        def snapshot():
+            return list(
+                Recipe.objects.order_by('id').values_list(
+                    'user__email', 'title', 'time_minutes', 'price'
+                )
+            )
+
+        self._seed(users=4, seed=42)
+        first = snapshot()
+        self._seed(users=4, seed=42, clear=True)
+
+        self.assertTrue(first)
+        self.assertEqual(snapshot(), first)
+        self.assertEqual(get_user_model().objects.count(), 4)
+
+    def test_seed_again_adds_users(self):
+        """Test seeding again without clearing numbers the new users on."""
+        self._seed(users=2)
+        self._seed(users=2)
+
+        self.assertEqual(
+            sorted(get_user_model().objects.values_list('email', flat=True)),
+            [f'user{i}@seed.example.com' for i in range(4)],
+        )
@@ -0,0 +1,122 @@
+"""
+Tests for response compression.
+"""
+import gzip
+from decimal import Decimal
+
+import brotli
+import zstandard
+
+from django.contrib.auth import get_user_model
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.middleware import CompressionMiddleware, choose_encoding
+from core.models import Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+DECOMPRESS = {
+    'gzip': gzip.decompress,
+    'br': brotli.decompress,
+    'zstd': lambda data: zstandard.ZstdDecompressor().decompressobj()
+    .decompress(data),
+}
+
+
+class NegotiationTests(SimpleTestCase):
+    """Test choosing a content encoding."""
+
+    def test_choose_encoding(self):
+        """Test client preferences and server order are respected."""
+        self.assertEqual(choose_encoding('gzip, deflate, br'), 'br')
+        self.assertEqual(choose_encoding('gzip, br;q=0.5'), 'gzip')
+        self.assertEqual(choose_encoding('zstd, br, gzip'), 'zstd')
+        self.assertEqual(choose_encoding('*'), 'zstd')
+        self.assertIsNone(choose_encoding('identity'))
+        self.assertIsNone(choose_encoding('gzip;q=0'))
+        self.assertIsNone(choose_encoding(''))
+
+    def _middleware(self, response):
+        return CompressionMiddleware(lambda request: response)
+
+    def test_streaming_response(self):
+        """Test streaming responses are compressed chunk by chunk."""
+        chunks = [b'{"id": %d}\n' % i for i in range(100)]
+        response = StreamingHttpResponse(
+            iter(chunks), content_type='application/json'
+        )
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+
+        res = self._middleware(response)(request)
+
+        self.assertEqual(res['Content-Encoding'], 'gzip')
+        body = b''.join(res.streaming_content)
+        self.assertEqual(gzip.decompress(body), b''.join(chunks))
+
+    def test_etag_made_weak(self):
+        """Test strong ETags are weakened on compressed responses."""
+        response = HttpResponse(
+            b'x' * 2048, content_type='application/json'
+        )
+        response['ETag'] = '"abc"'
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='br')
+
+        res = self._middleware(response)(request)
+
+        self.assertEqual(res['ETag'], 'W/"abc"')
+        self.assertEqual(res['Vary'], 'Accept-Encoding')
+
+    def test_incompressible_type_untouched(self):
+        """Test images are passed through unchanged."""
+        response = HttpResponse(b'x' * 2048, content_type='image/jpeg')
+        request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='gzip')
+
+        res = self._middleware(response)(request)
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertFalse(res.has_header('Vary'))
+
+
+class CompressionApiTests(TestCase):
+    """Test compression of API responses."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_large_list_compressed(self):
+        """Test large responses are compressed with each encoding."""
+        for i in range(50):
+            Recipe.objects.create(
+                user=self.user,
+                title=f'Recipe {i}',
+                time_minutes=5,
+                price=Decimal('1.50'),
+            )
+        plain = self.client.get(RECIPES_URL).content
+
+        for encoding, decompress in DECOMPRESS.items():
+            with self.subTest(encoding=encoding):
+                res = self.client.get(
+                    RECIPES_URL, HTTP_ACCEPT_ENCODING=encoding
+                )
+
+                self.assertEqual(res['Content-Encoding'], encoding)
+                self.assertIn('Accept-Encoding', res['Vary'])
+                self.assertLess(len(res.content), len(plain))
+                self.assertEqual(decompress(res.content), plain)
+
+    def test_small_response_not_compressed(self):
+        """Test responses under the size threshold are left alone."""
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT_ENCODING='gzip')
+
+        self.assertFalse(res.has_header('Content-Encoding'))
+        self.assertIn('Accept-Encoding', res['Vary'])
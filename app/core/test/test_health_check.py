@@ -1,14 +1,22 @@
 """
 Test for the health check api
 """
+import tempfile
+from unittest.mock import patch
 
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import TestCase, override_settings
 from django.urls import reverse
 
 from rest_framework import status
 from rest_framework.test import APIClient
 
-class HealthCheckTest(TestCase):
+from core.testing import BudgetMixin
+
+READY_URL = reverse('readiness-check')
+
+
+class HealthCheckTest(BudgetMixin, TestCase):
 
     def test_health_check(self):
         """Test health check api."""
@@ -16,4 +24,65 @@ class HealthCheckTest(TestCase):
         url = reverse('health-check')
         res= client.get(url)
 
-        self.assertEqual(res.status_code, status.HTTP_200_OK)
\ No newline at end of file
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+    def test_health_check_skips_middleware(self):
+        """Test liveness probe is answered before the middleware stack."""
+        client = APIClient()
+        res = client.get(reverse('health-check'), HTTP_HOST='10.0.0.1')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.json(), {'healthy': True})
+        self.assertNotIn('X-Frame-Options', res)
+
+    def test_health_check_budget(self):
+        """Test liveness probe never touches the database."""
+        client = APIClient()
+        self.assertWithinBudget(
+            'health-check', client.get, reverse('health-check')
+        )
+
+
+class ReadinessCheckTest(TestCase):
+    """Test the readiness probe."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.media_dir = tempfile.TemporaryDirectory()
+        self.override = override_settings(MEDIA_ROOT=self.media_dir.name)
+        self.override.enable()
+        cache.clear()
+
+    def tearDown(self):
+        self.override.disable()
+        self.media_dir.cleanup()
+        cache.clear()
+
+    def test_ready(self):
+        """Test readiness reports every dependency as available."""
+        res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertTrue(res.data['ready'])
+        checks = res.data['checks']
+        self.assertIn('latency_ms', checks['database'])
+        self.assertEqual(checks['migrations']['pending'], [])
+        self.assertTrue(checks['media']['ok'])
+
+    def test_media_not_writable(self):
+        """Test readiness fails when the media volume is missing."""
+        with override_settings(MEDIA_ROOT='/nonexistent/media'):
+            res = self.client.get(READY_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+        self.assertFalse(res.data['checks']['media']['ok'])
+
+    @patch('core.views._check_database')
+    def test_result_is_cached(self, patched_check):
+        """Test repeated probes reuse the cached result."""
+        patched_check.return_value = {'ok': True, 'latency_ms': 1.0}
+
+        self.client.get(READY_URL)
+        self.client.get(READY_URL)
+
+        patched_check.assert_called_once()
@@ -0,0 +1,177 @@
+"""
+Tests for Idempotency-Key handling.
+"""
+import tempfile
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import IdempotencyKey, Recipe
+
+RECIPES_URL = reverse('recipe:recipe-list')
+CREATE_USER_URL = reverse('user:create')
+
+PAYLOAD = {'title': 'Curry', 'time_minutes': 10, 'price': '4.50'}
+
+
+class IdempotencyTests(TestCase):
+    """Test replaying requests sent with an Idempotency-Key."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def _post(self, url, data, key, **kwargs):
+        kwargs.setdefault('format', 'json')
+        return self.client.post(url, data, HTTP_IDEMPOTENCY_KEY=key, **kwargs)
+
+    def test_retry_replays_recipe_create(self):
+        """Test a retried create returns the first response."""
+        first = self._post(RECIPES_URL, PAYLOAD, 'key-1')
+        second = self._post(RECIPES_URL, PAYLOAD, 'key-1')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_key_reused_for_different_request(self):
+        """Test reusing a key with another payload is rejected."""
+        self._post(RECIPES_URL, PAYLOAD, 'key-1')
+        res = self._post(RECIPES_URL, {**PAYLOAD, 'title': 'Other'}, 'key-1')
+
+        self.assertEqual(res.status_code, status.HTTP_422_UNPROCESSABLE_ENTITY)
+        self.assertEqual(Recipe.objects.count(), 1)
+
+    def test_without_key_not_stored(self):
+        """Test requests without the header behave as before."""
+        self.client.post(RECIPES_URL, PAYLOAD, format='json')
+        self.client.post(RECIPES_URL, PAYLOAD, format='json')
+
+        self.assertEqual(Recipe.objects.count(), 2)
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+    def test_keys_scoped_per_user(self):
+        """Test another user can use the same key independently."""
+        self._post(RECIPES_URL, PAYLOAD, 'key-1')
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123'
+        )
+        self.client.force_authenticate(other)
+        res = self._post(RECIPES_URL, PAYLOAD, 'key-1')
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(res.has_header('Idempotent-Replayed'))
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_expired_key_is_reused(self):
+        """Test keys past their TTL process the request again."""
+        self._post(RECIPES_URL, PAYLOAD, 'key-1')
+        IdempotencyKey.objects.update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+        self._post(RECIPES_URL, PAYLOAD, 'key-1')
+
+        self.assertEqual(Recipe.objects.count(), 2)
+
+    def test_create_user_replayed(self):
+        """Test user creation retries don't fail on the duplicate email."""
+        self.client.force_authenticate(None)
+        payload = {
+            'email': 'new@example.com', 'password': 'test123', 'name': 'New',
+        }
+        first = self._post(CREATE_USER_URL, payload, 'signup-1')
+        second = self._post(CREATE_USER_URL, payload, 'signup-1')
+
+        self.assertEqual(first.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(second.json(), first.json())
+
+    def test_upload_image_replayed(self):
+        """Test retried image uploads don't save the image again."""
+        recipe = Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=Decimal('1')
+        )
+        url = reverse('recipe:recipe-upload-image', args=[recipe.id])
+        with tempfile.TemporaryDirectory() as media, \
+                override_settings(MEDIA_ROOT=media):
+            with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+                Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+                image_file.seek(0)
+                first = self._post(
+                    url, {'image': image_file}, 'img-1', format='multipart'
+                )
+                image_file.seek(0)
+                second = self._post(
+                    url, {'image': image_file}, 'img-1', format='multipart'
+                )
+
+        self.assertEqual(first.status_code, status.HTTP_200_OK)
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['Idempotent-Replayed'], 'true')
+
+    def test_clear_expired_keys(self):
+        """Test the cleanup command removes only expired keys."""
+        self._post(RECIPES_URL, PAYLOAD, 'old')
+        self._post(RECIPES_URL, PAYLOAD, 'new')
+        IdempotencyKey.objects.filter(key='old').update(
+            created_at=timezone.now() - timedelta(days=2)
+        )
+
+        call_command('clear_idempotency_keys', stdout=StringIO())
+
+        self.assertEqual(
+            list(IdempotencyKey.objects.values_list('key', flat=True)),
+            ['new'],
+        )
+
+
+class ConcurrentIdempotencyTests(TransactionTestCase):
+    """Test concurrent duplicates wait for the first request."""
+
+    def test_concurrent_duplicates_create_once(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        responses = []
+
+        def send():
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                responses.append(client.post(
+                    RECIPES_URL, PAYLOAD, format='json',
+                    HTTP_IDEMPOTENCY_KEY='race',
+                ))
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=send) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            [res.status_code for res in responses], [201] * 4
+        )
+        self.assertEqual(len({res.json()['id'] for res in responses}), 1)
+        self.assertEqual(Recipe.objects.count(), 1)
@@ -0,0 +1,124 @@
+"""
+Tests for the database backed job queue.
+"""
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from core import jobs
+from core.models import Job, Tag
+
+
+@jobs.job
+def create_tag(user_id, name):
+    Tag.objects.create(user_id=user_id, name=name)
+
+
+@jobs.job(max_attempts=2)
+def explode():
+    raise RuntimeError('Boom')
+
+
+class JobQueueTests(TestCase):
+    """Test enqueuing and running jobs."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+
+    def test_run_job(self):
+        """Test a job runs once and leaves the queue."""
+        jobs.enqueue(create_tag, user_id=self.user.id, name='Vegan')
+
+        self.assertTrue(jobs.run_next())
+        self.assertFalse(jobs.run_next())
+        self.assertTrue(Tag.objects.filter(name='Vegan').exists())
+        self.assertFalse(Job.objects.exists())
+
+    def test_priority_order(self):
+        """Test higher priority jobs run first."""
+        jobs.enqueue(create_tag, user_id=self.user.id, name='Low')
+        jobs.enqueue(
+            create_tag, priority=10, user_id=self.user.id, name='High'
+        )
+
+        jobs.run_next()
+
+        self.assertEqual(
+            list(Tag.objects.values_list('name', flat=True)), ['High']
+        )
+
+    def test_delayed_job_waits(self):
+        """Test jobs don't run before their delay elapses."""
+        jobs.enqueue(create_tag, delay=60, user_id=self.user.id, name='Late')
+
+        self.assertFalse(jobs.run_next())
+
+    def test_failed_job_retried_with_backoff(self):
+        """Test failures are retried later, then marked as failed."""
+        jobs.enqueue(explode)
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run_next()
+        job = Job.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Boom', job.last_error)
+
+        Job.objects.update(run_at=timezone.now())
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run_next()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertFalse(jobs.run_next())
+
+    def test_failed_job_rolled_back(self):
+        """Test a failing job leaves no partial writes."""
+
+        jobs.enqueue(create_tag, user_id=0, name='Orphan')
+
+        with self.assertLogs('core.jobs', 'ERROR'):
+            jobs.run_next()
+
+        self.assertFalse(Tag.objects.exists())
+        self.assertEqual(Job.objects.get().attempts, 1)
+
+    def test_retry_delay_is_capped(self):
+        """Test the backoff doubles up to its maximum."""
+        self.assertEqual(jobs.retry_delay(1), timedelta(seconds=10))
+        self.assertEqual(jobs.retry_delay(3), timedelta(seconds=40))
+        self.assertEqual(jobs.retry_delay(20), timedelta(hours=1))
+
+    def test_enqueue_unregistered(self):
+        """Test only registered functions can be enqueued."""
+        with self.assertRaises(ValueError):
+            jobs.enqueue(print)
+
+
+class RunWorkerTests(TransactionTestCase):
+    """Test the run_worker command."""
+
+    def test_concurrent_workers_run_each_job_once(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        for i in range(20):
+            jobs.enqueue(create_tag, user_id=user.id, name=f'Tag {i}')
+        out = StringIO()
+
+        call_command('run_worker', concurrency=4, burst=True, stdout=out)
+        connection.close()
+
+        self.assertIn('Processed 20 jobs.', out.getvalue())
+        self.assertEqual(Tag.objects.count(), 20)
+        self.assertEqual(
+            Tag.objects.values('name').distinct().count(), 20
+        )
+        self.assertFalse(Job.objects.exists())
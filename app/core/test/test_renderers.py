@@ -0,0 +1,111 @@
+"""
+Tests for the JSON and MessagePack renderers and parsers.
+"""
+from decimal import Decimal
+from io import StringIO
+
+import msgpack
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from core import benchmark
+from core.models import Recipe
+from core.renderers import ORJSONRenderer
+
+RECIPES_URL = reverse('recipe:recipe-list')
+
+
+class RendererTests(SimpleTestCase):
+    """Test rendering payloads."""
+
+    def test_orjson_matches_drf_output(self):
+        """Test orjson renders the same bytes as DRF's renderer."""
+        payload = benchmark.recipe_payload(20)
+
+        self.assertEqual(
+            ORJSONRenderer().render(payload),
+            JSONRenderer().render(payload),
+        )
+
+    def test_orjson_renders_decimal(self):
+        """Test Decimal values fall back to DRF's encoding."""
+        data = ORJSONRenderer().render({'price': Decimal('5.50')})
+
+        self.assertEqual(data, b'{"price":5.5}')
+
+    def test_orjson_renders_wide_integers(self):
+        """Test integers beyond 64 bits fall back to DRF's renderer."""
+        payload = {'missing': [2 ** 64, 1]}
+
+        self.assertEqual(
+            ORJSONRenderer().render(payload),
+            JSONRenderer().render(payload),
+        )
+
+    def test_benchmark_renderers(self):
+        """Test the renderer benchmark command runs."""
+        out = StringIO()
+        call_command('benchmark_renderers', sizes='10', repeat=1, stdout=out)
+
+        self.assertIn('orjson', out.getvalue())
+        self.assertIn('msgpack', out.getvalue())
+
+
+class ContentNegotiationTests(TestCase):
+    """Test formats negotiated through the API."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com',
+            'testpass123',
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_list_as_msgpack(self):
+        """Test recipes can be fetched as MessagePack."""
+        Recipe.objects.create(
+            user=self.user, title='Curry', time_minutes=5, price=Decimal('1.5')
+        )
+
+        res = self.client.get(RECIPES_URL, HTTP_ACCEPT='application/msgpack')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'application/msgpack')
+        data = msgpack.unpackb(res.content, raw=False)
+        self.assertEqual(data[0]['title'], 'Curry')
+        self.assertEqual(data[0]['price'], '1.50')
+
+    def test_create_from_msgpack(self):
+        """Test recipes can be created from a MessagePack body."""
+        payload = {
+            'title': 'Curry',
+            'time_minutes': 5,
+            'price': '1.50',
+            'tags': [{'name': 'Thai'}],
+        }
+
+        res = self.client.post(
+            RECIPES_URL,
+            msgpack.packb(payload),
+            content_type='application/msgpack',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_201_CREATED)
+        recipe = Recipe.objects.get(id=res.data['id'])
+        self.assertEqual(recipe.tags.get().name, 'Thai')
+
+    def test_invalid_json(self):
+        """Test malformed JSON bodies are rejected."""
+        res = self.client.post(
+            RECIPES_URL, '{"title": ', content_type='application/json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,63 @@
+"""
+Tests for the prebuilt OpenAPI schema.
+"""
+from io import StringIO
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+from core import schema
+
+SCHEMA_URL = reverse('api-schema')
+
+
+class BuildSchemaTests(SimpleTestCase):
+    """Test the build_schema command."""
+
+    def test_committed_schema_up_to_date(self):
+        """Fails when the API changed without running build_schema."""
+        call_command('build_schema', '--check', stdout=StringIO())
+
+    def test_check_stale_schema(self):
+        rendered = schema.render()
+        rendered['schema/openapi.yaml'] += b'\n'
+
+        with patch('core.schema.render', return_value=rendered), \
+                self.assertRaisesMessage(CommandError, 'openapi.yaml'):
+            call_command('build_schema', '--check', stdout=StringIO())
+
+
+class SchemaViewTests(SimpleTestCase):
+    """Test serving the prebuilt schema."""
+
+    def test_proxy_sends_schema(self):
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res['Content-Type'], 'application/vnd.oai.openapi')
+        self.assertEqual(
+            res['X-Accel-Redirect'], '/protected/static/schema/openapi.yaml'
+        )
+        self.assertEqual(res.content, b'')
+
+    def test_proxy_sends_json_schema(self):
+        res = self.client.get(SCHEMA_URL, {'format': 'json'})
+
+        self.assertEqual(
+            res['Content-Type'], 'application/vnd.oai.openapi+json'
+        )
+        self.assertEqual(
+            res['X-Accel-Redirect'], '/protected/static/schema/openapi.json'
+        )
+
+    @override_settings(DEBUG=True)
+    def test_schema_served_without_proxy(self):
+        res = self.client.get(SCHEMA_URL)
+
+        self.assertEqual(
+            b''.join(res.streaming_content),
+            (schema.STATIC_DIR / 'schema/openapi.yaml').read_bytes(),
+        )
@@ -0,0 +1,86 @@
+"""
+Tests for the static and media files storage.
+"""
+import gzip
+import os
+import tempfile
+from unittest.mock import patch
+from urllib.parse import parse_qs
+
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+
+from core.storage import SignedFileSystemStorage, media_signature
+
+CSS = b'body { color: #333; }\n' * 50
+
+
+class CompressedManifestStorageTests(SimpleTestCase):
+    """Test collectstatic output."""
+
+    def setUp(self):
+        self.source = tempfile.TemporaryDirectory()
+        self.root = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.source.name, 'app.css'), 'wb') as f:
+            f.write(CSS)
+        with open(os.path.join(self.source.name, 'tiny.js'), 'wb') as f:
+            f.write(b'let a = 1;\n')
+        self.override = override_settings(
+            STATIC_ROOT=self.root.name,
+            STATICFILES_DIRS=[self.source.name],
+            STATICFILES_FINDERS=[
+                'django.contrib.staticfiles.finders.FileSystemFinder',
+            ],
+        )
+        self.override.enable()
+
+    def tearDown(self):
+        self.override.disable()
+        self.source.cleanup()
+        self.root.cleanup()
+
+    def test_unhashed_before_collectstatic(self):
+        """Test plain names are used while there is no manifest."""
+        self.assertEqual(staticfiles_storage.url('app.css'),
+                         '/static/static/app.css')
+
+    def test_collectstatic_hashes_and_compresses(self):
+        """Test hashed files get gzip siblings nginx can serve."""
+        call_command('collectstatic', interactive=False, verbosity=0)
+
+        hashed = staticfiles_storage.stored_name('app.css')
+        self.assertRegex(hashed, r'^app\.[0-9a-f]{12}\.css$')
+        path = os.path.join(self.root.name, hashed)
+        with open(f'{path}.gz', 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), CSS)
+        self.assertFalse(os.path.exists(f'{path}.br'))
+
+        tiny = os.path.join(
+            self.root.name, staticfiles_storage.stored_name('tiny.js')
+        )
+        self.assertFalse(os.path.exists(f'{tiny}.gz'))
+
+
+@override_settings(MEDIA_URL_SECRET='secret', MEDIA_URL_EXPIRE=3600)
+class SignedFileSystemStorageTests(SimpleTestCase):
+    """Test media URLs nginx's secure_link can validate."""
+
+    def test_signature_matches_nginx(self):
+        """Test the signature of the nginx secure_link documentation."""
+        self.assertEqual(
+            media_signature('/s/link127.0.0.1', 2147483647),
+            '_e4Nc3iduzkWRm01TBBNYw',
+        )
+
+    @patch('core.storage.time.time', return_value=7300)
+    def test_url_signed_until_rounded_expiry(self, _):
+        storage = SignedFileSystemStorage()
+
+        url = storage.url('uploads/recipe/photo.jpg')
+
+        path, query = url.split('?')
+        self.assertEqual(path, '/static/media/uploads/recipe/photo.jpg')
+        params = parse_qs(query)
+        self.assertEqual(params['expires'], ['14400'])
+        self.assertEqual(params['md5'], [media_signature(path, 14400)])
@@ -0,0 +1,28 @@
+"""
+Tests for the request budget helpers.
+"""
+import time
+
+from django.http import HttpResponse
+from django.test import TestCase, override_settings
+
+from core.testing import BUDGETS, BudgetMixin
+
+
+def slow_request():
+    """Return a response slower than the health check budget."""
+    time.sleep(BUDGETS['health-check'].milliseconds / 1000 * 1.5)
+    return HttpResponse()
+
+
+class BudgetMixinTests(BudgetMixin, TestCase):
+    """Test budgets are checked against requests."""
+
+    def test_latency_not_enforced_by_default(self):
+        """Test slow requests pass unless latency budgets are enforced."""
+        self.assertWithinBudget('health-check', slow_request)
+
+    @override_settings(ENFORCE_LATENCY_BUDGETS=True)
+    def test_latency_enforced(self):
+        with self.assertRaisesMessage(AssertionError, 'budget is'):
+            self.assertWithinBudget('health-check', slow_request)
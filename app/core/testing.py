@@ -0,0 +1,107 @@
+"""
+Helpers for enforcing query and latency budgets in tests.
+"""
+import re
+import time
+from collections import Counter
+from dataclasses import dataclass
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from core.management.commands.seed_recipes import SEED_EMAIL_DOMAIN
+
+
+@dataclass(frozen=True)
+class Budget:
+    """Maximum cost of one request to an endpoint.
+
+    ``milliseconds`` is only enforced with ``ENFORCE_LATENCY_BUDGETS``.
+    """
+    queries: int
+    milliseconds: float = None
+
+
+# Budgets hold regardless of how many rows the endpoint returns.
+BUDGETS = {
+    'health-check': Budget(queries=0, milliseconds=50),
+    'user:create': Budget(queries=2),
+    'user:token': Budget(queries=3),
+    'user:me': Budget(queries=0, milliseconds=100),
+    'recipe:recipe-list': Budget(queries=2, milliseconds=1000),
+    'recipe:recipe-detail': Budget(queries=2, milliseconds=200),
+    'recipe:recipe-batch': Budget(queries=2, milliseconds=500),
+    'recipe:recipe-bulk-update': Budget(queries=12, milliseconds=1000),
+    'recipe:sync': Budget(queries=6, milliseconds=1000),
+    'recipe:tag-list': Budget(queries=1, milliseconds=500),
+    'recipe:ingredients-list': Budget(queries=1, milliseconds=500),
+}
+
+
+def seed(**options):
+    """Seed the shared synthetic dataset and return the first user."""
+    options.setdefault('distribution', 'fixed')
+    call_command('seed_recipes', clear=True, stdout=StringIO(), **options)
+    return get_user_model().objects.get(email=f'user0@{SEED_EMAIL_DOMAIN}')
+
+
+TRANSACTION_CONTROL = (
+    'SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO SAVEPOINT',
+)
+
+
+def _describe(queries):
+    """Format captured queries, repeated statements first."""
+    repeated = Counter(re.sub(r'\b\d+\b', '?', q['sql']) for q in queries)
+    lines = [f'{len(queries)} queries executed:']
+    lines.extend(
+        f'  {i}. {q["sql"]}' for i, q in enumerate(queries, start=1)
+    )
+    statement, count = repeated.most_common(1)[0] if queries else ('', 0)
+    if count > 1:
+        lines.append(f'Repeated {count} times: {statement}')
+    return '\n'.join(lines)
+
+
+class BudgetMixin:
+    """Assert requests stay within the budget declared for an endpoint."""
+
+    def assertWithinBudget(self, endpoint, request, *args, **kwargs):
+        """Call ``request`` and check it against the ``endpoint`` budget.
+
+        Returns the response so callers can make further assertions.
+        """
+        budget = BUDGETS[endpoint]
+        with CaptureQueriesContext(connection) as captured:
+            start = time.perf_counter()
+            response = request(*args, **kwargs)
+            elapsed = (time.perf_counter() - start) * 1000
+        queries = [
+            q for q in captured.captured_queries
+            if not q['sql'].startswith(TRANSACTION_CONTROL)
+        ]
+
+        self.assertLess(
+            response.status_code, 400, f'{endpoint} failed: {response}'
+        )
+        self.assertLessEqual(
+            len(queries),
+            budget.queries,
+            f'{endpoint} exceeded its budget of {budget.queries} queries.\n'
+            + _describe(queries),
+        )
+        if (
+            settings.ENFORCE_LATENCY_BUDGETS
+            and budget.milliseconds is not None
+        ):
+            self.assertLessEqual(
+                elapsed,
+                budget.milliseconds,
+                f'{endpoint} took {elapsed:.1f}ms, budget is '
+                f'{budget.milliseconds}ms.',
+            )
+        return response
@@ -1,8 +1,130 @@
 """Core views for app"""
-from rest_framework.decorators import api_view
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import cache
+from django.db import connection, DatabaseError
+from django.db.migrations.executor import MigrationExecutor
+from django.http import FileResponse, HttpResponse
+from django.views.decorators.http import require_safe
+
+from rest_framework import status
+from rest_framework.decorators import (
+    api_view,
+    authentication_classes,
+    permission_classes,
+)
 from rest_framework.response import Response
+from drf_spectacular.utils import extend_schema, OpenApiTypes
+
+from core import schema
+
+READINESS_CACHE_KEY = 'core:readiness-check'
 
+
+@extend_schema(responses=OpenApiTypes.OBJECT)
 @api_view(['GET'])
 def health_check(request):
     """Returns succesful response."""
     return Response({'healthy':True})
+
+
+def _check_database():
+    """Measure the round trip of a trivial query."""
+    start = time.perf_counter()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT 1')
+            cursor.fetchone()
+    except DatabaseError as exc:
+        return {'ok': False, 'error': str(exc)}
+
+    latency = (time.perf_counter() - start) * 1000
+    return {'ok': True, 'latency_ms': round(latency, 2)}
+
+
+def _check_migrations():
+    """Report migrations that have not been applied yet."""
+    try:
+        executor = MigrationExecutor(connection)
+        targets = executor.loader.graph.leaf_nodes()
+        plan = executor.migration_plan(targets)
+    except DatabaseError as exc:
+        return {'ok': False, 'error': str(exc)}
+
+    pending = [f'{migration.app_label}.{migration.name}'
+               for migration, backwards in plan]
+    return {'ok': not pending, 'pending': pending}
+
+
+def _check_media():
+    """Check the media volume accepts writes."""
+    try:
+        with tempfile.NamedTemporaryFile(dir=settings.MEDIA_ROOT) as probe:
+            probe.write(b'ok')
+            probe.flush()
+    except OSError as exc:
+        return {'ok': False, 'error': str(exc)}
+
+    return {'ok': True}
+
+
+def get_readiness():
+    """Run every readiness check, reusing a recent result if cached."""
+    result = cache.get(READINESS_CACHE_KEY)
+    if result is not None:
+        return result
+
+    checks = {'database': _check_database()}
+    if checks['database']['ok']:
+        checks['migrations'] = _check_migrations()
+    else:
+        checks['migrations'] = {'ok': False, 'error': 'database unavailable'}
+    checks['media'] = _check_media()
+
+    result = {
+        'ready': all(check['ok'] for check in checks.values()),
+        'checks': checks,
+    }
+    cache.set(READINESS_CACHE_KEY, result, settings.READINESS_CACHE_SECONDS)
+    return result
+
+
+@extend_schema(responses=OpenApiTypes.OBJECT)
+@api_view(['GET'])
+@authentication_classes([])
+@permission_classes([])
+def readiness_check(request):
+    """Returns the status of the services the app depends on."""
+    result = get_readiness()
+    if result['ready']:
+        return Response(result, status=status.HTTP_200_OK)
+
+    return Response(result, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+
+
+@require_safe
+def api_schema(request):
+    """Serve the prebuilt OpenAPI schema.
+
+    The proxy sends the collected file, precompressed and with an ETag,
+    from the internal location named in ``X-Accel-Redirect``.
+    """
+    name, renderer = schema.FORMATS.get(
+        request.GET.get('format'), schema.FORMATS['openapi']
+    )
+    if settings.DEBUG:
+        # The development server runs without the proxy.
+        return FileResponse(
+            open(finders.find(name), 'rb'), content_type=renderer.media_type
+        )
+    response = HttpResponse(content_type=renderer.media_type)
+    url = staticfiles_storage.url(name)
+    response['X-Accel-Redirect'] = (
+        settings.STATIC_ACCEL_REDIRECT_PREFIX + url[len(settings.STATIC_URL):]
+    )
+    response['Cache-Control'] = 'no-cache'
+    return response
@@ -0,0 +1,91 @@
+"""
+Set-based bulk operations on recipes.
+"""
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from core.models import Recipe, Tag, Ingredients
+from recipe import events
+
+# Serializer field -> (Recipe many to many field, related model).
+RELATIONS = {
+    'tags': ('tags', Tag),
+    'ingredients': ('ingredient', Ingredients),
+}
+
+
+def _ids_by_name(model, user, names):
+    """Return ``{name: id}`` for ``names``, creating the missing rows."""
+    ids = {}
+    existing = model.objects.filter(user=user, name__in=names).order_by('id')
+    for pk, name in existing.values_list('id', 'name'):
+        ids.setdefault(name, pk)
+
+    missing = [name for name in dict.fromkeys(names) if name not in ids]
+    created = model.objects.bulk_create(
+        [model(user=user, name=name) for name in missing]
+    )
+    ids.update((obj.name, obj.id) for obj in created)
+    events.publish(user.id, model, events.CREATED, [obj.id for obj in created])
+    return ids
+
+
+def _update_fields(items):
+    """Update scalar fields, the version and modification time of every
+    item with one UPDATE statement."""
+    values = {}
+    for item in items:
+        for name, value in item.items():
+            if name != 'id' and name not in RELATIONS:
+                values.setdefault(name, {})[item['id']] = value
+
+    changes = {}
+    for name, by_id in values.items():
+        field = Recipe._meta.get_field(name)
+        changes[name] = Case(
+            *[When(id=pk, then=Value(value, output_field=field))
+              for pk, value in by_id.items()],
+            default=F(name),
+            output_field=field,
+        )
+    Recipe.objects.filter(id__in=[item['id'] for item in items]).update(
+        version=F('version') + 1, updated_at=timezone.now(), **changes
+    )
+
+
+def _replace_links(field, model, user, names_by_recipe):
+    """Replace the related rows of each recipe with the named ones."""
+    relation = getattr(Recipe, field)
+    through = relation.through
+    column = relation.field.m2m_reverse_name()
+    ids = _ids_by_name(
+        model,
+        user,
+        [name for names in names_by_recipe.values() for name in names],
+    )
+
+    through.objects.filter(recipe_id__in=list(names_by_recipe)).delete()
+    through.objects.bulk_create([
+        through(recipe_id=recipe_id, **{column: ids[name]})
+        for recipe_id, names in names_by_recipe.items()
+        for name in dict.fromkeys(names)
+    ])
+
+
+def bulk_update(user, items):
+    """Apply validated partial updates, each holding the recipe ``id``.
+
+    Must run inside a transaction; recipe ownership is checked by the
+    caller.
+    """
+    _update_fields(items)
+    events.publish(
+        user.id, Recipe, events.UPDATED, [item['id'] for item in items]
+    )
+    for key, (field, model) in RELATIONS.items():
+        names_by_recipe = {
+            item['id']: [related['name'] for related in item[key]]
+            for item in items if key in item
+        }
+        if names_by_recipe:
+            _replace_links(field, model, user, names_by_recipe)
@@ -0,0 +1,85 @@
+"""
+Publish changes to recipes, tags and ingredients over Postgres NOTIFY.
+
+Events are held by a commit hook of the transaction that published
+them, so a rollback drops them with the hook. Once it commits they are
+sent in batches, reaching listeners in every worker only for committed
+changes. They are hints to refresh: clients fetch the data itself with
+the sync endpoint.
+"""
+import functools
+import json
+
+from django.db import connection, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from core.models import Recipe, Tag, Ingredients, Tombstone
+
+CHANNEL = 'recipe_events'
+
+CREATED = 'created'
+UPDATED = 'updated'
+DELETED = 'deleted'
+
+# NOTIFY payloads must stay below 8000 bytes.
+EVENTS_PER_NOTIFY = 50
+
+KINDS = {
+    Recipe: Tombstone.RECIPES,
+    Tag: Tombstone.TAGS,
+    Ingredients: Tombstone.INGREDIENTS,
+}
+
+
+def publish(user_id, model, event, ids):
+    """Send ``event`` for the ``model`` rows with ``ids`` of a user once
+    the current transaction commits."""
+    if connection.vendor != 'postgresql':
+        return
+    payloads = [
+        {'user': user_id, 'kind': KINDS[model], 'id': pk, 'event': event}
+        for pk in dict.fromkeys(ids)
+    ]
+    if payloads:
+        transaction.on_commit(functools.partial(send, payloads))
+
+
+def send(payloads):
+    """Send event ``payloads`` in as few notifications as possible."""
+    with connection.cursor() as cursor:
+        for start in range(0, len(payloads), EVENTS_PER_NOTIFY):
+            cursor.execute(
+                'SELECT pg_notify(%s, %s)',
+                [CHANNEL, json.dumps(
+                    payloads[start:start + EVENTS_PER_NOTIFY]
+                )],
+            )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=Ingredients)
+def _saved(sender, instance, created, **kwargs):
+    publish(
+        instance.user_id, sender, CREATED if created else UPDATED,
+        [instance.pk],
+    )
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredients)
+def _deleted(sender, instance, **kwargs):
+    publish(instance.user_id, sender, DELETED, [instance.pk])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.ingredient.through)
+def _links_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        publish(instance.user_id, Recipe, UPDATED, [instance.pk])
+    elif pk_set:
+        publish(instance.user_id, Recipe, UPDATED, pk_set)
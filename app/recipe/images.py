@@ -0,0 +1,180 @@
+"""
+Validation and sanitizing of uploaded recipe images.
+
+Uploads are checked from their headers alone, so oversized images are
+rejected before any pixel is decoded. Metadata is then stripped by
+copying the file segment by segment; only images that must be rotated
+upright are decoded, within the pixel limit.
+"""
+import os
+import shutil
+
+from PIL import Image, ImageOps
+
+from django.conf import settings
+from django.core.files.uploadedfile import TemporaryUploadedFile
+
+# Accepted formats and the extension they are stored with.
+FORMATS = {
+    'JPEG': '.jpg',
+    'PNG': '.png',
+    'WEBP': '.webp',
+}
+
+EXIF_ORIENTATION = 0x0112
+
+JPEG_START_OF_IMAGE = b'\xff\xd8'
+# JPEG APP1 (Exif, XMP) and APP13 (IPTC) segments carry the metadata.
+JPEG_METADATA_MARKERS = {0xE1, 0xED}
+JPEG_STANDALONE_MARKERS = {0x01, *range(0xD0, 0xD8)}
+JPEG_START_OF_SCAN = 0xDA
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+PNG_METADATA_CHUNKS = {b'eXIf', b'tEXt', b'zTXt', b'iTXt', b'tIME'}
+
+COPY_CHUNK_SIZE = 64 * 1024
+
+
+class InvalidImage(ValueError):
+    """The upload isn't an image the API accepts."""
+
+
+def _open(upload):
+    if hasattr(upload, 'temporary_file_path'):
+        return Image.open(upload.temporary_file_path())
+    upload.seek(0)
+    return Image.open(upload)
+
+
+def probe(upload):
+    """Return the format, size and EXIF orientation of ``upload``.
+
+    Only the headers are read. Raises ``InvalidImage`` when the image
+    breaks the configured limits.
+    """
+    if upload.size > settings.RECIPE_IMAGE_MAX_BYTES:
+        raise InvalidImage(
+            f'Images must be at most {settings.RECIPE_IMAGE_MAX_BYTES} bytes.'
+        )
+    too_large = InvalidImage(
+        f'Images must be at most {settings.RECIPE_IMAGE_MAX_PIXELS} pixels.'
+    )
+    try:
+        with _open(upload) as image:
+            image_format = image.format
+            width, height = image.size
+            exif = image.info.get('exif')
+    except Image.DecompressionBombError:
+        raise too_large
+    except Exception:
+        raise InvalidImage('Upload a valid image.')
+
+    if image_format not in FORMATS:
+        raise InvalidImage(f'Supported formats are {", ".join(FORMATS)}.')
+    if width * height > settings.RECIPE_IMAGE_MAX_PIXELS:
+        raise too_large
+    return image_format, (width, height), _orientation(exif)
+
+
+def _orientation(exif):
+    """Return the orientation in raw ``exif`` data.
+
+    ``Image.getexif()`` isn't used as it decodes PNGs whose EXIF chunk
+    follows the pixel data.
+    """
+    if not exif:
+        return 1
+    data = Image.Exif()
+    try:
+        data.load(exif)
+    except Exception:
+        return 1
+    return data.get(EXIF_ORIENTATION, 1)
+
+
+def _read(src, size):
+    data = src.read(size)
+    if len(data) != size:
+        raise InvalidImage('Upload a valid image.')
+    return data
+
+
+def _strip_jpeg(src, dst):
+    """Copy a JPEG leaving out its metadata segments."""
+    if _read(src, 2) != JPEG_START_OF_IMAGE:
+        raise InvalidImage('Upload a valid image.')
+    dst.write(JPEG_START_OF_IMAGE)
+    while True:
+        marker = _read(src, 2)
+        if marker[0] != 0xFF:
+            raise InvalidImage('Upload a valid image.')
+        # Markers may be preceded by any number of 0xFF fill bytes.
+        while marker[1] == 0xFF:
+            marker = marker[1:] + _read(src, 1)
+        if marker[1] in JPEG_STANDALONE_MARKERS:
+            dst.write(marker)
+            continue
+        length = _read(src, 2)
+        payload = _read(src, int.from_bytes(length, 'big') - 2)
+        if marker[1] not in JPEG_METADATA_MARKERS:
+            dst.write(marker + length + payload)
+        if marker[1] == JPEG_START_OF_SCAN:
+            shutil.copyfileobj(src, dst, COPY_CHUNK_SIZE)
+            return
+
+
+def _strip_png(src, dst):
+    """Copy a PNG leaving out its metadata chunks."""
+    if _read(src, 8) != PNG_SIGNATURE:
+        raise InvalidImage('Upload a valid image.')
+    dst.write(PNG_SIGNATURE)
+    while True:
+        header = _read(src, 8)
+        length = int.from_bytes(header[:4], 'big')
+        chunk_type = header[4:]
+        if chunk_type in PNG_METADATA_CHUNKS:
+            src.seek(length + 4, os.SEEK_CUR)
+            continue
+        dst.write(header)
+        remaining = length + 4
+        while remaining:
+            data = _read(src, min(remaining, COPY_CHUNK_SIZE))
+            dst.write(data)
+            remaining -= len(data)
+        if chunk_type == b'IEND':
+            return
+
+
+def _reencode(upload, image_format, dst):
+    """Decode, rotate upright and save the image without metadata."""
+    with _open(upload) as image:
+        image = ImageOps.exif_transpose(image)
+        options = {}
+        if 'icc_profile' in image.info:
+            options['icc_profile'] = image.info['icc_profile']
+        if image_format in ('JPEG', 'WEBP'):
+            options['quality'] = 90
+        image.save(dst, image_format, **options)
+
+
+def sanitize(upload):
+    """Return a copy of ``upload`` that is safe to store.
+
+    The copy is upright, has no metadata and carries the extension of
+    its format. Raises ``InvalidImage`` for uploads that must not be
+    stored.
+    """
+    image_format, _, orientation = probe(upload)
+    name = os.path.splitext(upload.name)[0] + FORMATS[image_format]
+    clean = TemporaryUploadedFile(
+        name, Image.MIME[image_format], 0, None
+    )
+    if orientation != 1 or image_format == 'WEBP':
+        _reencode(upload, image_format, clean.file)
+    else:
+        upload.seek(0)
+        strip = _strip_jpeg if image_format == 'JPEG' else _strip_png
+        strip(upload, clean.file)
+    clean.size = clean.file.tell()
+    clean.seek(0)
+    return clean
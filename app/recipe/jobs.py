@@ -0,0 +1,62 @@
+"""
+Background jobs of the recipe app.
+"""
+import os
+import shutil
+
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import TemporaryUploadedFile
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from core import jobs
+from core.models import Recipe, recipe_image_file_path
+from recipe import events, images
+
+
+def _download(name):
+    """Copy the stored image ``name`` to a temporary upload."""
+    upload = TemporaryUploadedFile(os.path.basename(name), None, 0, None)
+    with default_storage.open(name) as stored:
+        shutil.copyfileobj(stored, upload.file, images.COPY_CHUNK_SIZE)
+    upload.size = upload.file.tell()
+    upload.seek(0)
+    return upload
+
+
+@jobs.job
+def verify_image(recipe_id, name):
+    """Sanitize the image uploaded to storage as ``name`` and set it.
+
+    The upload itself is always deleted: only the sanitized copy is ever
+    recorded on the recipe, and nothing is recorded when it's invalid.
+    """
+    user_id = Recipe.objects.filter(pk=recipe_id).values_list(
+        'user_id', flat=True
+    ).first()
+    if user_id is None:
+        default_storage.delete(name)
+        return
+
+    with _download(name) as upload:
+        try:
+            clean = images.sanitize(upload)
+        except images.InvalidImage:
+            clean = None
+    transaction.on_commit(lambda: default_storage.delete(name))
+    if clean is None:
+        return
+
+    with clean:
+        clean_name = default_storage.save(
+            recipe_image_file_path(None, clean.name), clean
+        )
+    if Recipe.objects.filter(pk=recipe_id).update(
+        image=clean_name,
+        version=F('version') + 1,
+        updated_at=timezone.now(),
+    ):
+        events.publish(user_id, Recipe, events.UPDATED, [recipe_id])
+    else:
+        default_storage.delete(clean_name)
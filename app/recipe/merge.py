@@ -0,0 +1,47 @@
+"""
+Merging duplicate tags or ingredients into one.
+"""
+from django.db import connection
+
+from core.models import Recipe, Tag, Ingredients
+
+# Related model -> Recipe many to many field.
+FIELDS = {
+    Tag: 'tags',
+    Ingredients: 'ingredient',
+}
+
+
+def merge(target, source_ids):
+    """Merge the rows with ``source_ids`` into ``target`` and delete them.
+
+    Recipes are relinked with a single INSERT ... SELECT that skips the
+    recipes already linked to ``target``, and the sources are deleted
+    along with their links, however many recipes they have. Must run
+    inside a transaction; ownership is checked by the caller.
+    """
+    model = type(target)
+    source_ids = [pk for pk in dict.fromkeys(source_ids) if pk != target.id]
+    if not source_ids:
+        return
+    # Lock in a consistent order so concurrent merges can't deadlock.
+    list(
+        model.objects.select_for_update()
+        .filter(id__in=[target.id, *source_ids])
+        .order_by('id')
+        .values_list('id', flat=True)
+    )
+
+    field = getattr(Recipe, FIELDS[model]).field
+    table = connection.ops.quote_name(field.m2m_db_table())
+    recipe_column = connection.ops.quote_name(field.m2m_column_name())
+    related_column = connection.ops.quote_name(field.m2m_reverse_name())
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {table} ({recipe_column}, {related_column}) '
+            f'SELECT DISTINCT {recipe_column}, %s FROM {table} '
+            f'WHERE {related_column} = ANY(%s) '
+            f'ON CONFLICT DO NOTHING',
+            [target.id, source_ids],
+        )
+    model.objects.filter(id__in=source_ids).delete()
@@ -1,14 +1,53 @@
 """
 Serializer for recipes.
 """
+from django.conf import settings
 from rest_framework import serializers
 
 from core.models import Recipe
 from core.models import Tag
 from core.models import Ingredients
+from recipe import images, uploads
 
+READ_METHODS = ('GET', 'HEAD')
 
-class IngredientsSerializer(serializers.ModelSerializer):
+
+def _parse_names(value):
+    """Split a comma separated query parameter into a set of names.
+
+    Returns ``None`` when it names nothing, as if it was left out.
+    """
+    if value is None:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()} or None
+
+
+def selected_fields(request, names):
+    """Return the field ``names`` kept by ``?fields=`` and ``?omit=``."""
+    if request is None or request.method not in READ_METHODS:
+        return list(names)
+    fields = _parse_names(request.query_params.get('fields'))
+    omit = _parse_names(request.query_params.get('omit')) or set()
+    return [
+        name for name in names
+        if (fields is None or name in fields) and name not in omit
+    ]
+
+
+class SparseFieldsMixin:
+    """Only render the fields selected with ``?fields=`` and ``?omit=``."""
+
+    def get_fields(self):
+        fields = super().get_fields()
+        root = self.root
+        if root is not self and getattr(root, 'child', None) is not self:
+            return fields
+
+        keep = selected_fields(self.context.get('request'), fields)
+        return {name: fields[name] for name in keep}
+
+
+class IngredientsSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for Ingredients"""
 
     class Meta:
@@ -16,7 +55,7 @@ class IngredientsSerializer(serializers.ModelSerializer):
         fields = ['id','name']
         read_only_fields = ['id']
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for tags."""
     class Meta:
         model = Tag
@@ -24,7 +63,7 @@ class TagSerializer(serializers.ModelSerializer):
         read_only_fields = ['id']
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     """Serializer for recipes."""
     tags = TagSerializer(many=True,required=False)
     ingredients = IngredientsSerializer(many=True, required=False)
@@ -82,12 +121,117 @@ class RecipeSerializer(serializers.ModelSerializer):
         return instance
 
 
+RECIPE_LIST_COLUMNS = ['title', 'time_minutes', 'price', 'link']
+
+# Recipe relation -> (through table column, related name column).
+RECIPE_RELATIONS = {
+    'tags': ('tag_id', 'tag__name'),
+    'ingredient': ('ingredients_id', 'ingredients__name'),
+}
+
+
+def _recipe_rows(queryset, fields):
+    """Return the selected columns and the ``(id, ...)`` recipe rows."""
+    columns = [name for name in RECIPE_LIST_COLUMNS if name in fields]
+    rows = queryset.prefetch_related(None).values_list('id', *columns)
+    return columns, list(rows)
+
+
+def _recipe_item(row, columns, with_id):
+    """Turn one recipe row into its serialized dictionary."""
+    item = {'id': row[0]} if with_id else {}
+    for name, value in zip(columns, row[1:]):
+        item[name] = format(value, 'f') if name == 'price' else value
+    return item
+
+
+def _related_links(relation, recipe_ids):
+    """Return ``(recipe_id, related_id, name)`` rows ordered by id."""
+    related_id, name = RECIPE_RELATIONS[relation]
+    through = getattr(Recipe, relation).through
+    return through.objects.filter(
+        recipe_id__in=recipe_ids,
+    ).order_by(related_id).values_list('recipe_id', related_id, name)
+
+
+def recipe_list_data(queryset, fields):
+    """Build ``RecipeSerializer`` output for ``queryset`` without
+    instantiating serializers, keeping only ``fields``.
+
+    Rows are read as tuples and tags with one extra query, producing
+    the same structure the serializer renders.
+    """
+    columns, rows = _recipe_rows(queryset, fields)
+    if not rows:
+        return []
+
+    tags = None
+    if 'tags' in fields:
+        tags = {row[0]: [] for row in rows}
+        for recipe_id, tag_id, name in _related_links('tags', list(tags)):
+            tags[recipe_id].append({'id': tag_id, 'name': name})
+
+    with_id = 'id' in fields
+    data = []
+    for row in rows:
+        item = _recipe_item(row, columns, with_id)
+        if tags is not None:
+            item['tags'] = tags[row[0]]
+        data.append(item)
+    return data
+
+
+def recipe_sideload_data(queryset, fields):
+    """Build a normalized recipe list.
+
+    Recipes reference their tags and ingredients by id and every
+    related object is listed once under ``included``.
+    """
+    columns, rows = _recipe_rows(queryset, fields)
+    recipe_ids = [row[0] for row in rows]
+    relations = [
+        (field, relation) for field, relation in
+        [('tags', 'tags'), ('ingredients', 'ingredient')]
+        if field in fields
+    ]
+
+    refs = {}
+    included = {}
+    for field, relation in relations:
+        refs[field] = {recipe_id: [] for recipe_id in recipe_ids}
+        names = {}
+        if recipe_ids:
+            for recipe_id, pk, name in _related_links(relation, recipe_ids):
+                refs[field][recipe_id].append(pk)
+                names[pk] = name
+        included[field] = [
+            {'id': pk, 'name': name} for pk, name in sorted(names.items())
+        ]
+
+    with_id = 'id' in fields
+    recipes = []
+    for row in rows:
+        item = _recipe_item(row, columns, with_id)
+        for field, _ in relations:
+            item[field] = refs[field][row[0]]
+        recipes.append(item)
+    return {'recipes': recipes, 'included': included}
+
+
 class RecipeDetailSerializer(RecipeSerializer):
     """Serializer for recipe detail view"""
 
     class Meta(RecipeSerializer.Meta):
         fields = RecipeSerializer.Meta.fields + ['description', 'image']
 
+class RecipeBulkUpdateSerializer(RecipeSerializer):
+    """Serializer for one item of a bulk recipe update."""
+    id = serializers.IntegerField()
+
+    class Meta(RecipeSerializer.Meta):
+        fields = RecipeSerializer.Meta.fields + ['description']
+        read_only_fields = []
+
 class RecipeImageSerializer(serializers.ModelSerializer):
     """Serializer for upñoading images to recipes."""
 
@@ -97,3 +241,35 @@ class RecipeImageSerializer(serializers.ModelSerializer):
         read_only_fields=['id']
         extra_kwargs={'image': {'required':'True'}}
 
+    def validate_image(self, value):
+        """Reject images over the limits and strip their metadata."""
+        try:
+            return images.sanitize(value)
+        except images.InvalidImage as exc:
+            raise serializers.ValidationError(str(exc))
+
+    def update(self, instance, validated_data):
+        image = validated_data['image']
+        try:
+            return super().update(instance, validated_data)
+        finally:
+            image.close()
+
+
+class RecipeImageUploadSerializer(serializers.Serializer):
+    """Serializer for requesting a direct image upload."""
+    content_type = serializers.ChoiceField(choices=list(uploads.CONTENT_TYPES))
+
+
+class RecipeImageConfirmSerializer(serializers.Serializer):
+    """Serializer for confirming a direct image upload."""
+    token = serializers.CharField()
+
+
+class RecipeAttrMergeSerializer(serializers.Serializer):
+    """Serializer for merging tags or ingredients into one."""
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=settings.RECIPE_BULK_MAX_ITEMS,
+    )
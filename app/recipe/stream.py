@@ -0,0 +1,252 @@
+"""
+Server-Sent Events stream of a user's recipe, tag and ingredient changes.
+
+Served straight from the ASGI application: every worker process holds a
+single connection listening on the events channel and fans the
+notifications out to the streams of the users they belong to. Browsers'
+``EventSource`` can't send headers, so they authenticate with a short
+lived stream token in the query string rather than their API token.
+"""
+import asyncio
+import json
+from collections import defaultdict
+from urllib.parse import parse_qs
+
+import psycopg2
+from asgiref.sync import sync_to_async
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.db import close_old_connections, connections
+
+from recipe.events import CHANNEL
+
+EVENTS_PATH = '/api/recipe/events/'
+
+SALT = 'recipe.stream'
+
+# Sent instead of the dropped events when a client falls behind.
+RESET = {'event': 'reset'}
+
+
+class Listener:
+    """Dispatch notifications on ``CHANNEL`` to per user queues."""
+
+    def __init__(self):
+        self.queues = defaultdict(set)
+        self.connection = None
+        self._lock = None
+
+    async def subscribe(self, user_id):
+        """Return a new queue of ``user_id``'s events.
+
+        Raises ``psycopg2.Error`` when the database can't be reached.
+        """
+        if self.connection is None:
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                if self.connection is None:
+                    await self._connect()
+        queue = asyncio.Queue(maxsize=settings.EVENTS_QUEUE_SIZE)
+        self.queues[user_id].add(queue)
+        return queue
+
+    def unsubscribe(self, user_id, queue):
+        self.queues[user_id].discard(queue)
+        if not self.queues[user_id]:
+            del self.queues[user_id]
+
+    async def _connect(self):
+        # Connecting blocks, so it's kept off the event loop.
+        loop = asyncio.get_running_loop()
+        self.connection = await loop.run_in_executor(None, self._open)
+        loop.add_reader(self.connection, self._read)
+
+    def _open(self):
+        params = connections['default'].get_connection_params()
+        connection = psycopg2.connect(**params)
+        connection.autocommit = True
+        with connection.cursor() as cursor:
+            cursor.execute(f'LISTEN {CHANNEL}')
+        return connection
+
+    def _disconnect(self):
+        asyncio.get_running_loop().remove_reader(self.connection)
+        self.connection.close()
+        self.connection = None
+
+    def _read(self):
+        try:
+            self.connection.poll()
+        except psycopg2.Error:
+            # Events may have been missed while reconnecting.
+            self._disconnect()
+            for queues in self.queues.values():
+                for queue in queues:
+                    self._put(queue, RESET)
+            self._retry()
+            return
+
+        while self.connection.notifies:
+            notify = self.connection.notifies.pop(0)
+            for event in json.loads(notify.payload):
+                for queue in self.queues.get(event.pop('user'), ()):
+                    self._put(queue, event)
+
+    def _retry(self):
+        asyncio.get_running_loop().call_later(
+            1, lambda: asyncio.ensure_future(self._reconnect())
+        )
+
+    async def _reconnect(self):
+        if self.connection is not None:
+            return
+        try:
+            await self._connect()
+        except psycopg2.Error:
+            self._retry()
+
+    def _put(self, queue, event):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            while not queue.empty():
+                queue.get_nowait()
+            queue.put_nowait(RESET)
+
+
+listener = Listener()
+
+
+def issue_token(user):
+    """Return a stream token of ``user``.
+
+    It expires after ``EVENTS_TOKEN_MAX_AGE`` seconds.
+    """
+    return signing.dumps(user.id, salt=SALT)
+
+
+def _authenticate(scope):
+    """Return the id of the active user the request is made by, if any.
+
+    The API token is read from the Authorization header, a stream token
+    from the ``token`` query parameter.
+    """
+    headers = dict(scope['headers'])
+    scheme, _, key = headers.get(b'authorization', b'').decode().partition(' ')
+    try:
+        if scheme.lower() == 'token' and key:
+            users = get_user_model().objects.filter(
+                auth_token__key=key.strip()
+            )
+        else:
+            query = parse_qs(scope['query_string'].decode())
+            user_id = signing.loads(
+                query.get('token', [''])[0],
+                salt=SALT,
+                max_age=settings.EVENTS_TOKEN_MAX_AGE,
+            )
+            users = get_user_model().objects.filter(pk=user_id)
+        return users.filter(is_active=True).values_list(
+            'pk', flat=True
+        ).first()
+    except signing.BadSignature:
+        return None
+    finally:
+        close_old_connections()
+
+
+def format_event(event):
+    """Format ``event`` as a Server-Sent Events message."""
+    data = {key: value for key, value in event.items() if key != 'event'}
+    return f'event: {event["event"]}\ndata: {json.dumps(data)}\n\n'.encode()
+
+
+async def _disconnect(receive):
+    """Wait until the client goes away."""
+    while (await receive())['type'] != 'http.disconnect':
+        pass
+
+
+async def _respond(send, status, body, headers=()):
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'), *headers],
+    })
+    await send({
+        'type': 'http.response.body',
+        'body': json.dumps(body).encode(),
+    })
+
+
+async def event_stream(scope, receive, send):
+    """ASGI application streaming the authenticated user's changes."""
+    if scope['method'] != 'GET':
+        return await _respond(send, 405, {'detail': 'Method not allowed.'})
+    user_id = await sync_to_async(_authenticate)(scope)
+    if not user_id:
+        return await _respond(
+            send, 401, {'detail': 'Invalid or missing token.'}
+        )
+
+    try:
+        queue = await listener.subscribe(user_id)
+    except psycopg2.Error:
+        return await _respond(
+            send, 503, {'detail': 'Events are unavailable, retry later.'},
+            headers=[(b'retry-after', b'5')],
+        )
+    disconnected = asyncio.ensure_future(_disconnect(receive))
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send({
+            'type': 'http.response.body',
+            'body': b'retry: 5000\n\n',
+            'more_body': True,
+        })
+        while True:
+            received = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait(
+                [received, disconnected],
+                timeout=settings.EVENTS_HEARTBEAT_SECONDS,
+                return_when=asyncio.FIRST_COMPLETED,
+            )
+            if disconnected in done:
+                received.cancel()
+                break
+            if received in done:
+                body = format_event(received.result())
+            else:
+                received.cancel()
+                body = b': keep-alive\n\n'
+            await send({
+                'type': 'http.response.body',
+                'body': body,
+                'more_body': True,
+            })
+    finally:
+        disconnected.cancel()
+        listener.unsubscribe(user_id, queue)
+
+
+def route_events(application):
+    """Serve ``EVENTS_PATH`` with ``event_stream`` in front of
+    ``application``."""
+
+    async def router(scope, receive, send):
+        if scope['type'] == 'http' and scope['path'] == EVENTS_PATH:
+            return await event_stream(scope, receive, send)
+        return await application(scope, receive, send)
+
+    return router
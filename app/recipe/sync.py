@@ -0,0 +1,256 @@
+"""
+Delta sync of recipes, tags and ingredients for offline clients.
+
+Clients first fetch everything page by page, then only what changed after
+the cursor they were given. Tombstones of deleted objects are kept for
+``SYNC_TOMBSTONE_RETENTION`` seconds, so older cursors need a full sync.
+They are written by signal receivers, so deletions made anywhere, from
+the admin, by cascades or with the ORM, reach clients.
+"""
+import threading
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Prefetch
+from django.db.models.signals import post_delete, pre_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from core.models import Recipe, Tag, Ingredients, Tombstone, User
+from recipe import events, serializers
+
+# Response key -> (model, serializer class).
+KINDS = {
+    Tombstone.RECIPES: (Recipe, serializers.RecipeDetailSerializer),
+    Tombstone.TAGS: (Tag, serializers.TagSerializer),
+    Tombstone.INGREDIENTS: (Ingredients, serializers.IngredientsSerializer),
+}
+
+# Related model -> Recipe lookup of its many to many field.
+RECIPE_LOOKUPS = {
+    Tag: 'tags__in',
+    Ingredients: 'ingredient__in',
+}
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# Ids of the users being deleted by this thread.
+_local = threading.local()
+
+
+def _kind(model):
+    return next(kind for kind, (cls, _) in KINDS.items() if cls is model)
+
+
+def encode_cursor(moment):
+    """Return an opaque, URL safe cursor for ``moment``."""
+    return str((moment - EPOCH) // timedelta(microseconds=1))
+
+
+def decode_cursor(value):
+    """Return the moment encoded in ``value``.
+
+    Raises ``ValueError`` for malformed cursors.
+    """
+    return EPOCH + timedelta(microseconds=int(value))
+
+
+def cursor_expired(since):
+    """Return whether deletions after ``since`` may have been cleared."""
+    return since < timezone.now() - timedelta(
+        seconds=settings.SYNC_TOMBSTONE_RETENTION
+    )
+
+
+def encode_page(cursor, position, after):
+    """Return the token of the full sync page starting after the row
+    ``after`` of the ``position``-th kind."""
+    return f'{encode_cursor(cursor)}.{position}.{after}'
+
+
+def decode_page(value):
+    """Return the cursor, kind position and row id encoded in ``value``.
+
+    Raises ``ValueError`` for malformed page tokens.
+    """
+    cursor, position, after = value.split('.')
+    position = int(position)
+    if not 0 <= position < len(KINDS):
+        raise ValueError(value)
+    return decode_cursor(cursor), position, int(after)
+
+
+def _lagged_cursor():
+    """Return the moment sent as the cursor of a sync made now.
+
+    It lags ``SYNC_CURSOR_LAG`` seconds behind the clock, so rows saved
+    by transactions that commit late are sent again rather than missed.
+    """
+    return timezone.now() - timedelta(seconds=settings.SYNC_CURSOR_LAG)
+
+
+def touch_recipes(model, ids):
+    """Mark recipes linked to the ``model`` rows with ``ids`` as changed,
+    as their serialized form embeds those rows.
+
+    Their version is bumped too, so their ETags change with the body.
+    """
+    recipes = dict(
+        Recipe.objects.filter(**{RECIPE_LOOKUPS[model]: ids}).values_list(
+            'id', 'user_id'
+        )
+    )
+    if not recipes:
+        return
+    Recipe.objects.filter(id__in=list(recipes)).update(
+        updated_at=timezone.now(), version=F('version') + 1
+    )
+    by_user = {}
+    for recipe_id, user_id in recipes.items():
+        by_user.setdefault(user_id, []).append(recipe_id)
+    for user_id, ids in by_user.items():
+        events.publish(user_id, Recipe, events.UPDATED, ids)
+
+
+def has_changes(user, since):
+    """Return whether anything of ``user`` changed after ``since``.
+
+    One query probing the ``(user, updated_at)`` index of each table.
+    """
+    queries = [
+        model.objects.filter(user=user, updated_at__gt=since).values('id')
+        for model, _ in KINDS.values()
+    ]
+    queries.append(
+        Tombstone.objects.filter(
+            user=user, deleted_at__gt=since
+        ).values('id')
+    )
+    first, *rest = [query[:1] for query in queries]
+    return first.union(*rest, all=True).exists()
+
+
+def _queryset(kind, user, since):
+    model, _ = KINDS[kind]
+    queryset = model.objects.filter(user=user).order_by('id')
+    if since is not None:
+        queryset = queryset.filter(updated_at__gt=since)
+    if model is Recipe:
+        queryset = queryset.prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id'))
+        )
+    return queryset
+
+
+def changes(user, since, context):
+    """Return everything of ``user`` changed after ``since``.
+
+    The returned cursor never moves back from ``since``.
+    """
+    cursor = max(_lagged_cursor(), since)
+    data = {'cursor': encode_cursor(cursor), 'next': None}
+
+    if not has_changes(user, since):
+        data.update({kind: [] for kind in KINDS})
+        data['deleted'] = {kind: [] for kind in KINDS}
+        return data
+
+    for kind, (_, serializer_class) in KINDS.items():
+        serializer = serializer_class(
+            _queryset(kind, user, since), many=True, context=context
+        )
+        data[kind] = serializer.data
+
+    deleted = {kind: [] for kind in KINDS}
+    tombstones = Tombstone.objects.filter(
+        user=user, deleted_at__gt=since
+    ).order_by('id').values_list('kind', 'object_id')
+    for kind, object_id in tombstones:
+        deleted[kind].append(object_id)
+    data['deleted'] = deleted
+    return data
+
+
+def snapshot(user, page, context):
+    """Return a page of up to ``SYNC_PAGE_SIZE`` objects of ``user``.
+
+    Kinds are paged through in turn, by id. The token of the next page is
+    returned as ``next``; the last page carries the cursor, taken when
+    the first page was served so that changes made meanwhile are synced.
+    """
+    if page is None:
+        cursor, position, after = _lagged_cursor(), 0, 0
+    else:
+        cursor, position, after = decode_page(page)
+
+    kinds = list(KINDS)
+    data = {kind: [] for kind in KINDS}
+    remaining = settings.SYNC_PAGE_SIZE
+    next_page = None
+    while position < len(kinds):
+        kind = kinds[position]
+        rows = list(
+            _queryset(kind, user, None).filter(id__gt=after)[:remaining + 1]
+        )
+        if len(rows) > remaining:
+            rows = rows[:remaining]
+            if rows:
+                after = rows[-1].id
+            next_page = encode_page(cursor, position, after)
+        _, serializer_class = KINDS[kind]
+        data[kind] = serializer_class(rows, many=True, context=context).data
+        if next_page:
+            break
+        remaining -= len(rows)
+        position, after = position + 1, 0
+
+    data['deleted'] = {kind: [] for kind in KINDS}
+    data['cursor'] = None if next_page else encode_cursor(cursor)
+    data['next'] = next_page
+    return data
+
+
+def _deleting_users():
+    if not hasattr(_local, 'users'):
+        _local.users = set()
+    return _local.users
+
+
+@receiver(pre_delete, sender=User)
+def _user_deleting(sender, instance, **kwargs):
+    _deleting_users().add(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def _user_deleted(sender, instance, **kwargs):
+    _deleting_users().discard(instance.pk)
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=Ingredients)
+def _attr_deleting(sender, instance, **kwargs):
+    # Linked recipes no longer list it; the links are gone after delete.
+    touch_recipes(sender, [instance.pk])
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=Ingredients)
+def _deleted(sender, instance, **kwargs):
+    """Store a tombstone for the deleted row.
+
+    None is needed when its user is deleted too, or deactivated pending
+    deletion, as they can't sync anymore.
+    """
+    if instance.user_id in _deleting_users():
+        return
+    tombstones = connection.ops.quote_name(Tombstone._meta.db_table)
+    users = connection.ops.quote_name(User._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'INSERT INTO {tombstones} (user_id, kind, object_id, deleted_at) '
+            f'SELECT id, %s, %s, %s FROM {users} '
+            f'WHERE id = %s AND is_active',
+            [_kind(sender), instance.pk, timezone.now(), instance.user_id],
+        )
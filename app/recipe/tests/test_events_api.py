@@ -0,0 +1,239 @@
+"""
+Test the recipe change event stream.
+"""
+import json
+from decimal import Decimal
+from unittest.mock import patch
+
+from asgiref.sync import async_to_sync, sync_to_async
+from asgiref.testing import ApplicationCommunicator
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag
+from recipe import events, stream
+
+
+def create_user(email):
+    """Create and return a user with an API token."""
+    user = get_user_model().objects.create_user(email, 'testpass123')
+    Token.objects.create(user=user)
+    return user
+
+
+def http_scope(token=None, method='GET', query=b''):
+    """Return the ASGI scope of a request to the event stream."""
+    headers = []
+    if token:
+        headers.append((b'authorization', f'Token {token}'.encode()))
+    return {
+        'type': 'http',
+        'method': method,
+        'path': stream.EVENTS_PATH,
+        'query_string': query,
+        'headers': headers,
+    }
+
+
+def parse_event(body):
+    """Return the name and data of a Server-Sent Events message."""
+    lines = dict(
+        line.split(': ', 1) for line in body.decode().strip().split('\n')
+    )
+    return lines['event'], json.loads(lines['data'])
+
+
+class EventStreamTests(TransactionTestCase):
+    """Test streaming changes over Server-Sent Events."""
+
+    def setUp(self):
+        self.user = create_user('user@example.com')
+        self.listener = stream.Listener()
+        patcher = patch.object(stream, 'listener', self.listener)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        if self.listener.connection is not None:
+            self.listener.connection.close()
+
+    async def _open(self, scope):
+        application = stream.route_events(None)
+        communicator = ApplicationCommunicator(application, scope)
+        await communicator.send_input({'type': 'http.request'})
+        start = await communicator.receive_output(timeout=5)
+        return communicator, start
+
+    def test_token_required(self):
+        """Test the stream rejects unauthenticated clients."""
+
+        async def run():
+            communicator, start = await self._open(http_scope('invalid'))
+            await communicator.wait(timeout=5)
+            return start
+
+        start = async_to_sync(run)()
+
+        self.assertEqual(start['status'], 401)
+
+    def test_streams_own_changes(self):
+        """Test changes are pushed only to their owner's stream."""
+        other = create_user('other@example.com')
+
+        async def run():
+            communicator, start = await self._open(
+                http_scope(self.user.auth_token.key)
+            )
+            retry = await communicator.receive_output(timeout=5)
+
+            await sync_to_async(Recipe.objects.create)(
+                user=other, title='Other', time_minutes=5, price=Decimal('1')
+            )
+            recipe = await sync_to_async(Recipe.objects.create)(
+                user=self.user, title='Mine', time_minutes=5,
+                price=Decimal('1'),
+            )
+            created = await communicator.receive_output(timeout=5)
+            tag = await sync_to_async(Tag.objects.create)(
+                user=self.user, name='Vegan'
+            )
+            await sync_to_async(recipe.tags.add)(tag)
+            tag_created = await communicator.receive_output(timeout=5)
+            linked = await communicator.receive_output(timeout=5)
+            recipe_id = recipe.id
+            await sync_to_async(recipe.delete)()
+            deleted = await communicator.receive_output(timeout=5)
+
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait(timeout=5)
+            return start, retry, recipe_id, tag, [
+                parse_event(message['body'])
+                for message in [created, tag_created, linked, deleted]
+            ]
+
+        start, retry, recipe_id, tag, events = async_to_sync(run)()
+
+        self.assertEqual(start['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/event-stream'), start['headers']
+        )
+        self.assertEqual(retry['body'], b'retry: 5000\n\n')
+        self.assertEqual(events, [
+            ('created', {'kind': 'recipes', 'id': recipe_id}),
+            ('created', {'kind': 'tags', 'id': tag.id}),
+            ('updated', {'kind': 'recipes', 'id': recipe_id}),
+            ('deleted', {'kind': 'recipes', 'id': recipe_id}),
+        ])
+        self.assertEqual(self.listener.queues, {})
+
+    def test_stream_token_from_query_string(self):
+        """Test browsers can pass a stream token in the query string."""
+        client = APIClient()
+        client.force_authenticate(self.user)
+        res = client.post(reverse('recipe:events-token'))
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+
+        async def run():
+            query = f'token={res.data["token"]}'.encode()
+            communicator, start = await self._open(http_scope(query=query))
+            await communicator.send_input({'type': 'http.disconnect'})
+            await communicator.wait(timeout=5)
+            return start
+
+        start = async_to_sync(run)()
+
+        self.assertEqual(start['status'], 200)
+
+    def test_api_token_not_accepted_in_query_string(self):
+        """Test API tokens are kept out of URLs and their access logs."""
+        query = f'token={self.user.auth_token.key}'.encode()
+
+        async def run():
+            communicator, start = await self._open(http_scope(query=query))
+            await communicator.wait(timeout=5)
+            return start
+
+        start = async_to_sync(run)()
+
+        self.assertEqual(start['status'], 401)
+
+    @override_settings(EVENTS_TOKEN_MAX_AGE=-1)
+    def test_expired_stream_token_rejected(self):
+        query = f'token={stream.issue_token(self.user)}'.encode()
+
+        async def run():
+            communicator, start = await self._open(http_scope(query=query))
+            await communicator.wait(timeout=5)
+            return start
+
+        start = async_to_sync(run)()
+
+        self.assertEqual(start['status'], 401)
+
+    def test_database_unavailable(self):
+        """Test the stream answers 503 when it can't listen for events."""
+
+        async def run():
+            communicator, start = await self._open(
+                http_scope(self.user.auth_token.key)
+            )
+            await communicator.wait(timeout=5)
+            return start
+
+        error = stream.psycopg2.OperationalError
+        with patch.object(stream.psycopg2, 'connect', side_effect=error):
+            start = async_to_sync(run)()
+
+        self.assertEqual(start['status'], 503)
+        self.assertIn((b'retry-after', b'5'), start['headers'])
+        self.assertEqual(self.listener.queues, {})
+
+    def test_slow_client_is_reset(self):
+        """Test a full queue is replaced by a reset event."""
+        queue = stream.asyncio.Queue(maxsize=1)
+        self.listener._put(queue, {'event': 'created', 'id': 1})
+        self.listener._put(queue, {'event': 'created', 'id': 2})
+
+        self.assertEqual(queue.get_nowait(), stream.RESET)
+        self.assertEqual(
+            stream.format_event(stream.RESET), b'event: reset\ndata: {}\n\n'
+        )
+
+
+class PublishTests(TransactionTestCase):
+    """Test events are only sent for committed changes."""
+
+    def _create_recipe(self, user, title):
+        return Recipe.objects.create(
+            user=user, title=title, time_minutes=5, price=Decimal('1')
+        )
+
+    def test_rolled_back_changes_not_published(self):
+        user = create_user('user@example.com')
+        with patch.object(events, 'send') as send:
+            with self.assertRaises(ValueError), transaction.atomic():
+                self._create_recipe(user, 'Rolled back')
+                raise ValueError
+            with transaction.atomic():
+                kept = self._create_recipe(user, 'Kept')
+                with self.assertRaises(ValueError), transaction.atomic():
+                    self._create_recipe(user, 'Savepoint rolled back')
+                    raise ValueError
+                tag = Tag.objects.create(user=user, name='Vegan')
+
+        self.assertEqual(
+            [call.args[0] for call in send.call_args_list],
+            [
+                [{'user': user.id, 'kind': 'recipes', 'id': kept.id,
+                  'event': events.CREATED}],
+                [{'user': user.id, 'kind': 'tags', 'id': tag.id,
+                  'event': events.CREATED}],
+            ],
+        )
@@ -0,0 +1,154 @@
+"""
+Test validation and sanitizing of uploaded recipe images.
+"""
+import io
+import tempfile
+from decimal import Decimal
+
+from unittest.mock import patch
+
+from PIL import Image, ImageFile
+
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from recipe import images
+
+GPS_INFO = 0x8825
+
+
+def image_file(size=(20, 10), image_format='JPEG', orientation=None,
+               name='photo.jpg'):
+    """Return an uploaded image, tagged with EXIF GPS data."""
+    exif = Image.Exif()
+    exif[GPS_INFO] = {1: 'N'}
+    if orientation:
+        exif[images.EXIF_ORIENTATION] = orientation
+    buffer = io.BytesIO()
+    options = {'exif': exif.tobytes()} if image_format != 'GIF' else {}
+    Image.new('RGB', size, 'red').save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+class RecipeImageTests(TestCase):
+    """Test the limits and sanitizing applied to image uploads."""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(self.media.cleanup)
+
+        self.client = APIClient()
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client.force_authenticate(user)
+        self.recipe = Recipe.objects.create(
+            user=user, title='Curry', time_minutes=5, price=Decimal('1.00')
+        )
+        self.url = reverse('recipe:recipe-upload-image', args=[self.recipe.id])
+
+    def _upload(self, upload):
+        return self.client.post(
+            self.url, {'image': upload}, format='multipart'
+        )
+
+    def _stored(self):
+        self.recipe.refresh_from_db()
+        return Image.open(self.recipe.image.path)
+
+    def test_metadata_stripped(self):
+        """Test EXIF data is removed without re-encoding the image."""
+        for image_format, name in [('JPEG', 'a.jpg'), ('PNG', 'a.png')]:
+            with self.subTest(image_format=image_format):
+                res = self._upload(
+                    image_file(image_format=image_format, name=name)
+                )
+
+                self.assertEqual(res.status_code, status.HTTP_200_OK)
+                with self._stored() as stored:
+                    self.assertEqual(stored.format, image_format)
+                    self.assertEqual(stored.size, (20, 10))
+                    self.assertEqual(dict(stored.getexif()), {})
+
+    def test_orientation_normalized(self):
+        """Test rotated photos are stored upright."""
+        res = self._upload(image_file(orientation=6))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        with self._stored() as stored:
+            self.assertEqual(stored.size, (10, 20))
+            self.assertNotIn(images.EXIF_ORIENTATION, stored.getexif())
+
+    def test_extension_matches_format(self):
+        """Test the stored name uses the extension of the real format."""
+        self._upload(image_file(image_format='PNG', name='photo.jpg'))
+
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.png'))
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels(self):
+        """Test images over the pixel limit are rejected unstored."""
+        res = self._upload(image_file())
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('pixels', res.data['image'][0])
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    @override_settings(RECIPE_IMAGE_MAX_BYTES=100)
+    def test_too_many_bytes(self):
+        """Test images over the byte limit are rejected."""
+        res = self._upload(image_file())
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('bytes', res.data['image'][0])
+
+    def test_unsupported_format(self):
+        """Test formats other than JPEG, PNG and WEBP are rejected."""
+        res = self._upload(image_file(image_format='GIF', name='a.gif'))
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('formats', res.data['image'][0])
+
+    def test_probe_reads_headers_only(self):
+        """Test probing doesn't decode the pixels."""
+        upload = image_file(size=(4000, 3000))
+
+        with patch.object(ImageFile.ImageFile, 'load') as load:
+            image_format, size, orientation = images.probe(upload)
+
+        load.assert_not_called()
+        self.assertEqual((image_format, size, orientation),
+                         ('JPEG', (4000, 3000), 1))
+
+    @override_settings(RECIPE_IMAGE_MAX_PIXELS=100)
+    def test_rejected_png_not_decoded(self):
+        """Test PNGs without early EXIF are rejected before decoding."""
+        buffer = io.BytesIO()
+        Image.new('L', (200, 200)).save(buffer, 'PNG')
+        upload = SimpleUploadedFile('large.png', buffer.getvalue())
+
+        with patch.object(ImageFile.ImageFile, 'load') as load, \
+                self.assertRaisesMessage(images.InvalidImage, 'pixels'):
+            images.probe(upload)
+
+        load.assert_not_called()
+
+    def test_png_orientation_read_without_decoding(self):
+        upload = image_file(image_format='PNG', orientation=6, name='a.png')
+
+        with patch.object(ImageFile.ImageFile, 'load') as load:
+            _, _, orientation = images.probe(upload)
+
+        load.assert_not_called()
+        self.assertEqual(orientation, 6)
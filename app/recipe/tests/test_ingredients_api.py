@@ -136,3 +136,22 @@ class PrivateIngredientApiTest(TestCase):
         res =self.client.get(INGREDIENTS_URL, {'assigned_only':1})
 
         self.assertEqual(len(res.data),1)
+
+    def test_merge_ingredients(self):
+        """Test merging ingredients into one."""
+        eggs = Ingredients.objects.create(user=self.user, name='Eggs')
+        duplicate = Ingredients.objects.create(user=self.user, name='eggs')
+        recipe = Recipe.objects.create(
+            title='Omelette',
+            time_minutes=5,
+            price=Decimal('5.50'),
+            user=self.user,
+        )
+        recipe.ingredient.add(duplicate)
+        url = reverse('recipe:ingredients-merge', args=[eggs.id])
+
+        res = self.client.post(url, {'ids': [duplicate.id]}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(list(recipe.ingredient.all()), [eggs])
+        self.assertFalse(Ingredients.objects.filter(id=duplicate.id).exists())
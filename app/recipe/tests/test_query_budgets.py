@@ -0,0 +1,140 @@
+"""
+Test recipe endpoints stay within their query budgets.
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework.test import APIClient
+
+from core.models import Recipe
+from core.testing import BudgetMixin, seed
+
+DATASET_SIZES = [1, 10, 40]
+
+
+class RecipeQueryBudgetTests(BudgetMixin, TestCase):
+    """Test query counts don't grow with the number of recipes."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _seed(self, recipes):
+        user = seed(
+            users=2,
+            recipes_per_user=recipes,
+            tags_per_user=8,
+            ingredients_per_user=8,
+            tags_per_recipe=3,
+            ingredients_per_recipe=3,
+        )
+        self.client.force_authenticate(user)
+        return user
+
+    def test_recipe_list(self):
+        """Test listing and filtering recipes."""
+        for size in DATASET_SIZES:
+            with self.subTest(size=size):
+                user = self._seed(size)
+                url = reverse('recipe:recipe-list')
+                res = self.assertWithinBudget(
+                    'recipe:recipe-list', self.client.get, url
+                )
+                self.assertEqual(len(res.data), size)
+
+                tags = ','.join(
+                    str(pk) for pk in
+                    user.tag_set.values_list('id', flat=True)[:3]
+                )
+                self.assertWithinBudget(
+                    'recipe:recipe-list', self.client.get, url, {'tags': tags}
+                )
+
+    def test_recipe_detail(self):
+        """Test retrieving one recipe."""
+        for size in DATASET_SIZES:
+            with self.subTest(size=size):
+                user = self._seed(size)
+                recipe = Recipe.objects.filter(user=user).first()
+                self.assertWithinBudget(
+                    'recipe:recipe-detail',
+                    self.client.get,
+                    reverse('recipe:recipe-detail', args=[recipe.id]),
+                )
+
+    def test_recipe_batch(self):
+        """Test retrieving many recipes at once."""
+        for size in DATASET_SIZES:
+            with self.subTest(size=size):
+                user = self._seed(size)
+                ids = Recipe.objects.filter(user=user).values_list(
+                    'id', flat=True
+                )
+                url = reverse('recipe:recipe-batch')
+                res = self.assertWithinBudget(
+                    'recipe:recipe-batch',
+                    self.client.get,
+                    url,
+                    {'ids': ','.join(str(pk) for pk in ids)},
+                )
+                self.assertEqual(len(res.data['results']), size)
+
+    def test_recipe_bulk_update(self):
+        """Test updating many recipes at once."""
+        for size in DATASET_SIZES:
+            with self.subTest(size=size):
+                user = self._seed(size)
+                payload = [
+                    {'id': pk, 'title': f'Bulk {pk}',
+                     'tags': [{'name': 'Bulk'}, {'name': f'Bulk {pk}'}],
+                     'ingredients': [{'name': 'Salt'}]}
+                    for pk in Recipe.objects.filter(user=user).values_list(
+                        'id', flat=True
+                    )
+                ]
+                self.assertWithinBudget(
+                    'recipe:recipe-bulk-update',
+                    self.client.patch,
+                    reverse('recipe:recipe-bulk-update'),
+                    payload,
+                    format='json',
+                )
+
+    def test_sync(self):
+        """Test full and incremental syncs."""
+        for size in DATASET_SIZES:
+            with self.subTest(size=size):
+                user = self._seed(size)
+                url = reverse('recipe:sync')
+                res = self.assertWithinBudget(
+                    'recipe:sync', self.client.get, url
+                )
+                self.assertEqual(len(res.data['recipes']), size)
+
+                Recipe.objects.filter(user=user).update(
+                    updated_at=timezone.now() + timedelta(seconds=10)
+                )
+                self.assertWithinBudget(
+                    'recipe:sync',
+                    self.client.get,
+                    url,
+                    {'cursor': res.data['cursor']},
+                )
+
+    def test_tag_and_ingredient_lists(self):
+        """Test listing tags and ingredients."""
+        for size in DATASET_SIZES:
+            with self.subTest(size=size):
+                self._seed(size)
+                for endpoint in ['recipe:tag-list', 'recipe:ingredients-list']:
+                    self.assertWithinBudget(
+                        endpoint, self.client.get, reverse(endpoint)
+                    )
+                    self.assertWithinBudget(
+                        endpoint,
+                        self.client.get,
+                        reverse(endpoint),
+                        {'assigned_only': 1},
+                    )
@@ -3,15 +3,22 @@ Test Recipe Api.
 """
 from decimal import Decimal
 import tempfile
+import threading
 import os
+from unittest.mock import patch
 
 from PIL import Image
 
 from django.contrib.auth import get_user_model
-from django.test import TestCase
+from django.core.files.move import file_move_safe
+from django.db import connection
+from django.db.models import Prefetch
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
 from rest_framework import status
+from rest_framework.renderers import JSONRenderer
 from rest_framework.test import APIClient
 
 from core.models import (Recipe,Tag,Ingredients)
@@ -25,9 +32,17 @@ def create_user(**params):
 def detail_url(recipe_id):
     """Return detailed url with ID"""
     return reverse('recipe:recipe-detail', args=[recipe_id])
+def batch_url(ids):
+    """Create and return a batch retrieve URL for ``ids``."""
+    url = reverse('recipe:recipe-batch')
+    return f'{url}?ids={",".join(str(pk) for pk in ids)}'
+BULK_URL = reverse('recipe:recipe-bulk-update')
 def image_upload_url(recipe_id):
     """Create and return an image upload URL"""
     return reverse('recipe:recipe-upload-image', args=[recipe_id])
+def image_download_url(recipe_id):
+    """Create and return an image download URL."""
+    return reverse('recipe:recipe-download-image', args=[recipe_id])
 
 def create_recipe(user, **params):
     """Create a return a sample recipe."""
@@ -353,6 +368,336 @@ class PrivateRecipeAPITests(TestCase):
         self.assertIn(s2.data, res.data)
         self.assertNotIn(s3.data, res.data)
 
+    def test_list_sparse_fields(self):
+        """Test listing recipes with only the requested fields."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        with CaptureQueriesContext(connection) as queries:
+            res = self.client.get(RECIPES_URL, {'fields': 'id,title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': recipe.id, 'title': recipe.title}])
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn('"price"', queries[0]['sql'])
+        self.assertNotIn('"link"', queries[0]['sql'])
+
+    def test_list_empty_fields_selects_all(self):
+        """Test an empty ``fields`` parameter is treated as absent."""
+        create_recipe(user=self.user)
+
+        res = self.client.get(RECIPES_URL, {'fields': ' , '})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, self.client.get(RECIPES_URL).data)
+        self.assertIn('title', res.data[0])
+
+    def test_detail_omit_fields(self):
+        """Test omitting fields from the recipe detail."""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.get(
+            detail_url(recipe.id), {'omit': 'tags,description,image'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        for field in ['tags', 'description', 'image']:
+            self.assertNotIn(field, res.data)
+        self.assertEqual(res.data['title'], recipe.title)
+
+    def test_sparse_fields_ignored_on_write(self):
+        """Test updates return every field whatever the query string."""
+        recipe = create_recipe(user=self.user)
+        url = detail_url(recipe.id) + '?fields=id'
+
+        res = self.client.patch(url, {'title': 'New title'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['title'], 'New title')
+        self.assertIn('price', res.data)
+
+    def test_list_matches_serializer_output(self):
+        """Test the list fast path renders the same bytes as the serializer."""
+        tags = [Tag.objects.create(user=self.user, name=f'Tag {i}')
+                for i in range(4)]
+        prices = ['0.00', '5.50', '12.05', '999.99']
+        for i, price in enumerate(prices):
+            recipe = create_recipe(
+                user=self.user,
+                title=f'Recipe \u00f1 "{i}"',
+                price=Decimal(price),
+                link='' if i % 2 else 'https://example.com',
+            )
+            recipe.tags.add(*tags[i:])
+        create_recipe(user=self.user, title='No tags')
+
+        res = self.client.get(RECIPES_URL)
+
+        recipes = Recipe.objects.filter(user=self.user).order_by(
+            '-id'
+        ).prefetch_related(
+            Prefetch('tags', queryset=Tag.objects.order_by('id'))
+        )
+        expected = JSONRenderer().render(
+            RecipeSerializer(recipes, many=True).data
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.content, expected)
+        self.assertEqual(JSONRenderer().render(res.data), expected)
+
+    def test_list_fast_path_sparse_fields(self):
+        """Test the list fast path honors sparse fieldsets."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        res = self.client.get(RECIPES_URL, {'omit': 'id,link,tags'})
+
+        self.assertEqual(res.data, [{
+            'title': recipe.title,
+            'time_minutes': recipe.time_minutes,
+            'price': '5.25',
+        }])
+
+    def test_list_sideload(self):
+        """Test sideloaded lists reference shared tags and ingredients once."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        quick = Tag.objects.create(user=self.user, name='Quick')
+        rice = Ingredients.objects.create(user=self.user, name='Rice')
+        r1 = create_recipe(user=self.user, title='Curry')
+        r2 = create_recipe(user=self.user, title='Salad')
+        r1.tags.add(vegan, quick)
+        r2.tags.add(vegan)
+        r1.ingredient.add(rice)
+        r2.ingredient.add(rice)
+
+        res = self.client.get(RECIPES_URL, {'sideload': 1})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        recipes = res.data['recipes']
+        self.assertEqual([r['id'] for r in recipes], [r2.id, r1.id])
+        self.assertEqual(recipes[0]['tags'], [vegan.id])
+        self.assertEqual(recipes[1]['tags'], [vegan.id, quick.id])
+        self.assertEqual(recipes[1]['ingredients'], [rice.id])
+        self.assertEqual(res.data['included'], {
+            'tags': [
+                {'id': vegan.id, 'name': 'Vegan'},
+                {'id': quick.id, 'name': 'Quick'},
+            ],
+            'ingredients': [{'id': rice.id, 'name': 'Rice'}],
+        })
+
+    def test_list_sideload_omit_relations(self):
+        """Test sideloaded lists skip omitted relations."""
+        recipe = create_recipe(user=self.user)
+        recipe.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+
+        res = self.client.get(
+            RECIPES_URL, {'sideload': 1, 'omit': 'tags,ingredients'}
+        )
+
+        self.assertEqual(res.data['included'], {})
+        self.assertNotIn('tags', res.data['recipes'][0])
+
+    def test_list_sideload_flag_values(self):
+        """Test sideload takes boolean flags and rejects anything else."""
+        create_recipe(user=self.user)
+
+        sideloaded = self.client.get(RECIPES_URL, {'sideload': 'true'})
+        plain = self.client.get(RECIPES_URL, {'sideload': 'false'})
+        invalid = self.client.get(RECIPES_URL, {'sideload': 'maybe'})
+
+        self.assertIn('included', sideloaded.data)
+        self.assertIsInstance(plain.data, list)
+        self.assertEqual(invalid.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('sideload', invalid.data)
+
+    def test_batch_retrieve(self):
+        """Test retrieving many recipes in the requested order."""
+        other_user = create_user(email='other@example.com', password='pass123')
+        r1 = create_recipe(user=self.user, title='First')
+        r2 = create_recipe(user=self.user, title='Second')
+        r1.tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        foreign = create_recipe(user=other_user)
+        unknown = foreign.id + 1
+
+        res = self.client.get(
+            batch_url([r2.id, foreign.id, r1.id, unknown, r2.id])
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['results'], [
+            RecipeDetailSerializer(r2).data,
+            RecipeDetailSerializer(r1).data,
+        ])
+        self.assertEqual(res.data['missing'], [foreign.id, unknown])
+
+    def test_batch_retrieve_invalid_ids(self):
+        """Test batch retrieve rejects missing, malformed and too many ids."""
+        for url in [reverse('recipe:recipe-batch'), batch_url(['a', 1]),
+                    batch_url(range(1, 102)), batch_url([0]),
+                    batch_url([2 ** 63])]:
+            res = self.client.get(url)
+
+            self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_update(self):
+        """Test updating fields and tags of many recipes at once."""
+        existing = Tag.objects.create(user=self.user, name='Vegan')
+        r1 = create_recipe(user=self.user, title='One')
+        r2 = create_recipe(user=self.user, title='Two')
+        r1.tags.add(existing)
+        r1.ingredient.add(
+            Ingredients.objects.create(user=self.user, name='Rice')
+        )
+        payload = [
+            {'id': r1.id, 'title': 'New one', 'price': '7.10',
+             'tags': [{'name': 'Quick'}]},
+            {'id': r2.id, 'tags': [{'name': 'Vegan'}, {'name': 'Quick'}],
+             'ingredients': [{'name': 'Tofu'}]},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(
+            [r['id'] for r in res.data['results']], [r1.id, r2.id]
+        )
+        r1.refresh_from_db()
+        r2.refresh_from_db()
+        self.assertEqual(r1.title, 'New one')
+        self.assertEqual(r1.price, Decimal('7.10'))
+        self.assertEqual(r2.title, 'Two')
+        self.assertEqual([t.name for t in r1.tags.all()], ['Quick'])
+        self.assertEqual(
+            sorted(t.name for t in r2.tags.all()), ['Quick', 'Vegan']
+        )
+        self.assertIn(existing, r2.tags.all())
+        self.assertEqual(Tag.objects.filter(name='Quick').count(), 1)
+        self.assertEqual(r1.ingredient.get().name, 'Rice')
+        self.assertEqual(r2.ingredient.get().name, 'Tofu')
+
+    def test_bulk_update_errors(self):
+        """Test bulk updates report errors per item and change nothing."""
+        other_user = create_user(email='other@example.com', password='pass123')
+        mine = create_recipe(user=self.user, title='Mine')
+        foreign = create_recipe(user=other_user, title='Foreign')
+        payload = [
+            {'id': mine.id, 'title': 'Changed'},
+            {'id': foreign.id, 'title': 'Stolen'},
+            {'title': 'No id'},
+        ]
+
+        res = self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(res.data[0], {})
+        self.assertIn('id', res.data[1])
+        self.assertIn('id', res.data[2])
+        mine.refresh_from_db()
+        foreign.refresh_from_db()
+        self.assertEqual(mine.title, 'Mine')
+        self.assertEqual(foreign.title, 'Foreign')
+
+        res = self.client.patch(
+            BULK_URL, [{'id': mine.id, 'time_minutes': 'x'}], format='json'
+        )
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('time_minutes', res.data[0])
+
+    def test_bulk_delete(self):
+        """Test deleting many recipes limited to the user's own."""
+        other_user = create_user(email='other@example.com', password='pass123')
+        recipes = [create_recipe(user=self.user) for _ in range(3)]
+        recipes[0].tags.add(Tag.objects.create(user=self.user, name='Vegan'))
+        foreign = create_recipe(user=other_user)
+        ids = [recipes[0].id, recipes[1].id, foreign.id]
+
+        res = self.client.delete(BULK_URL, {'ids': ids}, format='json')
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, {'deleted': 2, 'missing': [foreign.id]})
+        self.assertEqual(
+            list(Recipe.objects.filter(user=self.user)), [recipes[2]]
+        )
+        self.assertTrue(Recipe.objects.filter(id=foreign.id).exists())
+
+    def test_bulk_delete_oversized_id(self):
+        """Test ids wider than a primary key are rejected, not echoed."""
+        res = self.client.delete(
+            BULK_URL, {'ids': [10 ** 23]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ids', res.data)
+
+    def test_retrieve_returns_etag(self):
+        """Test recipe detail carries the version as its ETag."""
+        recipe = create_recipe(user=self.user)
+
+        res = self.client.get(detail_url(recipe.id))
+
+        self.assertEqual(res['ETag'], '"1"')
+
+    def test_update_with_matching_if_match(self):
+        """Test writes with the current ETag succeed and bump it."""
+        recipe = create_recipe(user=self.user)
+        url = detail_url(recipe.id)
+        etag = self.client.get(url)['ETag']
+
+        res = self.client.patch(url, {'title': 'New'}, HTTP_IF_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['ETag'], '"2"')
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'New')
+        self.assertEqual(recipe.version, 2)
+
+    def test_update_with_stale_if_match(self):
+        """Test writes with an outdated ETag are rejected unchanged."""
+        recipe = create_recipe(user=self.user, title='Original')
+        url = detail_url(recipe.id)
+        self.client.patch(url, {'title': 'First'})
+
+        res = self.client.patch(url, {'title': 'Second'}, HTTP_IF_MATCH='"1"')
+
+        self.assertEqual(
+            res.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.title, 'First')
+        self.assertEqual(recipe.version, 2)
+
+    def test_delete_with_stale_if_match(self):
+        """Test deleting with an outdated ETag keeps the recipe."""
+        recipe = create_recipe(user=self.user)
+        Recipe.objects.filter(id=recipe.id).update(version=3)
+        url = detail_url(recipe.id)
+
+        res = self.client.delete(url, HTTP_IF_MATCH='W/"2"')
+        self.assertEqual(
+            res.status_code, status.HTTP_412_PRECONDITION_FAILED
+        )
+        res = self.client.delete(url, HTTP_IF_MATCH='W/"3"')
+        self.assertEqual(res.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(Recipe.objects.filter(id=recipe.id).exists())
+
+    def test_bulk_update_bumps_versions(self):
+        """Test bulk updates increment the version of every recipe."""
+        recipes = [create_recipe(user=self.user) for _ in range(2)]
+        payload = [
+            {'id': recipes[0].id, 'title': 'New'},
+            {'id': recipes[1].id, 'tags': [{'name': 'Vegan'}]},
+        ]
+
+        self.client.patch(BULK_URL, payload, format='json')
+
+        self.assertEqual(
+            list(Recipe.objects.order_by('id').values_list(
+                'version', flat=True
+            )),
+            [2, 2],
+        )
+
 class ImageUploadTests(TestCase):
     """Tests for the image upload API."""
 
@@ -383,10 +728,114 @@ class ImageUploadTests(TestCase):
         self.assertIn('image', res.data)
         self.assertTrue(os.path.exists(self.recipe.image.path))
 
+    def test_upload_image_moved_into_place(self):
+        """Test uploads are renamed into storage rather than copied."""
+        url = image_upload_url(self.recipe.id)
+        with tempfile.TemporaryDirectory() as upload_dir, \
+                override_settings(FILE_UPLOAD_TEMP_DIR=upload_dir), \
+                patch(
+                    'django.core.files.storage.file_move_safe',
+                    wraps=file_move_safe,
+                ) as move, \
+                tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            res = self.client.post(
+                url, {'image': image_file}, format='multipart'
+            )
+
+            self.assertEqual(os.listdir(upload_dir), [])
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.recipe.refresh_from_db()
+        move.assert_called_once()
+        self.assertEqual(move.call_args[0][1], self.recipe.image.path)
+
+    def _upload(self):
+        with tempfile.NamedTemporaryFile(suffix='.jpg') as image_file:
+            Image.new('RGB', (10, 10)).save(image_file, format='JPEG')
+            image_file.seek(0)
+            return self.client.post(
+                image_upload_url(self.recipe.id),
+                {'image': image_file},
+                format='multipart',
+            )
+
+    def test_image_url_signed(self):
+        """Test image URLs carry an expiry and signature for the proxy."""
+        res = self._upload()
+
+        self.assertIn('expires=', res.data['image'])
+        self.assertIn('md5=', res.data['image'])
+
+    def test_download_image(self):
+        """Test the proxy is told to send the image of an own recipe."""
+        self._upload()
+        self.recipe.refresh_from_db()
+
+        res = self.client.get(image_download_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res['Content-Type'], 'image/jpeg')
+        self.assertEqual(
+            res['X-Accel-Redirect'],
+            f'/protected/media/{self.recipe.image.name}',
+        )
+        self.assertEqual(res.content, b'')
+
+    def test_download_image_of_other_user(self):
+        self._upload()
+        other = create_user(email='other@example.com', password='test123')
+        self.client.force_authenticate(other)
+
+        res = self.client.get(image_download_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_download_missing_image(self):
+        res = self.client.get(image_download_url(self.recipe.id))
+
+        self.assertEqual(res.status_code, status.HTTP_404_NOT_FOUND)
+
     def test_upload_image_bad_request(self):
         """Test uploading invalidf image."""
         url = image_upload_url(self.recipe.id)
         payload = {'image': 'notaanimage'}
         res = self.client.post(url,payload, format='multipart')
 
-        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
\ No newline at end of file
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+class ConcurrentUpdateTests(TransactionTestCase):
+    """Test concurrent writers sending the same If-Match."""
+
+    def test_only_one_writer_wins(self):
+        user = create_user(email='user@example.com', password='test123')
+        recipe = create_recipe(user=user)
+        responses = []
+
+        def send(title):
+            client = APIClient()
+            client.force_authenticate(user)
+            try:
+                responses.append(client.patch(
+                    detail_url(recipe.id), {'title': title},
+                    HTTP_IF_MATCH='"1"',
+                ))
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=send, args=[f'Title {i}'])
+            for i in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            sorted(res.status_code for res in responses),
+            [200, 412, 412, 412],
+        )
+        recipe.refresh_from_db()
+        self.assertEqual(recipe.version, 2)
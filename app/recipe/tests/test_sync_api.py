@@ -0,0 +1,271 @@
+"""
+Test the delta sync API.
+"""
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core.models import Recipe, Tag, Ingredients, Tombstone
+from recipe import sync
+
+SYNC_URL = reverse('recipe:sync')
+
+
+def create_recipe(user, **params):
+    """Create and return a sample recipe."""
+    defaults = {
+        'title': 'Sample recipe',
+        'time_minutes': 10,
+        'price': Decimal('5.00'),
+    }
+    defaults.update(params)
+    return Recipe.objects.create(user=user, **defaults)
+
+
+def cursor_at(moment):
+    """Return the sync cursor for ``moment``."""
+    return sync.encode_cursor(moment)
+
+
+class PublicSyncApiTests(TestCase):
+    """Test unauthenticated sync requests."""
+
+    def test_auth_required(self):
+        """Test auth is required to sync."""
+        res = APIClient().get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class PrivateSyncApiTests(TestCase):
+    """Test authenticated sync requests."""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client.force_authenticate(self.user)
+
+    def test_full_sync(self):
+        """Test syncing without a cursor returns every object."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        Ingredients.objects.create(user=self.user, name='Salt')
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123'
+        )
+        create_recipe(other)
+
+        res = self.client.get(SYNC_URL)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual([r['id'] for r in res.data['recipes']], [recipe.id])
+        self.assertEqual(
+            res.data['recipes'][0]['tags'], [{'id': tag.id, 'name': 'Vegan'}]
+        )
+        self.assertEqual(len(res.data['tags']), 1)
+        self.assertEqual(len(res.data['ingredients']), 1)
+        self.assertEqual(
+            res.data['deleted'],
+            {'recipes': [], 'tags': [], 'ingredients': []},
+        )
+        self.assertIn('cursor', res.data)
+
+    def test_sync_returns_only_changes(self):
+        """Test syncing with a cursor returns objects changed after it."""
+        old = create_recipe(self.user, title='Old')
+        Recipe.objects.filter(id=old.id).update(
+            updated_at=timezone.now() - timedelta(hours=1)
+        )
+        since = timezone.now() - timedelta(minutes=1)
+        changed = create_recipe(self.user, title='Changed')
+
+        res = self.client.get(SYNC_URL, {'cursor': cursor_at(since)})
+
+        self.assertEqual([r['id'] for r in res.data['recipes']], [changed.id])
+        self.assertEqual(res.data['tags'], [])
+
+    def test_no_changes_is_one_query(self):
+        """Test a sync without changes runs a single query."""
+        create_recipe(self.user)
+        since = timezone.now() + timedelta(seconds=1)
+
+        with self.assertNumQueries(1):
+            res = self.client.get(SYNC_URL, {'cursor': cursor_at(since)})
+
+        self.assertEqual(res.data['recipes'], [])
+        self.assertEqual(res.data['cursor'], cursor_at(since))
+
+    def test_deletions_are_tombstoned(self):
+        """Test deleted objects are reported by id."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredients.objects.create(user=self.user, name='Salt')
+        recipe.tags.add(tag)
+        since = timezone.now()
+
+        self.client.delete(
+            reverse('recipe:tag-detail', args=[tag.id])
+        )
+        self.client.delete(
+            reverse('recipe:ingredients-detail', args=[ingredient.id])
+        )
+        res = self.client.get(SYNC_URL, {'cursor': cursor_at(since)})
+
+        self.assertEqual(res.data['deleted']['tags'], [tag.id])
+        self.assertEqual(res.data['deleted']['ingredients'], [ingredient.id])
+        self.assertEqual(res.data['recipes'][0]['tags'], [])
+
+        self.client.delete(reverse('recipe:recipe-detail', args=[recipe.id]))
+        res = self.client.get(SYNC_URL, {'cursor': cursor_at(since)})
+
+        self.assertEqual(res.data['deleted']['recipes'], [recipe.id])
+        self.assertEqual(res.data['recipes'], [])
+
+    def test_orm_deletions_are_tombstoned(self):
+        """Test deletions made outside the API are reported too."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        kept = create_recipe(self.user)
+        kept.tags.add(tag)
+        since = timezone.now()
+
+        Recipe.objects.get(id=recipe.id).delete()
+        Tag.objects.filter(id=tag.id).delete()
+        res = self.client.get(SYNC_URL, {'cursor': cursor_at(since)})
+
+        self.assertEqual(res.data['deleted']['recipes'], [recipe.id])
+        self.assertEqual(res.data['deleted']['tags'], [tag.id])
+        self.assertEqual([r['id'] for r in res.data['recipes']], [kept.id])
+
+    def test_deleted_user_leaves_no_tombstones(self):
+        """Test rows cascading with their user aren't tombstoned."""
+        other = get_user_model().objects.create_user(
+            'other@example.com', 'testpass123'
+        )
+        create_recipe(other).tags.add(
+            Tag.objects.create(user=other, name='Vegan')
+        )
+
+        other.delete()
+
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_bulk_delete_tombstoned(self):
+        """Test bulk deleted recipes are reported by id."""
+        recipes = [create_recipe(self.user) for _ in range(2)]
+        ids = [recipe.id for recipe in recipes]
+
+        self.client.delete(
+            reverse('recipe:recipe-bulk-update'), {'ids': ids}, format='json'
+        )
+
+        self.assertEqual(
+            sorted(Tombstone.objects.values_list('object_id', flat=True)),
+            ids,
+        )
+
+    def test_tag_rename_marks_recipes_changed(self):
+        """Test renaming a tag reports the recipes embedding it."""
+        recipe = create_recipe(self.user)
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe.tags.add(tag)
+        Recipe.objects.update(updated_at=timezone.now() - timedelta(hours=1))
+        since = timezone.now() - timedelta(minutes=1)
+
+        self.client.patch(
+            reverse('recipe:tag-detail', args=[tag.id]), {'name': 'Veggie'}
+        )
+        res = self.client.get(SYNC_URL, {'cursor': cursor_at(since)})
+
+        self.assertEqual([r['id'] for r in res.data['recipes']], [recipe.id])
+        self.assertEqual(res.data['tags'][0]['name'], 'Veggie')
+
+    def test_cursor_lags_behind_clock(self):
+        """Test the returned cursor leaves room for late commits."""
+        before = timezone.now()
+
+        res = self.client.get(SYNC_URL)
+
+        cursor = sync.decode_cursor(res.data['cursor'])
+        self.assertLess(cursor, before)
+
+    def test_invalid_cursor(self):
+        """Test malformed cursors are rejected."""
+        res = self.client.get(SYNC_URL, {'cursor': 'yesterday'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(SYNC_PAGE_SIZE=2)
+    def test_full_sync_paged(self):
+        """Test a sync without cursor is paged through every kind."""
+        recipes = [create_recipe(self.user) for _ in range(3)]
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        ingredient = Ingredients.objects.create(user=self.user, name='Salt')
+        before = timezone.now()
+
+        pages = [self.client.get(SYNC_URL).data]
+        while pages[-1]['next']:
+            pages.append(
+                self.client.get(SYNC_URL, {'page': pages[-1]['next']}).data
+            )
+
+        self.assertEqual(len(pages), 3)
+        self.assertEqual(
+            [r['id'] for page in pages for r in page['recipes']],
+            [recipe.id for recipe in recipes],
+        )
+        self.assertEqual(
+            [t['id'] for page in pages for t in page['tags']], [tag.id]
+        )
+        self.assertEqual(
+            [i['id'] for page in pages for i in page['ingredients']],
+            [ingredient.id],
+        )
+        self.assertEqual([page['cursor'] for page in pages[:-1]], [None] * 2)
+        self.assertLess(sync.decode_cursor(pages[-1]['cursor']), before)
+
+    def test_invalid_page(self):
+        res = self.client.get(SYNC_URL, {'page': '1.9.0'})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION=60 * 60)
+    def test_expired_cursor_requires_full_sync(self):
+        """Test cursors older than the tombstone retention are refused."""
+        since = timezone.now() - timedelta(hours=2)
+
+        res = self.client.get(SYNC_URL, {'cursor': cursor_at(since)})
+
+        self.assertEqual(res.status_code, status.HTTP_410_GONE)
+        self.assertEqual(res.data['detail'].code, 'full_resync_required')
+
+    @override_settings(SYNC_TOMBSTONE_RETENTION=60 * 60)
+    def test_clear_expired_tombstones(self):
+        """Test the cleanup command removes only expired tombstones."""
+        old, new = [
+            Tombstone.objects.create(
+                user=self.user, kind=Tombstone.RECIPES, object_id=pk
+            )
+            for pk in [1, 2]
+        ]
+        Tombstone.objects.filter(id=old.id).update(
+            deleted_at=timezone.now() - timedelta(hours=2)
+        )
+
+        call_command('clear_tombstones', stdout=StringIO())
+
+        self.assertEqual(
+            list(Tombstone.objects.values_list('id', flat=True)), [new.id]
+        )
@@ -9,7 +9,7 @@ from django.test import TestCase
 from rest_framework import status
 from rest_framework.test import APIClient
 
-from core.models import (Tag,Recipe)
+from core.models import (Tag,Recipe,Tombstone)
 
 from recipe.serializers import TagSerializer
 
@@ -19,6 +19,10 @@ def detail_url(tag_id):
     """Create and returnb a tag detail URL"""
     return reverse('recipe:tag-detail', args=[tag_id])
 
+def merge_url(tag_id):
+    """Create and return a tag merge URL."""
+    return reverse('recipe:tag-merge', args=[tag_id])
+
 def create_user(email='test@example.com', password='test123'):
     return get_user_model().objects.create_user(email=email, password=password)
 
@@ -131,3 +135,76 @@ class PrivateTagsApiTests(TestCase):
         res =self.client.get(TAGS_URL, {'assigned_only':1})
 
         self.assertEqual(len(res.data),1)
+
+    def test_tags_sparse_fields(self):
+        """Test listing tags with only their ids."""
+        tag = Tag.objects.create(user=self.user, name='vegan')
+
+        res = self.client.get(TAGS_URL, {'omit': 'name'})
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data, [{'id': tag.id}])
+
+    def _create_recipe(self, title, *tags):
+        recipe = Recipe.objects.create(
+            title=title, time_minutes=5, price=Decimal('5.50'),
+            user=self.user,
+        )
+        recipe.tags.add(*tags)
+        return recipe
+
+    def test_merge_tags(self):
+        """Test merging duplicate tags relinks their recipes."""
+        vegan = Tag.objects.create(user=self.user, name='Vegan')
+        duplicates = [
+            Tag.objects.create(user=self.user, name=name)
+            for name in ('vegan', 'vegan ')
+        ]
+        both = self._create_recipe('Salad', vegan, *duplicates)
+        one = self._create_recipe('Curry', *duplicates)
+        other = self._create_recipe('Soup', vegan)
+
+        res = self.client.post(
+            merge_url(vegan.id),
+            {'ids': [tag.id for tag in duplicates]},
+            format='json',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertEqual(res.data['id'], vegan.id)
+        self.assertEqual(list(Tag.objects.all()), [vegan])
+        for recipe in (both, one, other):
+            self.assertEqual(list(recipe.tags.all()), [vegan])
+        self.assertEqual(
+            Tombstone.objects.filter(kind=Tombstone.TAGS).count(), 2
+        )
+        one.refresh_from_db()
+        self.assertGreater(one.version, 1)
+
+    def test_rename_changes_recipe_etag(self):
+        """Test renaming a tag changes the ETag of recipes listing it."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        recipe = self._create_recipe('Salad', tag)
+        url = reverse('recipe:recipe-detail', args=[recipe.id])
+        etag = self.client.get(url)['ETag']
+
+        self.client.patch(detail_url(tag.id), {'name': 'Veggie'})
+        res = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(res['ETag'], etag)
+        self.assertEqual(res.data['tags'][0]['name'], 'Veggie')
+
+    def test_merge_tags_of_other_user(self):
+        """Test only the user's own tags can be merged."""
+        tag = Tag.objects.create(user=self.user, name='Vegan')
+        other = Tag.objects.create(
+            user=create_user(email='user2@example.com'), name='vegan'
+        )
+
+        res = self.client.post(
+            merge_url(tag.id), {'ids': [other.id]}, format='json'
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertTrue(Tag.objects.filter(id=other.id).exists())
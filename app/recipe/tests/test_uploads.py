@@ -0,0 +1,215 @@
+"""
+Test direct uploads of recipe images to S3 compatible storage.
+"""
+import io
+from decimal import Decimal
+
+import boto3
+import requests
+from moto import mock_aws
+from PIL import Image
+
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from core import jobs
+from core.models import Job, Recipe
+BUCKET = 'recipe-media'
+
+
+def upload_url(recipe_id):
+    return reverse('recipe:recipe-image-upload-url', args=[recipe_id])
+
+
+def confirm_url(recipe_id):
+    return reverse('recipe:recipe-confirm-image', args=[recipe_id])
+
+
+def jpeg(size=(20, 10)):
+    """Return the bytes of a JPEG tagged with EXIF GPS data."""
+    exif = Image.Exif()
+    exif[0x8825] = {1: 'N'}
+    buffer = io.BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG', exif=exif.tobytes())
+    return buffer.getvalue()
+
+
+@override_settings(
+    DEFAULT_FILE_STORAGE='core.storage.MediaStorage',
+    AWS_STORAGE_BUCKET_NAME=BUCKET,
+    AWS_S3_REGION_NAME='us-east-1',
+    AWS_ACCESS_KEY_ID='testing',
+    AWS_SECRET_ACCESS_KEY='testing',
+)
+class DirectUploadTests(TestCase):
+    """Test presigned uploads straight to the bucket."""
+
+    def setUp(self):
+        mock = mock_aws()
+        mock.start()
+        self.addCleanup(mock.stop)
+        self.s3 = boto3.client('s3', region_name='us-east-1')
+        self.s3.create_bucket(Bucket=BUCKET)
+
+        self.user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.recipe = Recipe.objects.create(
+            user=self.user, title='Pie', time_minutes=5,
+            price=Decimal('1.00'),
+        )
+
+    def _upload(self, content, content_type='image/jpeg'):
+        """Request a presigned upload and send ``content`` with it."""
+        res = self.client.post(
+            upload_url(self.recipe.id), {'content_type': content_type}
+        )
+        self.assertEqual(res.status_code, status.HTTP_200_OK)
+        sent = requests.post(
+            res.data['url'],
+            data=res.data['fields'],
+            files={'file': ('photo', content)},
+        )
+        return res.data['token'], sent
+
+    def _run_jobs(self):
+        while jobs.run_next():
+            pass
+
+    def test_upload_and_confirm(self):
+        """Test the image is only set once sanitized in the background."""
+        token, sent = self._upload(jpeg())
+        self.assertEqual(sent.status_code, status.HTTP_204_NO_CONTENT)
+        uploaded = self.s3.list_objects_v2(Bucket=BUCKET)['Contents'][0]
+
+        res = self.client.post(confirm_url(self.recipe.id), {'token': token})
+
+        self.assertEqual(res.status_code, status.HTTP_202_ACCEPTED)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+        self.assertEqual(self.recipe.version, 1)
+        self.assertEqual(Job.objects.count(), 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._run_jobs()
+
+        self.recipe.refresh_from_db()
+        self.assertTrue(self.recipe.image.name.endswith('.jpg'))
+        self.assertEqual(self.recipe.version, 2)
+        self.assertFalse(default_storage.exists(uploaded['Key']))
+        with default_storage.open(self.recipe.image.name) as stored:
+            self.assertNotIn(b'Exif', stored.read())
+
+    def test_confirm_stale_version(self):
+        """Test confirming checks If-Match against the recipe version."""
+        token, _ = self._upload(jpeg())
+
+        res = self.client.post(
+            confirm_url(self.recipe.id), {'token': token},
+            HTTP_IF_MATCH='"5"',
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_412_PRECONDITION_FAILED)
+        self.assertEqual(Job.objects.count(), 0)
+
+    def test_invalid_upload_dropped(self):
+        """Test uploads failing validation are deleted, never recorded."""
+        image = SimpleUploadedFile('old.jpg', jpeg())
+        self.recipe.image = default_storage.save('uploads/old.jpg', image)
+        self.recipe.save()
+        token, _ = self._upload(b'not an image')
+        self.client.post(confirm_url(self.recipe.id), {'token': token})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self._run_jobs()
+
+        self.recipe.refresh_from_db()
+        self.assertEqual(self.recipe.image.name, 'uploads/old.jpg')
+        self.assertEqual(self.recipe.version, 1)
+        self.assertEqual(
+            self.s3.list_objects_v2(Bucket=BUCKET)['KeyCount'], 1
+        )
+
+    def test_confirm_over_limit_rejected(self):
+        """Test uploads over the size limit are deleted on confirming."""
+        token, _ = self._upload(jpeg())
+
+        with override_settings(RECIPE_IMAGE_MAX_BYTES=100):
+            res = self.client.post(
+                confirm_url(self.recipe.id), {'token': token}
+            )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(
+            self.s3.list_objects_v2(Bucket=BUCKET)['KeyCount'], 0
+        )
+
+    def test_upload_unsupported_content_type(self):
+        res = self.client.post(
+            upload_url(self.recipe.id), {'content_type': 'image/gif'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_confirm_without_upload(self):
+        """Test confirming before anything was uploaded fails."""
+        res = self.client.post(
+            upload_url(self.recipe.id), {'content_type': 'image/png'}
+        )
+
+        res = self.client.post(
+            confirm_url(self.recipe.id), {'token': res.data['token']}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+        self.recipe.refresh_from_db()
+        self.assertFalse(self.recipe.image)
+
+    def test_confirm_token_of_other_recipe(self):
+        """Test a token only confirms uploads for its own recipe."""
+        other = Recipe.objects.create(
+            user=self.user, title='Soup', time_minutes=5,
+            price=Decimal('1.00'),
+        )
+        token, _ = self._upload(jpeg())
+
+        res = self.client.post(confirm_url(other.id), {'token': token})
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_confirm_tampered_token(self):
+        token, _ = self._upload(jpeg())
+
+        res = self.client.post(
+            confirm_url(self.recipe.id), {'token': token + 'x'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class LocalStorageUploadTests(TestCase):
+    """Test direct uploads with media on the local volume."""
+
+    def test_direct_upload_not_supported(self):
+        user = get_user_model().objects.create_user(
+            'user@example.com', 'testpass123'
+        )
+        recipe = Recipe.objects.create(
+            user=user, title='Pie', time_minutes=5, price=Decimal('1.00'),
+        )
+        client = APIClient()
+        client.force_authenticate(user)
+
+        res = client.post(
+            upload_url(recipe.id), {'content_type': 'image/jpeg'}
+        )
+
+        self.assertEqual(res.status_code, status.HTTP_501_NOT_IMPLEMENTED)
@@ -0,0 +1,75 @@
+"""
+Direct uploads of recipe images to the media storage.
+
+Clients ask for a presigned upload, send the image straight to the
+bucket and then confirm it with the token they were given. The upload
+never passed through the app, so it is validated and sanitized by a
+background job, which only then records the clean copy on the recipe.
+"""
+from django.conf import settings
+from django.core import signing
+from django.core.files.storage import default_storage
+
+from core.models import recipe_image_file_path
+from recipe import images
+
+SALT = 'recipe.uploads'
+
+# Content types clients may upload and the extension they are stored with.
+CONTENT_TYPES = {
+    'image/jpeg': images.FORMATS['JPEG'],
+    'image/png': images.FORMATS['PNG'],
+    'image/webp': images.FORMATS['WEBP'],
+}
+
+
+def supported():
+    """Return whether the media storage accepts direct uploads."""
+    return hasattr(default_storage, 'presigned_post')
+
+
+def presign(recipe, content_type):
+    """Return a presigned upload of an image for ``recipe``.
+
+    Next to the URL and form fields of the upload, the result carries
+    the token that confirms it.
+    """
+    name = recipe_image_file_path(
+        recipe, f'image{CONTENT_TYPES[content_type]}'
+    )
+    upload = default_storage.presigned_post(
+        name,
+        content_type,
+        settings.RECIPE_IMAGE_MAX_BYTES,
+        settings.RECIPE_IMAGE_UPLOAD_EXPIRE,
+    )
+    upload['token'] = signing.dumps(
+        {'recipe': recipe.id, 'name': name}, salt=SALT
+    )
+    return upload
+
+
+def confirm(recipe, token):
+    """Return the name of the image uploaded with ``token``.
+
+    Raises ``InvalidImage`` when the token isn't one issued for
+    ``recipe`` or nothing valid was uploaded with it.
+    """
+    try:
+        upload = signing.loads(
+            token, salt=SALT, max_age=settings.RECIPE_IMAGE_UPLOAD_EXPIRE
+        )
+    except signing.BadSignature:
+        raise images.InvalidImage('Invalid or expired upload token.')
+    if upload['recipe'] != recipe.id:
+        raise images.InvalidImage('Invalid or expired upload token.')
+
+    name = upload['name']
+    if not default_storage.exists(name):
+        raise images.InvalidImage('The image was not uploaded.')
+    if default_storage.size(name) > settings.RECIPE_IMAGE_MAX_BYTES:
+        default_storage.delete(name)
+        raise images.InvalidImage(
+            f'Images must be at most {settings.RECIPE_IMAGE_MAX_BYTES} bytes.'
+        )
+    return name
@@ -15,5 +15,9 @@ router.register('ingredients', views.IngredientsViewSet)
 app_name = 'recipe'
 
 urlpatterns=[
+    path('sync/', views.SyncView.as_view(), name='sync'),
+    path(
+        'events/token/', views.EventsTokenView.as_view(), name='events-token'
+    ),
     path('', include(router.urls)),
 ]
\ No newline at end of file
@@ -1,10 +1,18 @@
 """Views for the recipe APIs."""
+import mimetypes
+from urllib.parse import quote
 
-from rest_framework import (viewsets, mixins, status,)
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, HttpResponseRedirect
+from django.db import transaction
+from django.db.models import F, Prefetch
+from rest_framework import (viewsets, mixins, status, exceptions,)
 from rest_framework.decorators import action
+from rest_framework.fields import BooleanField
 from rest_framework.response import Response
 from rest_framework.authentication import TokenAuthentication
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.views import APIView
 from drf_spectacular.utils import (
     extend_schema_view,
     extend_schema,
@@ -12,11 +20,96 @@ from drf_spectacular.utils import (
     OpenApiTypes
 )
 
+from core import jobs
+from core.idempotency import idempotent
 from core.models import (Recipe, Tag, Ingredients,)
-from recipe import serializers
+from recipe import bulk, images, merge, serializers, stream, sync, uploads
+from recipe.jobs import verify_image
 
+SPARSE_FIELDS_PARAMETERS = [
+    OpenApiParameter(
+        'fields',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to return.',
+    ),
+    OpenApiParameter(
+        'omit',
+        OpenApiTypes.STR,
+        description='Comma separated list of fields to leave out.',
+    ),
+]
 
 
+class PreconditionFailed(exceptions.APIException):
+    status_code = status.HTTP_412_PRECONDITION_FAILED
+    default_detail = 'The recipe was modified since it was retrieved.'
+    default_code = 'precondition_failed'
+
+
+class ResyncRequired(exceptions.APIException):
+    status_code = status.HTTP_410_GONE
+    default_detail = 'The cursor expired; sync again without one.'
+    default_code = 'full_resync_required'
+
+
+# Largest value of a bigint primary key.
+MAX_ID = 2 ** 63 - 1
+
+
+def recipe_etag(recipe):
+    """Return the ETag for the current version of ``recipe``."""
+    return f'"{recipe.version}"'
+
+
+def if_match_versions(request):
+    """Return the versions listed in If-Match, ``None`` if any matches.
+
+    Weak tags are accepted since compression weakens the ETags sent.
+    """
+    header = request.headers.get('If-Match')
+    if header is None or header.strip() == '*':
+        return None
+    versions = []
+    for tag in header.split(','):
+        tag = tag.strip()
+        if tag.startswith('W/'):
+            tag = tag[2:]
+        tag = tag.strip('"')
+        if tag.isdigit():
+            versions.append(int(tag))
+    return versions
+
+
+class SparseFieldsViewMixin:
+    """Prune the queryset to the fields selected by the request.
+
+    Columns of unselected fields are deferred and the lookups in
+    ``sparse_prefetch`` are only prefetched when their field is rendered.
+    """
+    sparse_prefetch = {}
+
+    def selected_fields(self):
+        names = self.get_serializer_class().Meta.fields
+        return serializers.selected_fields(self.request, names)
+
+    def sparse_queryset(self, queryset):
+        names = self.get_serializer_class().Meta.fields
+        selected = self.selected_fields()
+        columns = {f.name for f in queryset.model._meta.concrete_fields}
+        deferred = [
+            name for name in names
+            if name in columns and name != 'id' and name not in selected
+        ]
+        if deferred:
+            queryset = queryset.defer(*deferred)
+        prefetch = [
+            lookup for name, lookup in self.sparse_prefetch.items()
+            if name in selected
+        ]
+        if prefetch:
+            queryset = queryset.prefetch_related(*prefetch)
+        return queryset
+
 
 @extend_schema_view(
     list=extend_schema(
@@ -30,17 +123,72 @@ from recipe import serializers
                 'ingredients',
                 OpenApiTypes.STR,
                 description='Comma separated list of ingredients ids.',
-            )
-        ]
-    )
+            ),
+            OpenApiParameter(
+                'sideload',
+                OpenApiTypes.BOOL,
+                description='Reference tags and ingredients by id and '
+                            'list them once under "included".',
+            ),
+        ] + SPARSE_FIELDS_PARAMETERS
+    ),
+    retrieve=extend_schema(parameters=SPARSE_FIELDS_PARAMETERS),
 )
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(SparseFieldsViewMixin, viewsets.ModelViewSet):
     """View for manage recipe APIs."""
     serializer_class = serializers.RecipeDetailSerializer
     queryset = Recipe.objects.all()
     authentication_classes=[TokenAuthentication]
     permission_classes = [IsAuthenticated]
+    sparse_prefetch = {
+        'tags': Prefetch('tags', queryset=Tag.objects.order_by('id')),
+    }
+
+    def _parse_ids(self, value, limit):
+        """Return unique ids from a list or comma separated string.
+
+        Raises ``ValueError`` when ids are missing, malformed, outside
+        the range of primary keys or more than ``limit``.
+        """
+        if isinstance(value, str):
+            value = [pk for pk in value.split(',') if pk.strip()]
+        if not isinstance(value, list) or not value:
+            raise ValueError('A list of ids is required.')
+        ids = list(dict.fromkeys(int(pk) for pk in value))
+        if not all(0 < pk <= MAX_ID for pk in ids):
+            raise ValueError(f'Ids must be between 1 and {MAX_ID}.')
+        if len(ids) > limit:
+            raise ValueError(f'At most {limit} ids are allowed.')
+        return ids
+
+    def _owned_ids(self, ids):
+        """Return which of ``ids`` the user's queryset contains."""
+        return set(
+            self.get_queryset().prefetch_related(None).filter(
+                id__in=ids
+            ).values_list('id', flat=True)
+        )
+
+    def _claim_version(self, recipe):
+        """Increment the version of ``recipe`` when it matches If-Match.
+
+        The check and the increment are a single conditional UPDATE that
+        keeps the row locked until the surrounding transaction ends, so
+        concurrent writers can't interleave. Raises ``PreconditionFailed``
+        when the stored version doesn't match.
+        """
+        versions = if_match_versions(self.request)
+        recipes = Recipe.objects.filter(pk=recipe.pk)
+        if versions is not None:
+            recipes = recipes.filter(version__in=versions)
+        if not recipes.update(version=F('version') + 1):
+            raise PreconditionFailed()
+
+        if versions is not None and len(versions) == 1:
+            recipe.version = versions[0] + 1
+        else:
+            recipe.refresh_from_db(fields=['version'])
 
     def _params_to_ints(self, qs):
         """Convert a list of strings to Integers."""
@@ -59,34 +207,298 @@ class RecipeViewSet(viewsets.ModelViewSet):
             ingredients_id = self._params_to_ints(ingredients)
             queryset= queryset.filter(ingredient__id__in=ingredients_id)
 
-        return queryset.filter(user=self.request.user).order_by('-id').distinct()
+        return self.sparse_queryset(
+            queryset.filter(user=self.request.user).order_by('-id').distinct()
+        )
+
+
+    def list(self, request, *args, **kwargs):
+        """List recipes without a serializer per row."""
+        if self.paginator is not None:
+            return super().list(request, *args, **kwargs)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        fields = self.selected_fields()
+        try:
+            sideload = BooleanField().to_internal_value(
+                request.query_params.get('sideload', False)
+            )
+        except exceptions.ValidationError as exc:
+            raise exceptions.ValidationError({'sideload': exc.detail})
+        if sideload:
+            return Response(
+                serializers.recipe_sideload_data(queryset, fields)
+            )
 
+        return Response(serializers.recipe_list_data(queryset, fields))
 
     def get_serializer_class(self):
         """Return the reializer class for request."""
         if self.action == 'list':
             return serializers.RecipeSerializer
 
-        if self.action == 'upload_image':
+        if self.action in ('upload_image', 'confirm_image'):
             return serializers.RecipeImageSerializer
         return self.serializer_class
 
+    def retrieve(self, request, *args, **kwargs):
+        recipe = self.get_object()
+        serializer = self.get_serializer(recipe)
+        return Response(
+            serializer.data, headers={'ETag': recipe_etag(recipe)}
+        )
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    def update(self, request, *args, **kwargs):
+        response = super().update(request, *args, **kwargs)
+        response['ETag'] = self.etag
+        return response
+
     def perform_create(self, serializer):
         """Create a new recipe"""
         serializer.save(user=self.request.user)
 
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            self._claim_version(serializer.instance)
+            serializer.save()
+        self.etag = recipe_etag(serializer.instance)
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            self._claim_version(instance)
+            instance.delete()
+
     @action(methods=['POST'], detail=True, url_path='upload-image')
+    @idempotent
     def upload_image(self, request, pk=None):
         """Upload an image to a recipe."""
         recipe = self.get_object()
         serializer = self.get_serializer(recipe, data = request.data)
 
         if serializer.is_valid():
-            serializer.save()
-            return Response(serializer.data, status=status.HTTP_200_OK)
+            with transaction.atomic():
+                self._claim_version(recipe)
+                serializer.save()
+            return Response(
+                serializer.data,
+                status=status.HTTP_200_OK,
+                headers={'ETag': recipe_etag(recipe)},
+            )
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
+    @extend_schema(responses={(200, 'image/*'): OpenApiTypes.BINARY})
+    @action(methods=['GET'], detail=True, url_path='image')
+    def download_image(self, request, pk=None):
+        """Serve the image of a recipe.
+
+        Local files are sent by the proxy, with range support, from the
+        internal location named in ``X-Accel-Redirect``; other storage is
+        redirected to.
+        """
+        recipe = self.get_object()
+        if not recipe.image:
+            raise exceptions.NotFound()
+        try:
+            recipe.image.path
+        except NotImplementedError:
+            return HttpResponseRedirect(recipe.image.url)
+
+        if settings.DEBUG:
+            # The development server runs without the proxy.
+            return FileResponse(recipe.image.open('rb'))
+        response = HttpResponse(
+            content_type=mimetypes.guess_type(recipe.image.name)[0]
+        )
+        response['X-Accel-Redirect'] = (
+            settings.MEDIA_ACCEL_REDIRECT_PREFIX + quote(recipe.image.name)
+        )
+        response['Cache-Control'] = (
+            f'private, max-age={settings.MEDIA_URL_EXPIRE}'
+        )
+        return response
+
+    @extend_schema(
+        request=serializers.RecipeImageUploadSerializer,
+        responses=OpenApiTypes.OBJECT,
+    )
+    @action(methods=['POST'], detail=True, url_path='image-upload-url')
+    def image_upload_url(self, request, pk=None):
+        """Presign an upload of an image straight to the media storage."""
+        recipe = self.get_object()
+        if not uploads.supported():
+            return Response(
+                {'detail': 'Direct uploads are not supported; '
+                           'use upload-image instead.'},
+                status=status.HTTP_501_NOT_IMPLEMENTED,
+            )
+        serializer = serializers.RecipeImageUploadSerializer(
+            data=request.data
+        )
+        serializer.is_valid(raise_exception=True)
+        return Response(
+            uploads.presign(recipe, serializer.validated_data['content_type'])
+        )
+
+    @extend_schema(
+        request=serializers.RecipeImageConfirmSerializer,
+        responses={202: OpenApiTypes.OBJECT},
+    )
+    @action(methods=['POST'], detail=True, url_path='confirm-image')
+    def confirm_image(self, request, pk=None):
+        """Queue the image uploaded with a presigned upload for checking."""
+        recipe = self.get_object()
+        serializer = serializers.RecipeImageConfirmSerializer(
+            data=request.data
+        )
+        serializer.is_valid(raise_exception=True)
+        try:
+            name = uploads.confirm(
+                recipe, serializer.validated_data['token']
+            )
+        except images.InvalidImage as exc:
+            return Response(
+                {'token': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        versions = if_match_versions(request)
+        if versions is not None and recipe.version not in versions:
+            raise PreconditionFailed()
+        jobs.enqueue(verify_image, recipe_id=recipe.id, name=name)
+        return Response(
+            {'detail': 'The image is set once it has been validated.'},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'ids',
+                OpenApiTypes.STR,
+                required=True,
+                description='Comma separated list of recipe ids.',
+            )
+        ] + SPARSE_FIELDS_PARAMETERS
+    )
+    @action(methods=['GET'], detail=False, url_path='batch')
+    def batch(self, request):
+        """Retrieve several recipes in the order requested."""
+        try:
+            ids = self._parse_ids(
+                request.query_params.get('ids', ''),
+                settings.RECIPE_BATCH_MAX_IDS,
+            )
+        except (TypeError, ValueError) as exc:
+            return Response(
+                {'ids': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        recipes = {
+            recipe.id: recipe
+            for recipe in self.get_queryset().filter(id__in=ids)
+        }
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True
+        )
+        return Response({
+            'results': serializer.data,
+            'missing': [pk for pk in ids if pk not in recipes],
+        })
+
+    @extend_schema(request=serializers.RecipeBulkUpdateSerializer(many=True))
+    @action(methods=['PATCH'], detail=False, url_path='bulk')
+    def bulk_update(self, request):
+        """Partially update many recipes in one transaction."""
+        items = request.data
+        if not isinstance(items, list) or not items:
+            return Response(
+                {'non_field_errors': ['Expected a non-empty list.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if len(items) > settings.RECIPE_BULK_MAX_ITEMS:
+            return Response(
+                {'non_field_errors': [
+                    f'At most {settings.RECIPE_BULK_MAX_ITEMS} items '
+                    'are allowed.'
+                ]},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        serializer = serializers.RecipeBulkUpdateSerializer(
+            data=items,
+            many=True,
+            partial=True,
+            context=self.get_serializer_context(),
+        )
+        if not serializer.is_valid():
+            return Response(
+                serializer.errors, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        validated = serializer.validated_data
+        ids = [item.get('id') for item in validated]
+        owned = self._owned_ids([pk for pk in ids if pk is not None])
+        errors = []
+        seen = set()
+        for pk in ids:
+            if pk is None:
+                errors.append({'id': ['This field is required.']})
+            elif pk in seen:
+                errors.append({'id': ['Duplicate id.']})
+            elif pk not in owned:
+                errors.append({'id': ['Not found.']})
+            else:
+                errors.append({})
+            seen.add(pk)
+        if any(errors):
+            return Response(errors, status=status.HTTP_400_BAD_REQUEST)
+
+        with transaction.atomic():
+            bulk.bulk_update(request.user, validated)
+
+        recipes = {
+            recipe.id: recipe
+            for recipe in self.get_queryset().filter(id__in=ids)
+        }
+        results = self.get_serializer([recipes[pk] for pk in ids], many=True)
+        return Response({'results': results.data})
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'ids',
+                OpenApiTypes.STR,
+                description='Comma separated list of recipe ids.',
+            )
+        ],
+        request=None,
+        responses=OpenApiTypes.OBJECT,
+    )
+    @bulk_update.mapping.delete
+    def bulk_delete(self, request):
+        """Delete many recipes in one transaction."""
+        value = request.query_params.get('ids')
+        if value is None and isinstance(request.data, dict):
+            value = request.data.get('ids')
+        try:
+            ids = self._parse_ids(value, settings.RECIPE_BULK_MAX_ITEMS)
+        except (TypeError, ValueError) as exc:
+            return Response(
+                {'ids': [str(exc)]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        owned = self._owned_ids(ids)
+        Recipe.objects.filter(id__in=owned).delete()
+
+        return Response({
+            'deleted': len(owned),
+            'missing': [pk for pk in ids if pk not in owned],
+        })
+
 @extend_schema_view(
     list=extend_schema(
         parameters=[
@@ -95,10 +507,11 @@ class RecipeViewSet(viewsets.ModelViewSet):
                 OpenApiTypes.INT, enum=[0,1],
                 description='Filter by items assigned to recipes.',
             )
-        ]
+        ] + SPARSE_FIELDS_PARAMETERS
     )
 )
-class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
+class BaseRecipeAttrViewSet(SparseFieldsViewMixin,
+                            mixins.DestroyModelMixin,
                             mixins.UpdateModelMixin,
                             mixins.ListModelMixin,
                             viewsets.GenericViewSet):
@@ -113,9 +526,40 @@ class BaseRecipeAttrViewSet(mixins.DestroyModelMixin,
         if assigned_only:
             queryset = queryset.filter(recipe__isnull=False)
 
-        return queryset.filter(
-            user=self.request.user
-        ).order_by('-name').distinct()
+        queryset = queryset.filter(user=self.request.user)
+        return self.sparse_queryset(queryset.order_by('-name').distinct())
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+            sync.touch_recipes(self.queryset.model, [serializer.instance.id])
+
+    @extend_schema(request=serializers.RecipeAttrMergeSerializer)
+    @action(methods=['POST'], detail=True, url_path='merge')
+    def merge(self, request, pk=None):
+        """Merge other tags or ingredients into this one."""
+        target = self.get_object()
+        serializer = serializers.RecipeAttrMergeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = [
+            pk for pk in dict.fromkeys(serializer.validated_data['ids'])
+            if pk != target.id
+        ]
+        owned = set(
+            self.queryset.filter(
+                user=request.user, id__in=ids
+            ).values_list('id', flat=True)
+        )
+        missing = [pk for pk in ids if pk not in owned]
+        if missing:
+            return Response(
+                {'ids': [f'Not found: {", ".join(map(str, missing))}.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        with transaction.atomic():
+            merge.merge(target, ids)
+        return Response(self.get_serializer(target).data)
 
 class TagViewSet(BaseRecipeAttrViewSet):
     """Manage Tag in the database"""
@@ -128,4 +572,70 @@ class IngredientsViewSet(BaseRecipeAttrViewSet):
     queryset=Ingredients.objects.all()
 
 
+class SyncView(APIView):
+    """Return recipes, tags and ingredients changed since a cursor."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @extend_schema(
+        parameters=[
+            OpenApiParameter(
+                'cursor',
+                OpenApiTypes.STR,
+                description='Cursor returned by the previous sync. '
+                            'Omit it to fetch everything, page by page.',
+            ),
+            OpenApiParameter(
+                'page',
+                OpenApiTypes.STR,
+                description='Token of the next page of a sync without '
+                            'cursor, returned as `next`.',
+            ),
+        ],
+        responses=OpenApiTypes.OBJECT,
+    )
+    def get(self, request):
+        since = request.query_params.get('cursor')
+        page = request.query_params.get('page')
+        if since is None:
+            try:
+                return Response(sync.snapshot(
+                    request.user, page, {'request': request}
+                ))
+            except (OverflowError, ValueError):
+                return Response(
+                    {'page': ['Invalid page.']},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+
+        if page is not None:
+            return Response(
+                {'page': ['Only syncs without a cursor are paged.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        try:
+            since = sync.decode_cursor(since)
+        except (OverflowError, ValueError):
+            return Response(
+                {'cursor': ['Invalid cursor.']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        if sync.cursor_expired(since):
+            raise ResyncRequired()
+
+        return Response(sync.changes(
+            request.user, since, {'request': request}
+        ))
+
+
+class EventsTokenView(APIView):
+    """Issue a short lived token to open the change event stream with."""
+    authentication_classes = [TokenAuthentication]
+    permission_classes = [IsAuthenticated]
 
+    @extend_schema(request=None, responses=OpenApiTypes.OBJECT)
+    def post(self, request):
+        return Response({
+            'token': stream.issue_token(request.user),
+            'expires_in': settings.EVENTS_TOKEN_MAX_AGE,
+        })
@@ -0,0 +1,94 @@
+"""
+Background deletion of user accounts.
+
+Deleting a user at once cascades to every recipe, tag and ingredient in
+one transaction. Instead the account is deactivated right away and its
+data purged by a job that deletes one bounded batch per run and queues
+itself again until only the user is left.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from rest_framework.authtoken.models import Token
+
+from core import jobs
+from core.models import (
+    AccountDeletion,
+    IdempotencyKey,
+    Ingredients,
+    Recipe,
+    Tag,
+    Tombstone,
+)
+
+# Below interactive work queued with the default priority.
+PRIORITY = -10
+
+# Rows of a user purged in order, keyed by the name progress is kept as.
+STEPS = {
+    'recipes': lambda user_id: Recipe.objects.filter(user_id=user_id),
+    'tags': lambda user_id: Tag.objects.filter(user_id=user_id),
+    'ingredients': lambda user_id: Ingredients.objects.filter(
+        user_id=user_id
+    ),
+    'tombstones': lambda user_id: Tombstone.objects.filter(user_id=user_id),
+    'idempotency_keys': lambda user_id: IdempotencyKey.objects.filter(
+        scope=f'user:{user_id}'
+    ),
+    'tokens': lambda user_id: Token.objects.filter(user_id=user_id),
+}
+
+
+def _delete_batch(queryset, size):
+    """Delete up to ``size`` rows of ``queryset``, returning how many."""
+    model = queryset.model
+    if model is Recipe:
+        rows = list(queryset.values_list('pk', 'image')[:size])
+        images = [image for _, image in rows if image]
+        transaction.on_commit(
+            lambda: [default_storage.delete(image) for image in images]
+        )
+        ids = [pk for pk, _ in rows]
+    else:
+        ids = list(queryset.values_list('pk', flat=True)[:size])
+    if ids:
+        model.objects.filter(pk__in=ids).delete()
+    return len(ids)
+
+
+@jobs.job
+def purge_account(user_id):
+    """Delete the next batch of a deleted account's data."""
+    deletion = AccountDeletion.objects.select_for_update().get(
+        user_id=user_id
+    )
+    budget = settings.ACCOUNT_DELETION_BATCH_SIZE
+    for name, rows in STEPS.items():
+        count = _delete_batch(rows(user_id), budget)
+        if count:
+            deletion.deleted[name] = deletion.deleted.get(name, 0) + count
+        budget -= count
+        if not budget:
+            deletion.save()
+            jobs.enqueue(purge_account, priority=PRIORITY, user_id=user_id)
+            return
+
+    get_user_model().objects.filter(id=user_id).delete()
+    deletion.finished_at = timezone.now()
+    deletion.save()
+
+
+def request_account_deletion(user):
+    """Deactivate ``user`` and purge their data in the background."""
+    with transaction.atomic():
+        user.is_active = False
+        user.save(update_fields=['is_active'])
+        deletion, created = AccountDeletion.objects.get_or_create(
+            user_id=user.id, defaults={'email': user.email}
+        )
+        if created:
+            jobs.enqueue(purge_account, priority=PRIORITY, user_id=user.id)
+    return deletion
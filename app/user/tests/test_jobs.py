@@ -0,0 +1,94 @@
+"""
+Test the background deletion of user accounts.
+"""
+import os
+import tempfile
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from rest_framework.authtoken.models import Token
+
+from core import jobs
+from core.models import AccountDeletion, Ingredients, Job, Recipe, Tag
+from user.jobs import request_account_deletion
+
+
+def create_user(email):
+    return get_user_model().objects.create_user(email, 'testpass123')
+
+
+@override_settings(ACCOUNT_DELETION_BATCH_SIZE=4)
+class AccountDeletionTests(TestCase):
+    """Test purging a deleted account in batches."""
+
+    def setUp(self):
+        self.media = tempfile.TemporaryDirectory()
+        override = override_settings(MEDIA_ROOT=self.media.name)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.addCleanup(self.media.cleanup)
+
+        self.user = create_user('user@example.com')
+        self.other = create_user('other@example.com')
+        for user in (self.user, self.other):
+            tag = Tag.objects.create(user=user, name='Vegan')
+            ingredient = Ingredients.objects.create(user=user, name='Salt')
+            for i in range(5):
+                recipe = Recipe.objects.create(
+                    user=user, title=f'Recipe {i}', time_minutes=5,
+                    price=Decimal('1.00'),
+                )
+                recipe.tags.add(tag)
+                recipe.ingredient.add(ingredient)
+            Token.objects.create(user=user)
+        self.recipe = Recipe.objects.filter(user=self.user).first()
+        self.recipe.image.save('food.jpg', ContentFile(b'jpeg'))
+
+    def _run_jobs(self):
+        runs = 0
+        while jobs.run_next():
+            runs += 1
+        return runs
+
+    def test_purge_in_batches(self):
+        """Test every row of the user goes, a batch per job run."""
+        image_path = self.recipe.image.path
+        request_account_deletion(self.user)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            runs = self._run_jobs()
+
+        self.assertEqual(runs, 3)
+        self.assertFalse(
+            get_user_model().objects.filter(id=self.user.id).exists()
+        )
+        deletion = AccountDeletion.objects.get()
+        self.assertIsNotNone(deletion.finished_at)
+        self.assertEqual(deletion.deleted, {
+            'recipes': 5, 'tags': 1, 'ingredients': 1, 'tokens': 1,
+        })
+        self.assertFalse(os.path.exists(image_path))
+        self.assertEqual(Recipe.objects.filter(user=self.other).count(), 5)
+        self.assertEqual(Tag.objects.count(), 1)
+        self.assertEqual(
+            Recipe.tags.through.objects.count(), 5
+        )
+        self.assertFalse(Job.objects.exists())
+
+    def test_deactivated_immediately(self):
+        """Test the account can't be used while its data is purged."""
+        request_account_deletion(self.user)
+
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.is_active)
+        self.assertEqual(Recipe.objects.filter(user=self.user).count(), 5)
+
+    def test_request_twice(self):
+        """Test repeated requests queue a single purge."""
+        request_account_deletion(self.user)
+        request_account_deletion(self.user)
+
+        self.assertEqual(Job.objects.count(), 1)
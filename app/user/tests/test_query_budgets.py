@@ -0,0 +1,51 @@
+"""
+Test user endpoints stay within their query budgets.
+"""
+from django.test import TestCase
+from django.urls import reverse
+
+from rest_framework.test import APIClient
+
+from core.management.commands.seed_recipes import SEED_PASSWORD
+from core.testing import BudgetMixin, seed
+
+DATASET_SIZES = [1, 10, 40]
+
+
+class UserQueryBudgetTests(BudgetMixin, TestCase):
+    """Test query counts don't grow with the number of users."""
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def test_create_user(self):
+        """Test creating a user."""
+        for size in DATASET_SIZES:
+            with self.subTest(size=size):
+                seed(users=size, recipes_per_user=1)
+                self.assertWithinBudget(
+                    'user:create',
+                    self.client.post,
+                    reverse('user:create'),
+                    {
+                        'email': f'new{size}@example.com',
+                        'password': 'testpass123',
+                        'name': 'New',
+                    },
+                )
+
+    def test_token_and_me(self):
+        """Test obtaining a token and reading the profile."""
+        for size in DATASET_SIZES:
+            with self.subTest(size=size):
+                user = seed(users=size, recipes_per_user=3)
+                self.assertWithinBudget(
+                    'user:token',
+                    self.client.post,
+                    reverse('user:token'),
+                    {'email': user.email, 'password': SEED_PASSWORD},
+                )
+                self.client.force_authenticate(user)
+                self.assertWithinBudget(
+                    'user:me', self.client.get, reverse('user:me')
+                )
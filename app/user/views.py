@@ -2,9 +2,10 @@
 Views for the User API
 """
 
-from rest_framework import generics, authentication, permissions
+from rest_framework import generics, authentication, permissions, status
 
 from rest_framework.authtoken.views import ObtainAuthToken
+from rest_framework.response import Response
 from rest_framework.settings import api_settings
 
 from user.serializers import (
@@ -14,14 +15,22 @@ from user.serializers import (
 
 from user.serializers import UserSerializer
 
+from core.idempotency import idempotent
+from user.jobs import request_account_deletion
+
 class CreateUserView(generics.CreateAPIView):
     serializer_class = UserSerializer
 
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
 class CreateTokenView(ObtainAuthToken):
     serializer_class= AuthTokenSerializer
     renderer_classes = api_settings.DEFAULT_RENDERER_CLASSES
+    parser_classes = api_settings.DEFAULT_PARSER_CLASSES
 
-class ManageUserView(generics.RetrieveUpdateAPIView):
+class ManageUserView(generics.RetrieveUpdateDestroyAPIView):
     """Manage the authenticated user."""
     serializer_class = UserSerializer
     authentication_classes = [authentication.TokenAuthentication]
@@ -29,4 +38,9 @@ class ManageUserView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         """Retrieve and return the authenticated user."""
-        return self.request.user
\ No newline at end of file
+        return self.request.user
+
+    def destroy(self, request, *args, **kwargs):
+        """Deactivate the account and delete its data in the background."""
+        request_account_deletion(self.get_object())
+        return Response(status=status.HTTP_202_ACCEPTED)
\ No newline at end of file
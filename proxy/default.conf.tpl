@@ -1,8 +1,84 @@
 server{
     listen ${LISTEN_PORT};
 
+    gzip on;
+    gzip_vary on;
+    gzip_proxied any;
+    gzip_comp_level 5;
+    gzip_min_length 1024;
+    gzip_types application/json application/msgpack
+               application/vnd.oai.openapi application/vnd.oai.openapi+json
+               application/javascript text/css text/plain image/svg+xml;
+
+    open_file_cache max=2000 inactive=5m;
+    open_file_cache_valid 1m;
+    open_file_cache_min_uses 2;
+    open_file_cache_errors on;
+
     location /static{
         alias /vol/static;
+        gzip_static on;
+
+        # Manifest-hashed static files never change under the same name.
+        location ~* "^/static/(static/.+\.[0-9a-f]{12}\.[a-z0-9]+)$" {
+            alias /vol/static/$1;
+            add_header Cache-Control "public, max-age=31536000, immutable";
+        }
+
+        # Media URLs are signed by the app with an expiry, see
+        # core.storage.SignedFileSystemStorage, and checked here alone.
+        location /static/media/ {
+            secure_link     $arg_md5,$arg_expires;
+            secure_link_md5 "$secure_link_expires$uri ${MEDIA_URL_SECRET}";
+            if ($secure_link = "") {
+                return 403;
+            }
+            if ($secure_link = "0") {
+                return 410;
+            }
+            alias /vol/static/media/;
+            add_header Cache-Control "private, max-age=${MEDIA_URL_EXPIRE}";
+        }
+
+        # Uploads in progress, see FILE_UPLOAD_TEMP_DIR.
+        location /static/uploads/ {
+            deny all;
+        }
+    }
+
+    # Media the app authorized with an X-Accel-Redirect, see
+    # MEDIA_ACCEL_REDIRECT_PREFIX. Range requests are served from here too.
+    location /protected/media/ {
+        internal;
+        alias /vol/static/media/;
+    }
+
+    # Static files the app answered with, like the OpenAPI schema.
+    location /protected/static/ {
+        internal;
+        alias /vol/static/static/;
+        gzip_static on;
+    }
+
+    # Image uploads are read in full, to disk past the buffer size, before
+    # uwsgi is contacted, so slow clients never hold a worker.
+    location ~ "^/api/recipe/recipes/[0-9]+/upload-image/$" {
+        uwsgi_pass              ${APP_HOST}:${APP_PORT};
+        include                 /etc/nginx/uwsgi_params;
+        uwsgi_request_buffering on;
+        client_max_body_size    10M;
+        client_body_buffer_size 128k;
+        client_body_timeout     60s;
+    }
+
+    # Server-Sent Events are served by the ASGI workers, unbuffered.
+    location /api/recipe/events/ {
+        proxy_pass         http://${APP_HOST}:${EVENTS_PORT};
+        proxy_http_version 1.1;
+        proxy_set_header   Connection "";
+        proxy_buffering    off;
+        proxy_read_timeout 1h;
+        gzip               off;
     }
 
     location / {
@@ -10,4 +86,4 @@ server{
         include              /etc/nginx/uwsgi_params;
         client_max_body_size 10M;
     }
-}
\ No newline at end of file
+}
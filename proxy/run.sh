@@ -2,5 +2,11 @@
 
 set -e
 
-envsubst < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
+if [ -z "$MEDIA_URL_SECRET" ] && [ "${DEBUG:-0}" = "0" ]; then
+    echo "MEDIA_URL_SECRET must be set unless DEBUG is on." >&2
+    exit 1
+fi
+
+envsubst '${LISTEN_PORT} ${APP_HOST} ${APP_PORT} ${EVENTS_PORT} ${MEDIA_URL_SECRET} ${MEDIA_URL_EXPIRE}' \
+    < /etc/nginx/default.conf.tpl > /etc/nginx/conf.d/default.conf
 nginx -g 'daemon off;'
\ No newline at end of file
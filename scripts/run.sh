@@ -2,8 +2,10 @@
 
 set -e
 
+mkdir -p /vol/web/uploads
 python manage.py wait_for_db
 python manage.py collectstatic --noinput
 python manage.py migrate
 
+uvicorn app.asgi:application --host 0.0.0.0 --port 9001 --workers 2 &
 uwsgi --socket :9000 --workers 4 --master --enable-threads --module app.wsgi
\ No newline at end of file